@@ -0,0 +1,322 @@
+"""
+Adaptive sequential design: spend generations where they are informative.
+
+Instead of generating every row of a fixed num_samples design, the loop
+1. generates a small Latin hypercube design,
+2. fits a surrogate to the responses so far (Gaussian process or quadratic response surface),
+3. scores a large Sobol' candidate set in one vectorized pass and picks the next batch, either
+   by expected improvement (goal 'maximize'/'minimize') or by predictive uncertainty ('explore'),
+4. generates only those rows, and repeats until the best remaining score falls below
+   `tolerance` or the `max_samples` budget is spent.
+
+Within a batch, each pick conditions the surrogate's variance on the points already picked
+(the kriging-believer update), so a batch spreads out instead of piling onto one peak.
+Only continuous variables are supported; inputs are modelled on the unit cube.
+"""
+from __future__ import annotations
+from typing import List, Dict, Any, Optional, Literal, Callable, Tuple
+import time
+import numpy as np
+from pydantic import BaseModel, Field
+from .doe import Variable, DesignRequest, build_design_frame, sobol_sample
+from .generator import generator, GenerationRequest
+from .sensitivity import chaos_terms, chaos_features
+from .metrics import stage
+from .lazy import lazy_import
+
+stats = lazy_import("scipy.stats")
+optimize = lazy_import("scipy.optimize")
+
+DEFAULT_TOLERANCE = {'explore': 0.05, 'maximize': 0.003, 'minimize': 0.003}
+
+
+class AdaptiveDesignRequest(BaseModel):
+    variables: List[Variable]
+    context: str = "Generate a scientific observation log based on these conditions."
+    mock: bool = False
+    response: str = "Response" # Generated key the surrogate models
+    surrogate: Literal['gp', 'quadratic'] = 'gp'
+    goal: Literal['explore', 'maximize', 'minimize'] = 'explore'
+    initial_samples: Optional[int] = Field(None, ge=2, description="Size of the starting LHC design "
+                                                                  "(default: enough to fit the surrogate)")
+    batch_size: int = Field(4, ge=1, le=64)
+    max_samples: int = Field(40, ge=2, le=2000, description="Budget of generated rows, including the start")
+    num_candidates: int = Field(4096, ge=64, le=262144)
+    # Stop when the best score is below this fraction of the response's std ('explore') or of
+    # its observed range (expected improvement). Default: DEFAULT_TOLERANCE for the goal
+    tolerance: Optional[float] = Field(None, gt=0)
+    seed: Optional[int] = None
+
+class AdaptiveIteration(BaseModel):
+    iteration: int
+    num_samples: int # Responses the surrogate was fitted to
+    loo_error: Optional[float] = None # Leave-one-out RMSE / response std (model quality)
+    score: float # Best normalized acquisition score over the candidates
+    new_samples: int # Rows generated after this fit
+
+class AdaptiveDesignResponse(BaseModel):
+    data: List[Dict[str, Any]] # Every generated row in order, tagged with its 'iteration'
+    iterations: List[AdaptiveIteration]
+    converged: bool
+    stop_reason: Literal['converged', 'budget']
+    num_generated: int
+    best: Optional[Dict[str, Any]] = None # Best observed row for 'maximize'/'minimize'
+    total_time: float
+
+
+# --- Surrogates (inputs z in [0, 1]^k) ---
+
+class GaussianProcess:
+    """
+    GP with an ARD squared-exponential kernel on standardized responses. Hyperparameters
+    (length scales, signal and noise variance) maximize the log marginal likelihood.
+    """
+    def __init__(self, log_params: Optional[np.ndarray] = None):
+        self.log_params = log_params
+
+    @staticmethod
+    def _kernel(a: np.ndarray, b: np.ndarray, lengthscales: np.ndarray, signal: float) -> np.ndarray:
+        a, b = a / lengthscales, b / lengthscales
+        sq = np.sum(a ** 2, axis=1)[:, np.newaxis] + np.sum(b ** 2, axis=1) - 2 * a @ b.T
+        return signal * np.exp(-0.5 * np.maximum(sq, 0.0))
+
+    def _unpack(self, log_params: np.ndarray) -> Tuple[np.ndarray, float, float]:
+        params = np.exp(log_params)
+        return params[:-2], params[-2], params[-1]
+
+    def _factor(self, z: np.ndarray, log_params: np.ndarray) -> np.ndarray:
+        lengthscales, signal, noise = self._unpack(log_params)
+        gram = self._kernel(z, z, lengthscales, signal) + (noise + 1e-8) * np.eye(len(z))
+        return np.linalg.cholesky(gram)
+
+    def _neg_log_likelihood(self, log_params: np.ndarray, z: np.ndarray, t: np.ndarray) -> float:
+        try:
+            chol = self._factor(z, log_params)
+        except np.linalg.LinAlgError:
+            return 1e10
+        alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, t))
+        return float(0.5 * t @ alpha + np.sum(np.log(np.diag(chol))))
+
+    def fit(self, z: np.ndarray, y: np.ndarray) -> "GaussianProcess":
+        k = z.shape[1]
+        self.z = z
+        self.y_mean, self.y_std = float(y.mean()), float(y.std()) or 1.0
+        t = (y - self.y_mean) / self.y_std
+        bounds = [(np.log(1e-2), np.log(10.0))] * k + [(np.log(1e-2), np.log(10.0)), (np.log(1e-6), np.log(1.0))]
+        # The last round's optimum is a cheap warm start, but it can sit in a near-singular
+        # corner, so the default start always runs too and the better likelihood wins
+        starts = [np.log(np.r_[np.full(k, 0.3), 1.0, 1e-2])]
+        if self.log_params is not None:
+            starts.append(self.log_params)
+        fitted = min((optimize.minimize(self._neg_log_likelihood, start, args=(z, t), method='L-BFGS-B',
+                                        bounds=bounds) for start in starts), key=lambda r: r.fun)
+        self.log_params = fitted.x
+        self.lengthscales, self.signal, self.noise = self._unpack(fitted.x)
+        self.chol = self._factor(z, fitted.x)
+        self.alpha = np.linalg.solve(self.chol.T, np.linalg.solve(self.chol, t))
+        return self
+
+    def predict(self, z: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Posterior mean and variance of the latent function, in response units"""
+        cross = self._kernel(z, self.z, self.lengthscales, self.signal)
+        v = np.linalg.solve(self.chol, cross.T)
+        mean = cross @ self.alpha
+        variance = np.maximum(self.signal - np.sum(v ** 2, axis=0), 0.0)
+        return self.y_mean + self.y_std * mean, self.y_std ** 2 * variance
+
+    def covariance(self, z: np.ndarray, point: np.ndarray) -> np.ndarray:
+        """Posterior covariance between each row of z and one point, in response units"""
+        prior = self._kernel(z, point[np.newaxis], self.lengthscales, self.signal)[:, 0]
+        v = np.linalg.solve(self.chol, self._kernel(self.z, np.vstack([point, z]), self.lengthscales, self.signal))
+        return self.y_std ** 2 * (prior - v[:, 1:].T @ v[:, 0])
+
+    def loo_residuals(self) -> np.ndarray:
+        """Closed-form leave-one-out residuals, in response units"""
+        inverse = np.linalg.inv(self.chol)
+        diag = np.sum(inverse ** 2, axis=0)  # diag(K^-1)
+        return self.y_std * self.alpha / diag
+
+class QuadraticSurface:
+    """Full quadratic response surface (linear, squared and two-factor terms) by least squares"""
+    def __init__(self, k: int):
+        self.terms = chaos_terms(k, 2)
+        self.num_coef = len(self.terms) + 1
+
+    def _features(self, z: np.ndarray) -> np.ndarray:
+        features = chaos_features(2 * z - 1, self.terms, 2)
+        return np.hstack([np.ones((len(z), 1)), features])
+
+    def fit(self, z: np.ndarray, y: np.ndarray) -> "QuadraticSurface":
+        design = self._features(z)
+        self.gram_inv = np.linalg.pinv(design.T @ design)
+        self.coef = self.gram_inv @ design.T @ y
+        residuals = y - design @ self.coef
+        self.residual_var = float(residuals @ residuals) / max(len(y) - self.num_coef, 1)
+        leverage = np.sum((design @ self.gram_inv) * design, axis=1)
+        self.loo = residuals / np.maximum(1 - leverage, 1e-6)
+        return self
+
+    def predict(self, z: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        design = self._features(z)
+        variance = self.residual_var * np.sum((design @ self.gram_inv) * design, axis=1)
+        return design @ self.coef, variance
+
+    def covariance(self, z: np.ndarray, point: np.ndarray) -> np.ndarray:
+        return self.residual_var * (self._features(z) @ self.gram_inv @ self._features(point[np.newaxis])[0])
+
+    def loo_residuals(self) -> np.ndarray:
+        return self.loo
+
+
+# --- Batch selection ---
+
+def expected_improvement(mean: np.ndarray, std: np.ndarray, best: float) -> np.ndarray:
+    """EI for maximization over the incumbent `best`"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gain = mean - best
+        u = np.where(std > 0, gain / std, 0.0)
+        ei = gain * stats.norm.cdf(u) + std * stats.norm.pdf(u)
+    return np.where(std > 0, np.maximum(ei, 0.0), np.maximum(gain, 0.0))
+
+def select_batch(model, candidates: np.ndarray, size: int, goal: str,
+                 y: np.ndarray) -> Tuple[List[int], float]:
+    """
+    Greedy batch: pick the best-scoring candidate, condition the variance on it, repeat.
+    Returns candidate indices and the first pick's normalized score (the convergence signal).
+    """
+    mean, variance = model.predict(candidates)
+    sign = -1.0 if goal == 'minimize' else 1.0
+    scale = float(y.std()) if goal == 'explore' else float(np.ptp(y))
+    scale = scale or 1.0
+    picks: List[int] = []
+    factors: List[np.ndarray] = []  # Normalized conditional covariances of earlier picks
+    first_score = 0.0
+    for _ in range(size):
+        std = np.sqrt(np.maximum(variance, 0.0))
+        if goal == 'explore':
+            score = std
+        else:
+            score = expected_improvement(sign * mean, std, float(np.max(sign * y)))
+        score[picks] = -np.inf
+        j = int(np.argmax(score))
+        if not picks:
+            first_score = float(score[j]) / scale
+        picks.append(j)
+        if variance[j] <= 0:
+            break
+        # Kriging believer: the pick's value is assumed known, which shrinks nearby variance
+        column = model.covariance(candidates, candidates[j])
+        for f in factors:
+            column = column - f[j] * f
+        f = column / np.sqrt(variance[j])
+        factors.append(f)
+        variance = variance - f ** 2
+    return picks, first_score
+
+
+def _generate(request: AdaptiveDesignRequest) -> Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]:
+    def evaluate(matrix: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return generator.generate_batch(GenerationRequest(matrix=matrix, context=request.context,
+                                                          mock=request.mock)).data
+    return evaluate
+
+def _responses(rows: List[Dict[str, Any]], key: str) -> np.ndarray:
+    values = []
+    for row in rows:
+        try:
+            values.append(float(row.get(key)))
+        except (TypeError, ValueError):
+            values.append(np.nan)  # Failed or unparsable generation
+    return np.array(values, dtype=float)
+
+
+def run_adaptive_design(request: AdaptiveDesignRequest,
+                        evaluate: Optional[Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]] = None
+                        ) -> AdaptiveDesignResponse:
+    """
+    Runs the adaptive loop. `evaluate` maps design rows to result rows carrying the response
+    (defaults to the synthetic generator).
+    """
+    start_time = time.time()
+    variables = request.variables
+    if not variables or any(v.type != 'continuous' for v in variables):
+        raise ValueError("Adaptive design supports continuous variables only.")
+    if any(v.max <= v.min for v in variables):
+        raise ValueError("Every variable needs max > min.")
+    evaluate = evaluate or _generate(request)
+    tolerance = request.tolerance or DEFAULT_TOLERANCE[request.goal]
+    names = [v.name for v in variables]
+    lower = np.array([v.min for v in variables])
+    upper = np.array([v.max for v in variables])
+    k = len(variables)
+
+    if request.surrogate == 'quadratic':
+        model = QuadraticSurface(k)
+        needed = model.num_coef + 1
+    else:
+        model = GaussianProcess()  # Refitted each round, starting from the last hyperparameters
+        needed = max(2 * k + 2, 5)
+    initial = min(request.initial_samples or needed, request.max_samples)
+    if request.surrogate == 'quadratic' and initial < needed:
+        raise ValueError(f"A quadratic surface in {k} factors needs at least {needed} initial samples.")
+
+    frame = build_design_frame(DesignRequest(strategy='lhc', num_samples=initial, variables=variables,
+                                             seed=request.seed))
+    rows = [{**row, "iteration": 0} for row in evaluate(frame.to_dict(orient='records'))]
+    x = frame[names].to_numpy(dtype=float)
+    y = _responses(rows, request.response)
+
+    rng = np.random.default_rng(request.seed)
+    iterations: List[AdaptiveIteration] = []
+    stop_reason = 'budget'
+    iteration = 0
+    while True:
+        observed = np.isfinite(y)
+        if observed.sum() < 3:
+            raise ValueError(f"Fewer than 3 usable {request.response!r} values were generated.")
+        z = (x[observed] - lower) / (upper - lower)
+        with stage("adaptive", "fit"):
+            model.fit(z, y[observed])
+            loo = model.loo_residuals()
+        y_std = float(y[observed].std()) or 1.0
+
+        remaining = request.max_samples - len(rows)
+        with stage("adaptive", "select"):
+            candidates = sobol_sample(k, request.num_candidates, int(rng.integers(2 ** 31)))
+            picks, score = select_batch(model, candidates, max(1, min(request.batch_size, remaining)),
+                                        request.goal, y[observed])
+        converged = score < tolerance
+        new_samples = 0 if converged or remaining <= 0 else len(picks)
+        iterations.append(AdaptiveIteration(
+            iteration=iteration,
+            num_samples=int(observed.sum()),
+            loo_error=float(np.sqrt(np.mean(loo ** 2)) / y_std),
+            score=score,
+            new_samples=new_samples,
+        ))
+        if converged:
+            stop_reason = 'converged'
+            break
+        if remaining <= 0:
+            break
+
+        iteration += 1
+        points = np.round(lower + candidates[picks] * (upper - lower), 4)
+        batch = evaluate([dict(zip(names, p.tolist())) for p in points])
+        rows.extend({**row, "iteration": iteration} for row in batch)
+        x = np.vstack([x, points])
+        y = np.concatenate([y, _responses(batch, request.response)])
+
+    best = None
+    if request.goal != 'explore' and np.isfinite(y).any():
+        index = int(np.nanargmax(y) if request.goal == 'maximize' else np.nanargmin(y))
+        best = rows[index]
+    return AdaptiveDesignResponse(
+        data=rows,
+        iterations=iterations,
+        converged=stop_reason == 'converged',
+        stop_reason=stop_reason,
+        num_generated=len(rows),
+        best=best,
+        total_time=time.time() - start_time,
+    )
@@ -0,0 +1,83 @@
+"""
+Binary transport for numeric arrays.
+
+Request fields typed FloatArray accept either a JSON list of numbers or a base64 string of
+little-endian float64 bytes. The base64 form is decoded with np.frombuffer, so large series
+skip per-element JSON parsing and Pydantic float validation.
+
+Response fields typed EncodedFloats are plain JSON lists unless the response is dumped with
+context={"array_encoding": "base64"}, in which case they are sent as base64 float64 strings.
+"""
+from typing import Annotated, Any, List, Union
+import base64
+import binascii
+import numpy as np
+from pydantic import PlainValidator, PlainSerializer, SerializationInfo, WithJsonSchema
+
+FLOAT64_LE = np.dtype('<f8')
+BASE64 = "base64"
+
+
+def decode_float64(payload: Union[bytes, bytearray, memoryview, str]) -> np.ndarray:
+    """
+    Read-only float64 view of raw little-endian bytes (or their base64 text).
+    """
+    if isinstance(payload, str):
+        try:
+            payload = base64.b64decode(payload, validate=True)
+        except binascii.Error:
+            raise ValueError("Array payload is not valid base64.")
+    if len(payload) % FLOAT64_LE.itemsize:
+        raise ValueError(f"Binary array length {len(payload)} is not a multiple of 8 bytes (float64).")
+    return np.frombuffer(payload, dtype=FLOAT64_LE)
+
+
+def encode_float64(values: Any) -> str:
+    """Base64 of the values as little-endian float64 bytes"""
+    return base64.b64encode(np.ascontiguousarray(values, dtype=FLOAT64_LE).tobytes()).decode("ascii")
+
+
+def wants_base64(info: SerializationInfo) -> bool:
+    return isinstance(info.context, dict) and info.context.get("array_encoding") == BASE64
+
+
+def _to_array(value: Any) -> np.ndarray:
+    if isinstance(value, (str, bytes, bytearray, memoryview)):
+        return decode_float64(value)
+    try:
+        array = np.asarray(value, dtype=float)
+    except (TypeError, ValueError):
+        raise ValueError("Expected a list of numbers or a base64 float64 string.")
+    if array.ndim != 1:
+        raise ValueError("Expected a one-dimensional array.")
+    return array
+
+
+def _serialize_array(value: Any) -> List[float]:
+    return np.asarray(value, dtype=float).tolist()
+
+
+def _serialize_encoded(value: Any, info: SerializationInfo) -> Union[List[float], str]:
+    return encode_float64(value) if wants_base64(info) else list(value)
+
+
+_ARRAY_SCHEMA = {
+    "anyOf": [
+        {"type": "array", "items": {"type": "number"}},
+        {"type": "string", "contentEncoding": "base64", "description": "Little-endian float64 bytes"}
+    ]
+}
+
+# Request side: a 1-D float64 ndarray, from a JSON list or base64 bytes
+FloatArray = Annotated[
+    Any,
+    PlainValidator(_to_array),
+    PlainSerializer(_serialize_array, return_type=List[float]),
+    WithJsonSchema(_ARRAY_SCHEMA)
+]
+
+# Response side: List[float] that can be sent as base64 on request
+EncodedFloats = Annotated[
+    List[float],
+    PlainSerializer(_serialize_encoded, return_type=Union[List[float], str], when_used="json")
+]
@@ -0,0 +1,153 @@
+"""
+Dataset Store: upload a table once, then reference it by id from any analysis request.
+
+Each dataset is a directory of per-column .npy files plus a manifest, so columns are
+read with np.load(mmap_mode='r') instead of being re-sent and re-parsed as JSON.
+"""
+from __future__ import annotations
+from typing import List, Dict, Any, Optional
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import uuid
+import numpy as np
+from pydantic import BaseModel
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+DATASET_DIR = os.getenv("DATASET_DIR", os.path.join(tempfile.gettempdir(), "synthetic-doe-datasets"))
+_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ColumnInfo(BaseModel):
+    name: str
+    dtype: str  # 'float64', 'int64', 'bool', 'datetime64[ns]' or 'category'
+
+
+class DatasetInfo(BaseModel):
+    dataset_id: str
+    n_rows: int
+    columns: List[ColumnInfo]
+
+
+def _dataset_path(dataset_id: str) -> str:
+    if not _ID_PATTERN.match(dataset_id or ""):
+        raise ValueError(f"Invalid dataset id: {dataset_id!r}")
+    path = os.path.join(DATASET_DIR, dataset_id)
+    if not os.path.isdir(path):
+        raise ValueError(f"Dataset not found: {dataset_id}")
+    return path
+
+
+def read_table(content: bytes, filename: str = "", fmt: Optional[str] = None) -> pd.DataFrame:
+    """Parses an uploaded CSV, JSON (records or column -> values) or Parquet file"""
+    fmt = (fmt or os.path.splitext(filename)[1].lstrip(".") or "csv").lower()
+    if fmt == "csv":
+        return pd.read_csv(io.BytesIO(content))
+    if fmt == "json":
+        parsed = json.loads(content)
+        return pd.DataFrame.from_records(parsed) if isinstance(parsed, list) else pd.DataFrame(parsed)
+    if fmt in ("parquet", "pq"):
+        try:
+            return pd.read_parquet(io.BytesIO(content))
+        except ImportError:
+            raise ImportError(
+                "pyarrow library is not installed. "
+                "For Parquet uploads, please install pyarrow (pip install pyarrow)."
+            )
+    raise ValueError(f"Unsupported dataset format: {fmt}")
+
+
+def save_dataset(df: pd.DataFrame) -> DatasetInfo:
+    """Writes every column as its own .npy file; text columns become category codes"""
+    dataset_id = uuid.uuid4().hex
+    path = os.path.join(DATASET_DIR, dataset_id)
+    os.makedirs(path)
+
+    columns = []
+    try:
+        for i, name in enumerate(df.columns):
+            series = df[name]
+            entry = {"name": str(name), "file": f"col_{i}.npy"}
+            if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+                array = series.to_numpy()
+                entry["dtype"] = str(array.dtype) if array.dtype.kind in "bi" else "float64"
+                array = array.astype(entry["dtype"])
+            elif pd.api.types.is_datetime64_any_dtype(series):
+                entry["dtype"] = "datetime64[ns]"
+                array = series.to_numpy(dtype="datetime64[ns]").view("int64")
+            else:
+                entry["dtype"] = "category"
+                codes, categories = pd.factorize(series.astype("string"), use_na_sentinel=True)
+                array = codes.astype(np.int32)
+                entry["categories"] = [str(c) for c in categories]
+            np.save(os.path.join(path, entry["file"]), np.ascontiguousarray(array))
+            columns.append(entry)
+
+        manifest = {"dataset_id": dataset_id, "n_rows": len(df), "columns": columns}
+        with open(os.path.join(path, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+    except Exception:
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+
+    return get_dataset_info(dataset_id)
+
+
+def _manifest(dataset_id: str) -> Dict[str, Any]:
+    with open(os.path.join(_dataset_path(dataset_id), "manifest.json")) as f:
+        return json.load(f)
+
+
+def get_dataset_info(dataset_id: str) -> DatasetInfo:
+    manifest = _manifest(dataset_id)
+    return DatasetInfo(
+        dataset_id=dataset_id,
+        n_rows=manifest["n_rows"],
+        columns=[ColumnInfo(name=c["name"], dtype=c["dtype"]) for c in manifest["columns"]]
+    )
+
+
+def delete_dataset(dataset_id: str) -> None:
+    shutil.rmtree(_dataset_path(dataset_id))
+
+
+def _load(path: str, entry: Dict[str, Any], rows: Optional[int]):
+    array = np.load(os.path.join(path, entry["file"]), mmap_mode="r")
+    if rows is not None:
+        array = array[:rows]
+    if entry["dtype"] == "category":
+        return pd.Categorical.from_codes(np.asarray(array), categories=entry["categories"])
+    if entry["dtype"] == "datetime64[ns]":
+        return np.asarray(array).view("datetime64[ns]")
+    return array
+
+
+def load_float_column(dataset_id: str, column: str) -> np.ndarray:
+    """Numeric column as float64 (a read-only memory map when it is stored as float64)"""
+    return np.asarray(load_column(dataset_id, column), dtype=float)
+
+
+def load_column(dataset_id: str, column: str) -> np.ndarray:
+    """Memory-mapped numeric column (read-only); text columns come back as an object array"""
+    path = _dataset_path(dataset_id)
+    for entry in _manifest(dataset_id)["columns"]:
+        if entry["name"] == column:
+            values = _load(path, entry, None)
+            return np.asarray(values, dtype=object) if entry["dtype"] == "category" else values
+    raise ValueError(f"Column {column!r} not found in dataset {dataset_id}")
+
+
+def load_dataset(dataset_id: str, columns: Optional[List[str]] = None, rows: Optional[int] = None) -> pd.DataFrame:
+    """DataFrame of the requested columns (all by default), optionally only the first rows"""
+    path = _dataset_path(dataset_id)
+    entries = _manifest(dataset_id)["columns"]
+    if columns is not None:
+        wanted = set(columns)
+        entries = [e for e in entries if e["name"] in wanted]
+    # copy=False keeps numeric columns as views of the memory-mapped files
+    return pd.DataFrame({e["name"]: _load(path, e, rows) for e in entries}, copy=False)
@@ -1,9 +1,14 @@
-
-from typing import List, Dict, Union, Literal
+from __future__ import annotations
+from typing import List, Dict, Union, Literal, Optional, Tuple
 import numpy as np
-import pandas as pd
-from scipy.stats import qmc
 from pydantic import BaseModel, Field
+from .tables import TableFormat, frame_to_columns, frame_to_binary
+from .metrics import stage
+from .singleflight import single_flight
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+qmc = lazy_import("scipy.stats.qmc")
 
 class Variable(BaseModel):
     """
@@ -20,10 +25,33 @@ class DesignRequest(BaseModel):
     """
     Request model for generating a design matrix.
     """
-    strategy: Literal['lhc', 'factorial', 'random'] = 'lhc'
-    num_samples: int = Field(10, ge=1, description="Number of samples for Space-Filling algorithms")
+    strategy: Literal['lhc', 'factorial', 'random', 'sobol', 'saltelli'] = 'lhc'
+    num_samples: int = Field(10, ge=1, description="Number of samples for Space-Filling algorithms "
+                                                   "(base samples N for 'saltelli', which makes N * (k + 2) runs)")
     variables: List[Variable]
+    seed: Optional[int] = None # Reproducible sampling for lhc/sobol/saltelli/random
+    # 'columns' returns column -> values; 'arrow'/'parquet' return a binary table (pyarrow)
+    format: TableFormat = 'records'
     
+def sobol_sample(d: int, n: int, seed: Optional[int] = None) -> np.ndarray:
+    """
+    n scrambled Sobol' points in [0, 1)^d. Drawn as the next power of 2 and truncated, so
+    n itself should be a power of 2 for the sequence's balance properties.
+    """
+    sampler = qmc.Sobol(d=d, scramble=True, seed=seed)
+    return sampler.random_base2(int(np.ceil(np.log2(n))))[:n]
+
+def saltelli_sample(d: int, n: int, seed: Optional[int] = None) -> np.ndarray:
+    """
+    Saltelli design for Sobol indices in [0, 1)^d: blocks A, B, AB_1..AB_d of n rows each,
+    stacked in that order, where AB_i is A with column i taken from B.
+    """
+    base = sobol_sample(2 * d, n, seed)
+    a, b = base[:, :d], base[:, d:]
+    ab = np.repeat(a[np.newaxis], d, axis=0)
+    ab[np.arange(d), :, np.arange(d)] = b.T
+    return np.vstack([a, b, ab.reshape(d * n, d)])
+
 class DesignResponse(BaseModel):
     """
     Response model containing the design matrix.
@@ -31,20 +59,20 @@ class DesignResponse(BaseModel):
     strategy: str
     num_factors: int
     num_runs: int
-    matrix: List[Dict[str, Union[float, str]]] # Records format
+    matrix: List[Dict[str, Union[float, str]]] = [] # Records format
+    columns: Optional[Dict[str, List[Union[float, str]]]] = None # Columnar format
 
-def generate_design(request: DesignRequest) -> DesignResponse:
+def build_design_frame(request: DesignRequest) -> pd.DataFrame:
     """
-    Generates a Design of Experiments (DOE) matrix based on the strategy.
+    Builds the Design of Experiments (DOE) matrix as a DataFrame.
     
     Args:
         request: The design configuration including variables and strategy.
         
     Returns:
-        DesignResponse with the populated matrix.
+        DataFrame with one row per run and one column per factor.
     """
     variables = request.variables
-    n_vars = len(variables)
     
     # 1. Continuous Variables Handling
     continuous_vars = [v for v in variables if v.type == 'continuous']
@@ -58,7 +86,7 @@ def generate_design(request: DesignRequest) -> DesignResponse:
 
     if request.strategy == 'lhc':
         # Latin Hypercube Sampling (Space-Filling)
-        sampler = qmc.LatinHypercube(d=len(continuous_vars))
+        sampler = qmc.LatinHypercube(d=len(continuous_vars), seed=request.seed)
         sample = sampler.random(n=request.num_samples)
         
         # Scale samples to bounds
@@ -68,11 +96,19 @@ def generate_design(request: DesignRequest) -> DesignResponse:
 
     elif request.strategy == 'random':
         # Simple Random Sampling
+        # Without a seed, keep drawing from the global NumPy state (np.random.seed still applies)
+        rng = np.random if request.seed is None else np.random.default_rng(request.seed)
         data = {}
         for i, var in enumerate(continuous_vars):
-            data[var.name] = np.random.uniform(var.min, var.max, request.num_samples)
+            data[var.name] = rng.uniform(var.min, var.max, request.num_samples)
         df = pd.DataFrame(data)
 
+    elif request.strategy in ('sobol', 'saltelli'):
+        # Low-discrepancy Sobol' points, or the Saltelli blocks for POST /sensitivity
+        sampler = sobol_sample if request.strategy == 'sobol' else saltelli_sample
+        sample = sampler(len(continuous_vars), request.num_samples, request.seed)
+        df = pd.DataFrame(qmc.scale(sample, bounds_min, bounds_max), columns=names)
+
     elif request.strategy == 'factorial':
         import itertools
         
@@ -100,10 +136,51 @@ def generate_design(request: DesignRequest) -> DesignResponse:
     # Only round numeric columns
     numeric_cols = df.select_dtypes(include=[np.number]).columns
     df[numeric_cols] = df[numeric_cols].round(4)
+    return df
+
+@single_flight
+def generate_design(request: DesignRequest) -> DesignResponse:
+    """
+    Generates a Design of Experiments (DOE) matrix based on the strategy.
     
+    Args:
+        request: The design configuration including variables and strategy.
+        
+    Returns:
+        DesignResponse with the populated matrix (or columns).
+    """
+    with stage("doe", "sample"):
+        df = build_design_frame(request)
+    
+    with stage("doe", "serialize"):
+        if request.format == 'columns':
+            # Built straight from NumPy columns, so skip re-validating every value
+            return DesignResponse.model_construct(
+                strategy=request.strategy,
+                num_factors=len(request.variables),
+                num_runs=len(df),
+                matrix=[],
+                columns=frame_to_columns(df)
+            )
+        records = df.to_dict(orient='records')
     return DesignResponse(
         strategy=request.strategy,
-        num_factors=n_vars,
+        num_factors=len(request.variables),
         num_runs=len(df),
-        matrix=df.to_dict(orient='records')
+        matrix=records
     )
+
+@single_flight
+def generate_design_binary(request: DesignRequest) -> Tuple[bytes, str, int]:
+    """
+    Design matrix as an Arrow IPC stream or Parquet file (request.format).
+
+    Returns (body, media type, number of runs); serializing here keeps it in the
+    offloaded call instead of the async handler.
+    """
+    with stage("doe", "sample"):
+        df = build_design_frame(request)
+
+    with stage("doe", "serialize"):
+        body, media_type = frame_to_binary(df, request.format)
+    return body, media_type, len(df)
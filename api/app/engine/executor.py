@@ -0,0 +1,377 @@
+"""
+Execution layer for CPU-bound endpoints.
+
+Engine calls are submitted with offload(route, fn, *args), which enforces:
+- a global queue-depth limit (OFFLOAD_MAX_QUEUE): beyond it the call fails fast with Overloaded,
+  which the API turns into 503 + Retry-After
+- per-route concurrency caps and timeouts (ROUTE_POLICIES, overridable via OFFLOAD_ROUTE_LIMITS)
+- cancellation when the timeout passes or the client disconnects
+
+With OFFLOAD_WORKERS > 0 the work runs in dedicated worker processes, so it no longer holds
+the web process's GIL, and cancelling a running task kills (and later replaces) its worker.
+With OFFLOAD_WORKERS=0 (the default, e.g. serverless) the same limits apply but the work runs
+on a bounded thread pool, where a task that already started cannot be interrupted.
+
+Worker processes have their own metrics registry: the engine stages a task times there are
+sent back with its result and replayed into the web process's metrics and request profile.
+Modules that need per-worker setup (e.g. pre-importing the forecasting libraries, since
+forecasts run in-process inside a worker) register it with register_worker_initializer().
+"""
+from typing import Any, Callable, Dict, List, Optional, Awaitable
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+import contextvars
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from .metrics import Counter, Gauge, capture_stages, replay_stages
+from .singleflight import call_key, SHARED
+
+OFFLOAD_WORKERS = int(os.getenv("OFFLOAD_WORKERS", "0"))
+OFFLOAD_MAX_QUEUE = int(os.getenv("OFFLOAD_MAX_QUEUE", "64"))
+POLL_INTERVAL = 0.05
+
+
+class RoutePolicy:
+    def __init__(self, timeout: float, max_concurrency: int):
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+
+
+# Defaults per route; OFFLOAD_ROUTE_LIMITS='{"/arima": {"timeout": 60, "max_concurrency": 1}}' overrides
+DEFAULT_POLICIES = {
+    "/design": (30.0, 4),
+    "/spc": (60.0, 4),
+    "/spc/multivariate": (60.0, 4),
+    "/sensitivity": (60.0, 4),
+    "/stats/estimation": (30.0, 4),
+    "/stats/effect-size": (30.0, 4),
+    "/stats/advanced": (30.0, 4),
+    "/arima": (120.0, 2),
+    "/prophet": (180.0, 2),
+    "/forecast/lite": (60.0, 4),
+}
+DEFAULT_ROUTE_POLICY = (60.0, 4)
+
+
+def _load_policies() -> Dict[str, RoutePolicy]:
+    limits = {route: {"timeout": t, "max_concurrency": c} for route, (t, c) in DEFAULT_POLICIES.items()}
+    for route, override in json.loads(os.getenv("OFFLOAD_ROUTE_LIMITS", "{}") or "{}").items():
+        limits[route] = {**limits.get(route, {"timeout": DEFAULT_ROUTE_POLICY[0],
+                                             "max_concurrency": DEFAULT_ROUTE_POLICY[1]}), **override}
+    return {route: RoutePolicy(float(v["timeout"]), int(v["max_concurrency"])) for route, v in limits.items()}
+
+
+ROUTE_POLICIES = _load_policies()
+_policies_lock = threading.Lock()
+
+
+def route_policy(route: str) -> RoutePolicy:
+    with _policies_lock:
+        if route not in ROUTE_POLICIES:
+            ROUTE_POLICIES[route] = RoutePolicy(*DEFAULT_ROUTE_POLICY)
+        return ROUTE_POLICIES[route]
+
+
+class Overloaded(Exception):
+    """Queue is full; the caller should retry later"""
+
+
+class OffloadTimeout(Exception):
+    """The task did not finish within its route's timeout"""
+
+
+class Cancelled(Exception):
+    """The task was cancelled (client disconnected)"""
+
+
+QUEUE_DEPTH = Gauge("offload_queue_depth", "Offloaded tasks waiting or running")
+RUNNING = Gauge("offload_running", "Offloaded tasks running", ("route",))
+REJECTED = Counter("offload_rejected", "Tasks rejected with 503 because the queue was full", ("route",))
+CANCELLED = Counter("offload_cancelled", "Tasks cancelled by timeout or client disconnect", ("route", "reason"))
+
+
+# --- Worker processes ---
+
+_in_worker = False
+_worker_initializers: List[Callable[[], None]] = []
+
+
+def in_offload_worker() -> bool:
+    """True inside an offload worker process (nested pools should stay in-process there)"""
+    return _in_worker
+
+
+def register_worker_initializer(fn: Callable[[], None]) -> None:
+    """Runs fn() in every offload worker process before it accepts tasks"""
+    if fn not in _worker_initializers:
+        _worker_initializers.append(fn)
+
+
+def _worker_main(conn, initializers: List[Callable[[], None]]) -> None:
+    global _in_worker
+    _in_worker = True
+    for initializer in initializers:
+        try:
+            initializer()
+        except Exception:
+            pass  # A failed warm-up only costs speed; the task reports real errors
+    while True:
+        try:
+            fn, args = conn.recv()
+        except (EOFError, OSError):
+            return
+        # Stages timed here are sent back so the web process can count them
+        with capture_stages() as stages:
+            try:
+                result = (True, fn(*args))
+            except Exception as e:
+                result = (False, e)
+        try:
+            conn.send(result + (stages,))
+        except Exception as e:
+            # Unpicklable result or exception
+            conn.send((False, RuntimeError(f"{type(e).__name__}: {e}"), stages))
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, list(_worker_initializers)), daemon=True)
+        self.process.start()
+        child.close()
+
+    def run(self, fn: Callable, args: tuple, cancel: threading.Event) -> Any:
+        self.conn.send((fn, args))
+        while not self.conn.poll(POLL_INTERVAL):
+            if cancel.is_set():
+                self.kill()
+                raise Cancelled()
+            if not self.process.is_alive():
+                raise RuntimeError(f"Worker process exited with code {self.process.exitcode}")
+        ok, value, stages = self.conn.recv()
+        # Runs on the dispatcher thread, inside the request's copied context
+        replay_stages(stages)
+        if ok:
+            return value
+        raise value
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive() and not self.conn.closed
+
+
+def _discard_result(future: "asyncio.Future") -> None:
+    # Nobody awaits an abandoned task any more; retrieve its outcome so it is not logged
+    if not future.cancelled():
+        future.exception()
+
+
+class OffloadPool:
+    """
+    Fixed-size pool of worker processes (workers > 0) or in-thread execution (workers == 0),
+    fed by a bounded dispatcher thread pool.
+    """
+    def __init__(self, workers: int = OFFLOAD_WORKERS, max_queue: int = OFFLOAD_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._dispatch = ThreadPoolExecutor(max_workers=max_queue, thread_name_prefix="offload")
+        self._idle: "queue.LifoQueue[_Worker]" = queue.LifoQueue()
+        self._spawned = 0
+        self._context = multiprocessing.get_context()
+        self._pid = os.getpid()
+        self._inflight: Dict[str, Future] = {}
+
+    def _acquire_worker(self, cancel: threading.Event, deadline: float) -> _Worker:
+        while True:
+            with self._lock:
+                if self._idle.empty() and self._spawned < self.workers:
+                    self._spawned += 1
+                    spawn = True
+                else:
+                    spawn = False
+            if spawn:
+                try:
+                    return _Worker(self._context)
+                except Exception:
+                    with self._lock:
+                        self._spawned -= 1
+                    raise
+            try:
+                worker = self._idle.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if cancel.is_set() or time.monotonic() > deadline:
+                    raise Cancelled()
+                continue
+            if worker.alive:
+                return worker
+            with self._lock:
+                self._spawned -= 1
+
+    def prestart(self) -> None:
+        """Spawns every worker now, so their initializers run before the first task arrives"""
+        while True:
+            with self._lock:
+                if self._spawned >= self.workers:
+                    return
+                self._spawned += 1
+            try:
+                self._idle.put(_Worker(self._context))
+            except Exception:
+                with self._lock:
+                    self._spawned -= 1
+                raise
+
+    def _release_worker(self, worker: _Worker) -> None:
+        if worker.alive:
+            self._idle.put(worker)
+        else:
+            with self._lock:
+                self._spawned -= 1
+
+    def _execute(self, route: str, fn: Callable, args: tuple, cancel: threading.Event, deadline: float) -> Any:
+        """Blocking part, on a dispatcher thread: wait for a route slot and a worker, then run"""
+        policy = route_policy(route)
+        while not policy.slots.acquire(timeout=POLL_INTERVAL):
+            if cancel.is_set() or time.monotonic() > deadline:
+                raise Cancelled()
+        RUNNING.inc(route=route)
+        try:
+            if self.workers <= 0:
+                if cancel.is_set():
+                    raise Cancelled()
+                return fn(*args)
+            worker = self._acquire_worker(cancel, deadline)
+            try:
+                return worker.run(fn, args, cancel)
+            finally:
+                self._release_worker(worker)
+        finally:
+            RUNNING.dec(route=route)
+            policy.slots.release()
+
+    async def run(self, route: str, fn: Callable, *args: Any,
+                  is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+                  coalesce: bool = False) -> Any:
+        """
+        With coalesce, identical concurrent calls (same fn and canonical args) wait on the
+        first one instead of queueing work of their own. This also covers worker processes,
+        where the engine-level single-flight cannot see calls running in other workers.
+        """
+        if not coalesce:
+            return await self._run(route, fn, args, is_disconnected)
+
+        key = call_key(fn, args)
+        with self._lock:
+            shared = self._inflight.get(key)
+            leader = shared is None
+            if leader:
+                shared = self._inflight[key] = Future()
+                shared.followers = 0
+            else:
+                shared.followers += 1
+
+        if not leader:
+            SHARED.inc(function=route)
+            try:
+                # shield: a follower timing out must not cancel the leader's future
+                return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(shared)), route_policy(route).timeout)
+            except asyncio.TimeoutError:
+                raise OffloadTimeout(f"{route} did not finish within {route_policy(route).timeout:g}s.")
+
+        async def leader_disconnected() -> bool:
+            # Keep computing while other clients wait on this result
+            return shared.followers == 0 and is_disconnected is not None and await is_disconnected()
+
+        try:
+            result = await self._run(route, fn, args, leader_disconnected)
+            shared.set_result(result)
+            return result
+        except BaseException as e:
+            shared.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    async def _run(self, route: str, fn: Callable, args: tuple,
+                   is_disconnected: Optional[Callable[[], Awaitable[bool]]]) -> Any:
+        with self._lock:
+            if self.pending >= self.max_queue:
+                REJECTED.inc(route=route)
+                raise Overloaded(f"Server busy: {self.pending} tasks queued. Retry later.")
+            self.pending += 1
+        QUEUE_DEPTH.inc()
+
+        timeout = route_policy(route).timeout
+        deadline = time.monotonic() + timeout
+        cancel = threading.Event()
+        try:
+            # Copy the context so in-thread stages still report to the request's profile
+            context = contextvars.copy_context()
+            future = asyncio.wrap_future(
+                self._dispatch.submit(context.run, self._execute, route, fn, args, cancel, deadline)
+            )
+            while True:
+                remaining = deadline - time.monotonic()
+                done, _ = await asyncio.wait({future}, timeout=max(0.0, min(0.25, remaining)))
+                if done:
+                    return future.result()
+                if time.monotonic() >= deadline:
+                    cancel.set()
+                    future.add_done_callback(_discard_result)
+                    CANCELLED.inc(route=route, reason="timeout")
+                    raise OffloadTimeout(f"{route} did not finish within {timeout:g}s.")
+                if is_disconnected is not None and await is_disconnected():
+                    cancel.set()
+                    future.add_done_callback(_discard_result)
+                    CANCELLED.inc(route=route, reason="disconnect")
+                    raise Cancelled()
+        finally:
+            with self._lock:
+                self.pending -= 1
+            QUEUE_DEPTH.dec()
+
+    def shutdown(self) -> None:
+        while not self._idle.empty():
+            self._idle.get().kill()
+        self._dispatch.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: Optional[OffloadPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_offload_pool() -> OffloadPool:
+    global _pool
+    with _pool_lock:
+        # A forked server process must not reuse its parent's workers
+        if _pool is None or _pool._pid != os.getpid():
+            _pool = OffloadPool()
+        return _pool
+
+
+async def offload(route: str, fn: Callable, *args: Any,
+                  is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+                  coalesce: bool = False) -> Any:
+    """Runs fn(*args) under the route's concurrency cap and timeout; see module docstring"""
+    return await get_offload_pool().run(route, fn, *args, is_disconnected=is_disconnected, coalesce=coalesce)
+
+
+def shutdown_offload_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool._pid == os.getpid():
+            _pool.shutdown()
+        _pool = None
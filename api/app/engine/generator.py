@@ -1,31 +1,58 @@
 
 import os
 import time
-from typing import List, Dict, Any
-from pydantic import BaseModel
+from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, model_validator
 import random
+from .tables import TableFormat
+from .metrics import stage
+from .singleflight import single_flight
+from .lazy import lazy_import
 
-# Attempt to import OpenAI, allow fallback if not configured
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
+openai = lazy_import("openai")
 
 class GenerationRequest(BaseModel):
-    matrix: List[Dict[str, Any]]
+    matrix: List[Dict[str, Any]] = []
+    columns: Optional[Dict[str, List[Any]]] = None # Columnar alternative to matrix (e.g. a columnar /design)
     context: str = "Generate a scientific observation log based on these conditions."
     mock: bool = False
+    # 'columns' returns column -> values; 'arrow'/'parquet' return a binary table (pyarrow)
+    format: TableFormat = 'records'
+
+    @model_validator(mode='after')
+    def _check_column_lengths(self):
+        if self.columns and len({len(values) for values in self.columns.values()}) > 1:
+            raise ValueError("All columns must have the same length.")
+        return self
 
 class GenerationResponse(BaseModel):
-    data: List[Dict[str, Any]]
+    data: List[Dict[str, Any]] = []
+    columns: Optional[Dict[str, List[Any]]] = None
     total_time: float
 
+def _set_cells(columns: Dict[str, List[Any]], index: int, fields: Dict[str, Any], n_rows: int) -> None:
+    """Writes one row's fields into column lists, adding a None-filled column for a new field"""
+    for key, value in fields.items():
+        column = columns.get(key)
+        if column is None:
+            column = columns[key] = [None] * n_rows
+        column[index] = value
+
 class SyntheticGenerator:
     def __init__(self):
         self.api_key = os.getenv("OPENAI_API_KEY")
-        self.client = None
-        if self.api_key and OpenAI:
-            self.client = OpenAI(api_key=self.api_key)
+        self._client = None
+
+    @property
+    def client(self):
+        # The OpenAI SDK is slow to import, so the client is created on the first live call
+        if self._client is None and self.api_key:
+            try:
+                self._client = openai.OpenAI(api_key=self.api_key)
+            except ImportError:
+                # Allow fallback to mock generation if the SDK is not installed
+                self.api_key = None
+        return self._client
 
     def generate_row(self, row: Dict[str, Any], context: str, mock: bool = False) -> str:
         """
@@ -55,70 +82,81 @@ class SyntheticGenerator:
             Example: {{"Response": 98.2, "Observation": "Clear solution, rapid dissolution."}}
             """
             
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are a specialized synthetic data generator engine. You output valid JSON only."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=150,
-                response_format={"type": "json_object"}
-            )
+            with stage("generator", "llm_wait"):
+                response = self.client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[
+                        {"role": "system", "content": "You are a specialized synthetic data generator engine. You output valid JSON only."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.7,
+                    max_tokens=150,
+                    response_format={"type": "json_object"}
+                )
             return response.choices[0].message.content.strip()
         except Exception as e:
             return f'{{"Response": 0.0, "Observation": "[ERROR] Generation failed: {str(e)}"}}'
 
+    @single_flight
     def generate_batch(self, request: GenerationRequest) -> GenerationResponse:
         start_time = time.time()
-        results = []
-        
+
+        # Columnar input stays columnar: a row's conditions are only assembled for its prompt
+        if request.columns and not request.matrix:
+            names = list(request.columns)
+            n_rows = len(next(iter(request.columns.values())))
+            row_at = lambda i: {name: request.columns[name][i] for name in names}
+        else:
+            n_rows = len(request.matrix)
+            row_at = lambda i: request.matrix[i]
+
         from concurrent.futures import ThreadPoolExecutor, as_completed
 
+        # Fields generated for each row, by row index
+        generated: List[Dict[str, Any]] = [{} for _ in range(n_rows)]
+
         # Parallel execution for faster batch generation
         with ThreadPoolExecutor(max_workers=10) as executor:
-            # Add index to results to maintain original order
-            future_to_index = {executor.submit(self.generate_row, row, request.context, request.mock): i for i, row in enumerate(request.matrix)}
-            
-            # Temporary list to store (index, result)
-            indexed_results = []
-            
+            future_to_index = {executor.submit(self.generate_row, row_at(i), request.context, request.mock): i for i in range(n_rows)}
+
             for future in as_completed(future_to_index):
                 index = future_to_index[future]
-                row = request.matrix[index]
                 try:
                     generated_content = future.result()
-                    # Merge the original conditions with the generated output
-                    result_row = row.copy()
-                    
+
                     # Parse JSON and flatten
                     try:
                         import json
-                        data = json.loads(generated_content)
-                        result_row.update(data)
-                        result_row['synthetic_output'] = data.get("Observation", str(data))
+                        with stage("generator", "parse"):
+                            data = json.loads(generated_content)
+                        generated[index] = {**data, 'synthetic_output': data.get("Observation", str(data))}
                     except:
-                         result_row['synthetic_output'] = generated_content
-                         
-                    indexed_results.append((index, result_row))
+                        generated[index] = {'synthetic_output': generated_content}
                 except Exception as exc:
                     # Handle individual row failure
-                    error_row = row.copy()
-                    error_row['synthetic_output'] = f"[ERROR] {str(exc)}"
-                    indexed_results.append((index, error_row))
-        
-        # Sort results based on the original index
-        indexed_results.sort(key=lambda x: x[0])
-        results = [item[1] for item in indexed_results]
-        
-            
+                    generated[index] = {'synthetic_output': f"[ERROR] {str(exc)}"}
+
         end_time = time.time()
-        
+
+        if request.format != 'records':
+            # Generated fields become columns of their own; rows lacking a field get None
+            if request.columns and not request.matrix:
+                columns = {name: list(values) for name, values in request.columns.items()}
+            else:
+                columns = {}
+                for i, row in enumerate(request.matrix):
+                    _set_cells(columns, i, row, n_rows)
+            for i, fields in enumerate(generated):
+                _set_cells(columns, i, fields, n_rows)
+            return GenerationResponse(columns=columns, total_time=end_time - start_time)
+
+        # Merge the original conditions with the generated output
         return GenerationResponse(
-            data=results,
+            data=[{**row_at(i), **generated[i]} for i in range(n_rows)],
             total_time=end_time - start_time
         )
 
+    @single_flight
     def generate_report_analysis(self, context: str, results: List[Dict[str, Any]], mock: bool = False) -> str:
         """
         Generates a statistical expert analysis summary based on the experiment results.
@@ -168,15 +206,16 @@ class SyntheticGenerator:
             Language: Korean (한국어) ONLY.
             """
             
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are a Chief Statistician. Output valid HTML content only (no markdown code blocks). Write in Korean."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000 
-            )
+            with stage("analysis", "llm_wait"):
+                response = self.client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[
+                        {"role": "system", "content": "You are a Chief Statistician. Output valid HTML content only (no markdown code blocks). Write in Korean."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.7,
+                    max_tokens=2000 
+                )
             return response.choices[0].message.content.strip()
         except Exception as e:
             return f"<p>Analysis generation failed: {str(e)}</p>"
@@ -0,0 +1,136 @@
+"""
+Deferred imports for heavy libraries, so cold starts (Vercel, the desktop bundle) only pay
+for what the first request actually uses.
+
+    pd = lazy_import("pandas")
+
+binds a proxy that imports pandas on first attribute access; after that it costs one extra
+attribute lookup. How long each deferred import took, and what triggered it, is kept for
+the startup report (GET /startup, or `python -m app.engine.lazy` for a fresh process).
+
+With PRELOAD_MODULES=1 the app imports every deferred module on a background thread once it
+has started, so long-running servers warm up without delaying the first response.
+"""
+from typing import Any, Dict, List, Optional
+import importlib
+import os
+import sys
+import threading
+import time
+from .metrics import Gauge
+
+PRELOAD_MODULES = os.getenv("PRELOAD_MODULES", "0") == "1"
+PRELOAD_THREAD = "lazy-preload"
+
+IMPORT_SECONDS = Gauge("module_import_seconds", "Time spent importing deferred modules", ("module",))
+APP_IMPORT_SECONDS = Gauge("app_import_seconds", "Time spent importing app.main")
+
+_lock = threading.Lock()
+_registered: List[str] = []
+_loaded: Dict[str, Dict[str, Any]] = {}
+_app_import_seconds: Optional[float] = None
+_preload_thread: Optional[threading.Thread] = None
+
+
+def _load(name: str) -> Any:
+    if name in _loaded:
+        return sys.modules[name]
+    already = name in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    elapsed = time.perf_counter() - start
+    with _lock:
+        if name not in _loaded:
+            thread = threading.current_thread().name
+            _loaded[name] = {
+                "module": name,
+                # Marginal cost: whatever an earlier import already pulled in is not counted again
+                "seconds": 0.0 if already else elapsed,
+                "trigger": "preload" if thread == PRELOAD_THREAD else "first use",
+            }
+            IMPORT_SECONDS.set(_loaded[name]["seconds"], module=name)
+    return module
+
+
+class LazyModule:
+    """Stands in for a module until one of its attributes is first used"""
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def __getattr__(self, attr: str) -> Any:
+        module = self.__dict__["_module"]
+        if module is None:
+            module = self.__dict__["_module"] = _load(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    with _lock:
+        if name not in _registered:
+            _registered.append(name)
+    return LazyModule(name)
+
+
+def record_app_import(seconds: float) -> None:
+    global _app_import_seconds
+    _app_import_seconds = seconds
+    APP_IMPORT_SECONDS.set(seconds)
+
+
+def preload() -> None:
+    """Imports every registered module now (in registration order)"""
+    for name in list(_registered):
+        try:
+            _load(name)
+        except ImportError:
+            # Optional dependency; its route reports the error when used
+            continue
+
+
+def start_preload() -> Optional[threading.Thread]:
+    """With PRELOAD_MODULES=1, runs preload() on a daemon thread (once per process)"""
+    global _preload_thread
+    if not PRELOAD_MODULES:
+        return None
+    with _lock:
+        if _preload_thread is None:
+            _preload_thread = threading.Thread(target=preload, name=PRELOAD_THREAD, daemon=True)
+            _preload_thread.start()
+    return _preload_thread
+
+
+def startup_report() -> Dict[str, Any]:
+    with _lock:
+        loaded = sorted(_loaded.values(), key=lambda m: m["seconds"], reverse=True)
+        pending = [name for name in _registered if name not in _loaded]
+    return {
+        "app_import_seconds": _app_import_seconds,
+        "deferred_import_seconds": sum(m["seconds"] for m in loaded),
+        "preload": PRELOAD_MODULES,
+        "loaded": [dict(m) for m in loaded],
+        "pending": pending,
+    }
+
+
+def main() -> None:
+    """Cold-start report for this interpreter: app import time, then each deferred module"""
+    start = time.perf_counter()
+    import app.main  # noqa: F401
+    from app.engine import lazy  # The registry app.main used (this file runs as __main__)
+    print(f"{'app.main':<24} {(time.perf_counter() - start) * 1000:>9.1f} ms")
+    lazy.preload()
+    report = lazy.startup_report()
+    for entry in report["loaded"]:
+        print(f"{entry['module']:<24} {entry['seconds'] * 1000:>9.1f} ms")
+    for name in report["pending"]:
+        print(f"{name:<24} {'missing':>12}")
+    print(f"{'deferred total':<24} {report['deferred_import_seconds'] * 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
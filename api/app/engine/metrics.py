@@ -0,0 +1,319 @@
+"""
+In-process metrics in the Prometheus text exposition format, plus per-request profiling.
+
+No client library is required: the few metric types we need are implemented here and
+rendered by render_metrics() for the /metrics endpoint. Metrics are per process: offload
+workers (OFFLOAD_WORKERS > 0) and warm-pool forecasts (dispatch_forecast) collect their
+stages with capture_stages() and the web process adds them with replay_stages(), so they
+show up in engine_stage_duration_seconds and the request profile. Other forecast pool
+tasks (batch forecasts, backtest folds, order search fits) are not counted.
+"""
+from typing import Dict, List, Optional, Tuple, Sequence
+from collections import Counter as TallyCounter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import os
+import sys
+import threading
+import time
+import uuid
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+# X-Profile: 1 starts a stack sampler thread per request, so it is opt-in (PROFILING_ENABLED=1)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000.0
+PROFILE_HISTORY = int(os.getenv("PROFILE_HISTORY", "32"))
+
+
+def _label_text(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        header = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            return header + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}_total{_label_text(self.labelnames, k)} {_number(v)}" for k, v in self._values.items()]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_label_text(self.labelnames, k)} {_number(v)}" for k, v in self._values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, n = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value, n + 1)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, n) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, inf)} {n}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {n}")
+        return lines
+
+
+REGISTRY: List[Metric] = []
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route", "status"))
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled", ("route",))
+REQUEST_SIZE = Histogram(
+    "http_request_size_bytes", "Request body size (Content-Length)", ("route",), SIZE_BUCKETS)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Response body size (Content-Length)", ("route",), SIZE_BUCKETS)
+STAGE_SECONDS = Histogram(
+    "engine_stage_duration_seconds", "Time spent in engine stages", ("engine", "stage"))
+STAGE_ERRORS = Counter(
+    "engine_stage_errors", "Engine stages that raised", ("engine", "stage"))
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Per-request profiling ---
+
+class RequestProfile:
+    """
+    Stage timings plus a sampled stack profile of the threads the request's stages ran on.
+    """
+    def __init__(self, route: str, interval: float = PROFILE_INTERVAL):
+        self.id = uuid.uuid4().hex[:16]
+        self.route = route
+        self.interval = interval
+        self.stages: List[Tuple[str, float]] = []
+        self.samples: TallyCounter = TallyCounter()
+        self.n_samples = 0
+        self.duration = 0.0
+        self._threads = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name=f"profile-{self.id}", daemon=True)
+
+    def start(self) -> "RequestProfile":
+        self._started = time.perf_counter()
+        self._sampler.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._sampler.join()
+        self.duration = time.perf_counter() - self._started
+        _PROFILES.append(self)
+
+    def watch_current_thread(self) -> None:
+        with self._lock:
+            self._threads.add(threading.get_ident())
+
+    def record_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages.append((name, seconds))
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                threads = set(self._threads)
+            frames = sys._current_frames()
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+                self.n_samples += 1
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (shown by browser dev tools)"""
+        parts = [f"{name.replace('.', '-')};dur={seconds * 1000:.2f}" for name, seconds in self.stages]
+        return ", ".join(parts + [f"total;dur={self.duration * 1000:.2f}"])
+
+    def to_dict(self, top: int = 50) -> Dict[str, object]:
+        return {
+            "id": self.id,
+            "route": self.route,
+            "duration": self.duration,
+            "interval": self.interval,
+            "n_samples": self.n_samples,
+            "stages": [{"stage": name, "seconds": seconds} for name, seconds in self.stages],
+            # Collapsed stacks (flame graph input), heaviest first
+            "stacks": [{"stack": stack, "samples": count} for stack, count in self.samples.most_common(top)],
+        }
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+_PROFILES: "deque[RequestProfile]" = deque(maxlen=PROFILE_HISTORY)
+
+
+@contextmanager
+def profile_request(route: str):
+    """Profiles everything under this context (including threadpool handlers that copy the context)"""
+    profile = RequestProfile(route).start()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        profile.stop()
+
+
+def get_profile(profile_id: str) -> Optional[Dict[str, object]]:
+    for profile in list(_PROFILES):
+        if profile.id == profile_id:
+            return profile.to_dict()
+    return None
+
+
+# (engine, stage, seconds, failed) of stages timed while capture_stages() is active
+_captured: Optional[List[Tuple[str, str, float, bool]]] = None
+_captured_lock = threading.Lock()
+
+
+@contextmanager
+def capture_stages():
+    """
+    Collects the stages timed under this context, on any thread of this process, so that a
+    worker process can send them to the web process along with its result.
+    """
+    global _captured
+    records: List[Tuple[str, str, float, bool]] = []
+    with _captured_lock:
+        previous, _captured = _captured, records
+    try:
+        yield records
+    finally:
+        with _captured_lock:
+            _captured = previous
+
+
+def replay_stages(records: Sequence[Tuple[str, str, float, bool]]) -> None:
+    """Adds stages timed in another process to this process's metrics and the current request profile"""
+    profile = _current_profile.get()
+    for engine, name, seconds, failed in records:
+        if failed:
+            STAGE_ERRORS.inc(engine=engine, stage=name)
+        STAGE_SECONDS.observe(seconds, engine=engine, stage=name)
+        if profile is not None:
+            profile.record_stage(f"{engine}.{name}", seconds)
+
+
+@contextmanager
+def stage(engine: str, name: str):
+    """
+    Times an engine stage into engine_stage_duration_seconds (and the request profile, if any).
+    """
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.watch_current_thread()
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        STAGE_ERRORS.inc(engine=engine, stage=name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, engine=engine, stage=name)
+        if profile is not None:
+            profile.record_stage(f"{engine}.{name}", elapsed)
+        records = _captured
+        if records is not None:
+            with _captured_lock:
+                records.append((engine, name, elapsed, failed))
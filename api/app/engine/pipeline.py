@@ -0,0 +1,194 @@
+"""
+Server-side pipeline: runs a DAG of design -> generate -> SPC / sensitivity / stats / analysis stages
+on in-memory DataFrames and returns only the requested outputs.
+"""
+from __future__ import annotations
+from typing import List, Dict, Any, Optional, Literal
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import time
+import numpy as np
+from pydantic import BaseModel, Field
+
+from .doe import build_design_frame, DesignRequest
+from .generator import generator, GenerationRequest
+from .spc import analyze_spc, SPCAnalysisRequest
+from .sensitivity import analyze_sensitivity, SensitivityRequest
+from .stats import (
+    calculate_estimation, EstimationRequest,
+    calculate_effect_size, EffectSizeRequest,
+    calculate_advanced_estimation, AdvancedRequest
+)
+from .datasets import load_dataset
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+
+class PipelineStage(BaseModel):
+    """
+    One node of the pipeline.
+
+    params holds the stage's usual request fields, minus the data it receives from
+    its input stage (e.g. {"target_variable": "Response"} for spc, {"column": "Response"}
+    for estimation).
+    """
+    id: str
+    type: Literal['design', 'generate', 'spc', 'sensitivity', 'estimation', 'advanced', 'effect_size', 'analysis']
+    input: Optional[str] = None  # Upstream stage whose table this stage consumes
+    params: Dict[str, Any] = {}
+
+
+class PipelineRequest(BaseModel):
+    stages: List[PipelineStage]
+    outputs: List[str] = []  # Stage ids to return (default: every stage without dependents)
+    dataset_id: Optional[str] = None  # Table for stages with input="dataset"
+    max_workers: int = Field(4, ge=1, le=32)
+
+
+class PipelineResponse(BaseModel):
+    results: Dict[str, Any]
+    errors: Dict[str, str] = {}
+    timings: Dict[str, float] = {}  # Seconds per executed stage
+    total_time: float
+
+
+class StageOutput:
+    """What a stage hands downstream: an optional table plus its response model"""
+    def __init__(self, response: Any, table: Optional[pd.DataFrame] = None):
+        self.response = response
+        self.table = table
+
+
+def _column(table: pd.DataFrame, name: str) -> np.ndarray:
+    if name not in table.columns:
+        raise ValueError(f"Column {name!r} not found; available: {list(table.columns)}")
+    return pd.to_numeric(table[name], errors='coerce').dropna().to_numpy(dtype=float)
+
+
+def _run_stage(stage: PipelineStage, table: Optional[pd.DataFrame]) -> StageOutput:
+    """Executes one stage against the upstream table (None for source stages)"""
+    params = stage.params
+    if stage.type == 'design':
+        design = build_design_frame(DesignRequest(**params))
+        return StageOutput({"num_runs": len(design), "matrix": design.to_dict(orient='records')}, design)
+
+    if table is None:
+        raise ValueError(f"Stage {stage.id!r} ({stage.type}) needs an input stage.")
+
+    if stage.type == 'generate':
+        # The generator works row by row, so this is the one stage that needs records
+        request = GenerationRequest(**{**params, "matrix": table.to_dict(orient='records'), "format": 'records'})
+        result = generator.generate_batch(request)
+        return StageOutput(result, pd.DataFrame(result.data))
+
+    if stage.type == 'spc':
+        return StageOutput(analyze_spc(SPCAnalysisRequest(**params), frame=table))
+
+    if stage.type == 'sensitivity':
+        return StageOutput(analyze_sensitivity(SensitivityRequest(**params), frame=table))
+
+    if stage.type == 'analysis':
+        # The report prompt only samples the leading rows
+        rows = table.head(50).to_dict(orient='records')
+        html = generator.generate_report_analysis(params.get("context", ""), rows, params.get("mock", False))
+        return StageOutput({"analysis_html": html})
+
+    # Stats stages validate their settings as usual, then take numeric columns straight
+    # from the table instead of a re-validated List[float]
+    settings = {k: v for k, v in params.items() if k not in ("column", "column_a", "column_b")}
+    if stage.type == 'estimation':
+        request = EstimationRequest(**settings)
+        request.data = _column(table, params.get("column", "Response"))
+        return StageOutput(calculate_estimation(request))
+    if stage.type == 'advanced':
+        request = AdvancedRequest(**settings)
+        request.data = _column(table, params.get("column", "Response"))
+        return StageOutput(calculate_advanced_estimation(request))
+    if "column_a" not in params or "column_b" not in params:
+        raise ValueError(f"Stage {stage.id!r} (effect_size) needs column_a and column_b.")
+    request = EffectSizeRequest()
+    request.group_a = _column(table, params["column_a"])
+    request.group_b = _column(table, params["column_b"])
+    return StageOutput(calculate_effect_size(request))
+
+
+def _validate(request: PipelineRequest) -> Dict[str, PipelineStage]:
+    stages = {}
+    for stage in request.stages:
+        if stage.id in stages or stage.id == "dataset":
+            raise ValueError(f"Duplicate or reserved stage id: {stage.id!r}")
+        stages[stage.id] = stage
+    for stage in request.stages:
+        if stage.input == "dataset" and not request.dataset_id:
+            raise ValueError(f"Stage {stage.id!r} reads the dataset but no dataset_id was given.")
+        if stage.input not in (None, "dataset") and stage.input not in stages:
+            raise ValueError(f"Stage {stage.id!r} references unknown input {stage.input!r}.")
+    for stage_id in request.outputs:
+        if stage_id not in stages:
+            raise ValueError(f"Unknown output stage: {stage_id!r}")
+    # Each stage has at most one input, so a cycle is a chain that returns to itself
+    for stage in request.stages:
+        seen = {stage.id}
+        current = stage.input
+        while current in stages:
+            if current in seen:
+                raise ValueError(f"Pipeline has a cycle through {current!r}.")
+            seen.add(current)
+            current = stages[current].input
+    return stages
+
+
+def _serialize(response: Any) -> Any:
+    return response.model_dump() if isinstance(response, BaseModel) else response
+
+
+def run_pipeline(request: PipelineRequest) -> PipelineResponse:
+    """
+    Runs stages as soon as their input is ready; independent branches run concurrently.
+    A failed stage skips everything downstream of it.
+    """
+    start_time = time.time()
+    stages = _validate(request)
+    outputs = request.outputs or [s for s in stages if not any(o.input == s for o in stages.values())]
+
+    done: Dict[str, StageOutput] = {}
+    if request.dataset_id:
+        done["dataset"] = StageOutput(None, load_dataset(request.dataset_id))
+    errors: Dict[str, str] = {}
+    timings: Dict[str, float] = {}
+
+    def timed(stage: PipelineStage, table: Optional[pd.DataFrame]) -> StageOutput:
+        stage_start = time.perf_counter()
+        try:
+            return _run_stage(stage, table)
+        finally:
+            timings[stage.id] = time.perf_counter() - stage_start
+
+    pending = dict(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=request.max_workers) as executor:
+        while pending or running:
+            for stage_id, stage in list(pending.items()):
+                if stage.input in errors:
+                    errors[stage_id] = f"Skipped: input stage {stage.input!r} failed."
+                    del pending[stage_id]
+                elif stage.input is None or stage.input in done:
+                    table = done[stage.input].table if stage.input else None
+                    running[executor.submit(timed, stage, table)] = stage_id
+                    del pending[stage_id]
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage_id = running.pop(future)
+                try:
+                    done[stage_id] = future.result()
+                except Exception as e:
+                    errors[stage_id] = str(e)
+
+    return PipelineResponse(
+        results={s: _serialize(done[s].response) for s in outputs if s in done},
+        errors=errors,
+        timings=timings,
+        total_time=time.time() - start_time
+    )
@@ -0,0 +1,272 @@
+"""
+Global sensitivity analysis: how much of a response's variance each factor drives, as Sobol
+indices (first order = the factor alone, total = including its interactions).
+
+Both estimators assume independent factors, uniform between each Variable's bounds (as
+sampled by /design):
+
+- 'saltelli' is model-free. It needs the responses of a design built with strategy='saltelli'
+  (N base samples -> N * (k + 2) runs) in design order. First-order indices use Saltelli's
+  (2010) estimator and total indices Jansen's. CIs are percentile bootstrap over the N base
+  samples.
+- 'surrogate' works on data that already exists, from any design. It fits a polynomial chaos
+  expansion (orthonormal Legendre polynomials up to `degree`) by least squares and reads the
+  indices off its coefficients. CIs resample the coefficients from their estimated sampling
+  distribution, so no refits are needed.
+"""
+from __future__ import annotations
+from typing import List, Dict, Any, Optional, Literal, Tuple
+import itertools
+import numpy as np
+from pydantic import BaseModel, Field
+from .doe import Variable
+from .spc import load_frame
+from .metrics import stage
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+# Caps the float64 elements of one batch of bootstrap resamples / surrogate rows (~64 MB)
+CHUNK_ELEMENTS = 8_000_000
+
+
+class SensitivityRequest(BaseModel):
+    data: List[Dict[str, Any]] = [] # Row records (e.g. the /generate output)
+    columns: Optional[Dict[str, List[Any]]] = None # Columnar alternative to data
+    dataset_id: Optional[str] = None # Stored dataset alternative to data
+    variables: List[Variable] # The design's factors: continuous ones are analyzed, over their bounds
+    response: str = "Response"
+    method: Literal['saltelli', 'surrogate'] = 'saltelli'
+    degree: int = Field(2, ge=1, le=3, description="Polynomial degree of the surrogate")
+    num_resamples: int = Field(200, ge=0, le=10000, description="Resamples for the CIs (0 = no CIs)")
+    confidence_level: float = Field(0.95, gt=0, lt=1)
+    seed: Optional[int] = None
+
+class SensitivityIndex(BaseModel):
+    factor: str
+    first_order: float
+    total: float
+    first_order_ci: Optional[List[float]] = None # [lower, upper]
+    total_ci: Optional[List[float]] = None
+
+class SensitivityResult(BaseModel):
+    method: str
+    num_factors: int
+    num_evaluations: int # Responses used, after dropping missing ones
+    variance: float # Response variance the indices are fractions of
+    r_squared: Optional[float] = None # Surrogate fit quality
+    confidence_level: float
+    indices: List[SensitivityIndex] # In variable order
+
+
+# --- Saltelli / Jansen estimators ---
+
+def _saltelli_batch(f_a: np.ndarray, f_b: np.ndarray, f_ab: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Indices for a batch of samples: f_a, f_b (R, N) and f_ab (R, k, N) -> first, total (R, k)
+    """
+    variance = np.var(np.concatenate([f_a, f_b], axis=1), axis=1, ddof=1)[:, np.newaxis]
+    diff = f_ab - f_a[:, np.newaxis, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        first = np.mean(f_b[:, np.newaxis, :] * diff, axis=2) / variance
+        total = 0.5 * np.mean(diff ** 2, axis=2) / variance
+    return first, total
+
+def check_saltelli_order(x: np.ndarray) -> None:
+    """Raises ValueError unless the factor rows x (N * (k + 2), k) follow the A, B, AB_i layout"""
+    k = x.shape[1]
+    blocks = x.reshape(k + 2, -1, k)
+    expected = np.where(np.eye(k, dtype=bool)[:, np.newaxis, :], blocks[1], blocks[0])
+    if not np.allclose(blocks[2:], expected, equal_nan=True):
+        raise ValueError("Rows are not in Saltelli design order (A, B, AB_1..AB_k). Build the design "
+                         "with strategy='saltelli' and keep the generated rows in the same order.")
+
+def saltelli_indices(y: np.ndarray, num_factors: int, num_resamples: int = 0,
+                     confidence_level: float = 0.95, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    First-order and total indices from Saltelli design responses y (N * (k + 2), design order).
+    Base samples with a missing response in any block are dropped.
+    """
+    k = num_factors
+    if len(y) % (k + 2):
+        raise ValueError(f"A Saltelli design for {k} factors has N * {k + 2} runs; got {len(y)}.")
+    blocks = y.reshape(k + 2, -1)
+    blocks = blocks[:, np.isfinite(blocks).all(axis=0)]
+    n = blocks.shape[1]
+    if n < 2:
+        raise ValueError("Need at least 2 complete base samples (all k + 2 responses present).")
+    f_a, f_b, f_ab = blocks[0], blocks[1], blocks[2:]
+    variance = float(np.var(blocks[:2], ddof=1))
+    if variance == 0:
+        raise ValueError("The response does not vary; sensitivity indices are undefined.")
+
+    first, total = _saltelli_batch(f_a[np.newaxis], f_b[np.newaxis], f_ab[np.newaxis])
+    result = {"first": first[0], "total": total[0], "first_ci": None, "total_ci": None,
+              "variance": variance, "n": n * (k + 2)}
+    if num_resamples:
+        with stage("sensitivity", "bootstrap"):
+            rng = np.random.default_rng(seed)
+            chunk = max(1, CHUNK_ELEMENTS // ((k + 2) * n))
+            firsts, totals = [], []
+            for start in range(0, num_resamples, chunk):
+                idx = rng.integers(0, n, size=(min(chunk, num_resamples - start), n))
+                f, t = _saltelli_batch(f_a[idx], f_b[idx], f_ab[:, idx].transpose(1, 0, 2))
+                firsts.append(f)
+                totals.append(t)
+            result["first_ci"] = _percentile_ci(np.concatenate(firsts), confidence_level)
+            result["total_ci"] = _percentile_ci(np.concatenate(totals), confidence_level)
+    return result
+
+def _percentile_ci(samples: np.ndarray, confidence_level: float) -> np.ndarray:
+    alpha = 1 - confidence_level
+    return np.nanquantile(samples, [alpha / 2, 1 - alpha / 2], axis=0)
+
+
+# --- Polynomial chaos surrogate ---
+
+def legendre(x: np.ndarray, degree: int) -> np.ndarray:
+    """Orthonormal Legendre polynomials 0..degree (uniform weight on [-1, 1]): (degree + 1, *x.shape)"""
+    out = np.empty((degree + 1,) + x.shape)
+    out[0] = 1.0
+    if degree >= 1:
+        out[1] = x
+    for p in range(1, degree):
+        out[p + 1] = ((2 * p + 1) * x * out[p] - p * out[p - 1]) / (p + 1)
+    return out * np.sqrt(2 * np.arange(degree + 1) + 1).reshape((-1,) + (1,) * x.ndim)
+
+def chaos_terms(k: int, degree: int) -> np.ndarray:
+    """Multi-indices (T, k) of every term with total degree 1..degree"""
+    rows = [np.bincount(combo, minlength=k)
+            for total in range(1, degree + 1)
+            for combo in itertools.combinations_with_replacement(range(k), total)]
+    return np.array(rows, dtype=int)
+
+def chaos_features(z: np.ndarray, alpha: np.ndarray, degree: int) -> np.ndarray:
+    """Feature matrix (n, T) for inputs z (n, k) scaled to [-1, 1]"""
+    basis = legendre(z, degree)  # (degree + 1, n, k)
+    # Each term touches at most `degree` factors: gather them as (factor, power) slots
+    factors = np.zeros((len(alpha), degree), dtype=int)
+    powers = np.zeros((len(alpha), degree), dtype=int)
+    for t, row in enumerate(alpha):
+        nonzero = np.flatnonzero(row)
+        factors[t, :len(nonzero)] = nonzero
+        powers[t, :len(nonzero)] = row[nonzero]
+    features = np.ones((len(alpha), z.shape[0]))
+    for slot in range(degree):
+        features *= basis[powers[:, slot], :, factors[:, slot]]
+    return features.T
+
+def _chaos_batch(coef: np.ndarray, alpha: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Indices from term coefficients (R, T): first, total (R, k) and variance (R,)"""
+    power = coef ** 2
+    variance = power.sum(axis=1)
+    involves = alpha > 0
+    alone = involves & (involves.sum(axis=1, keepdims=True) == 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        first = power @ alone / variance[:, np.newaxis]
+        total = power @ involves / variance[:, np.newaxis]
+    return first, total, variance
+
+def surrogate_indices(x: np.ndarray, y: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+                      degree: int = 2, num_resamples: int = 0, confidence_level: float = 0.95,
+                      seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Sobol indices of a degree-`degree` polynomial chaos fit to (x, y), x (n, k) within [lower, upper].
+    Rows with a missing value are dropped.
+    """
+    keep = np.isfinite(y) & np.isfinite(x).all(axis=1)
+    x, y = x[keep], y[keep]
+    n, k = x.shape
+    if np.any(upper <= lower):
+        raise ValueError("Every variable needs max > min for the surrogate.")
+    alpha = chaos_terms(k, degree)
+    n_coef = len(alpha) + 1
+    if n <= n_coef:
+        raise ValueError(f"A degree-{degree} surrogate in {k} factors has {n_coef} coefficients but only "
+                         f"{n} complete rows; lower the degree or add runs.")
+
+    with stage("sensitivity", "fit"):
+        z = 2 * (x - lower) / (upper - lower) - 1
+        # Normal equations accumulated over row chunks keep memory flat for large n
+        gram = np.zeros((n_coef, n_coef))
+        moment = np.zeros(n_coef)
+        chunk = max(1, CHUNK_ELEMENTS // n_coef)
+        for start in range(0, n, chunk):
+            features = chaos_features(z[start:start + chunk], alpha, degree)
+            design = np.hstack([np.ones((len(features), 1)), features])
+            gram += design.T @ design
+            moment += design.T @ y[start:start + chunk]
+        coef = np.linalg.lstsq(gram, moment, rcond=None)[0]
+        rss = max(float(y @ y - 2 * coef @ moment + coef @ gram @ coef), 0.0)
+        tss = float(np.sum((y - y.mean()) ** 2))
+        if tss == 0:
+            raise ValueError("The response does not vary; sensitivity indices are undefined.")
+
+    first, total, variance = _chaos_batch(coef[np.newaxis, 1:], alpha)
+    result = {"first": first[0], "total": total[0], "first_ci": None, "total_ci": None,
+              "variance": float(variance[0]), "n": n, "r_squared": 1 - rss / tss}
+    if num_resamples:
+        with stage("sensitivity", "bootstrap"):
+            covariance = rss / (n - n_coef) * np.linalg.pinv(gram)
+            covariance = (covariance + covariance.T) / 2
+            rng = np.random.default_rng(seed)
+            draws = rng.multivariate_normal(coef, covariance, size=num_resamples, method='eigh',
+                                            check_valid='ignore')
+            firsts, totals, _ = _chaos_batch(draws[:, 1:], alpha)
+            result["first_ci"] = _percentile_ci(firsts, confidence_level)
+            result["total_ci"] = _percentile_ci(totals, confidence_level)
+    return result
+
+
+def analyze_sensitivity(request: SensitivityRequest, frame: Optional[pd.DataFrame] = None) -> SensitivityResult:
+    """
+    Sobol indices of request.response with respect to the continuous variables.
+    """
+    factors = [v for v in request.variables if v.type == 'continuous']
+    if not factors:
+        raise ValueError("Sensitivity analysis needs at least one continuous variable.")
+    names = [v.name for v in factors]
+
+    with stage("sensitivity", "dataframe"):
+        df = load_frame(request.data, request.columns, names + [request.response], request.dataset_id, frame)
+        if request.response not in df.columns:
+            raise ValueError(f"Response column {request.response!r} not found.")
+        y = pd.to_numeric(df[request.response], errors='coerce').to_numpy(dtype=float)
+        present = [name for name in names if name in df.columns]
+        x = df[present].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+
+    if request.method == 'saltelli':
+        if len(present) == len(names) and len(y) % (len(names) + 2) == 0:
+            check_saltelli_order(x)
+        result = saltelli_indices(y, len(names), request.num_resamples, request.confidence_level, request.seed)
+    else:
+        missing = [name for name in names if name not in present]
+        if missing:
+            raise ValueError(f"The surrogate needs the factor columns; missing: {missing}")
+        lower = np.array([v.min for v in factors])
+        upper = np.array([v.max for v in factors])
+        result = surrogate_indices(x, y, lower, upper, request.degree, request.num_resamples,
+                                   request.confidence_level, request.seed)
+
+    def interval(ci: Optional[np.ndarray], i: int) -> Optional[List[float]]:
+        return None if ci is None else [float(ci[0, i]), float(ci[1, i])]
+
+    indices = [
+        SensitivityIndex(
+            factor=name,
+            first_order=float(result["first"][i]),
+            total=float(result["total"][i]),
+            first_order_ci=interval(result["first_ci"], i),
+            total_ci=interval(result["total_ci"], i),
+        )
+        for i, name in enumerate(names)
+    ]
+    return SensitivityResult(
+        method=request.method,
+        num_factors=len(names),
+        num_evaluations=result["n"],
+        variance=result["variance"],
+        r_squared=result.get("r_squared"),
+        confidence_level=request.confidence_level,
+        indices=indices,
+    )
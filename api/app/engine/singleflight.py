@@ -0,0 +1,106 @@
+"""
+Single-flight coalescing: concurrent identical calls share one in-flight computation.
+
+Calls are keyed by a canonical hash of the function and its arguments. Pydantic requests
+hash field by field and arrays by their raw bytes. The first caller (the leader) computes;
+callers arriving while it runs wait and get the same result or exception. Nothing is kept
+once the leader finishes, so this is not a cache.
+"""
+from typing import Any, Callable, Dict, Tuple
+import functools
+import hashlib
+import json
+import threading
+import numpy as np
+from pydantic import BaseModel
+from .metrics import Counter
+
+SHARED = Counter("single_flight_shared", "Calls served by an identical in-flight computation", ("function",))
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return {"__model__": type(value).__qualname__,
+                **{name: _canonical(getattr(value, name)) for name in type(value).model_fields}}
+    if isinstance(value, np.ndarray):
+        digest = hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest()
+        return {"__ndarray__": digest, "dtype": str(value.dtype), "shape": list(value.shape)}
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if callable(value):
+        return f"{getattr(value, '__module__', '')}.{getattr(value, '__qualname__', repr(value))}"
+    # Other objects (e.g. the generator singleton) only match themselves
+    return f"{type(value).__qualname__}@{id(value)}"
+
+
+def call_key(fn: Callable, args: tuple = (), kwargs: Dict[str, Any] = None) -> str:
+    """Canonical hash of a call: same function and equal arguments give the same key"""
+    payload = [_canonical(fn), _canonical(list(args)), _canonical(kwargs or {})]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Thread-safe group of in-flight calls"""
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable, *args: Any, **kwargs: Any) -> Tuple[Any, bool]:
+        """Returns (result, shared): shared is True when another caller did the work"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.done.wait()
+            SHARED.inc(function=self.name)
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+def single_flight(fn: Callable) -> Callable:
+    """
+    Decorator: concurrent calls with equal arguments run fn once and share the outcome.
+    The wrapper keeps fn's module and name, so it still pickles for process pools.
+    """
+    group = SingleFlight(fn.__qualname__)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return group.do(call_key(fn, args, kwargs), fn, *args, **kwargs)[0]
+
+    wrapper.single_flight = group
+    return wrapper
@@ -1,26 +1,162 @@
-
+from __future__ import annotations
+import functools
 import numpy as np
-import pandas as pd
-from typing import List, Dict, Any, Union
-from pydantic import BaseModel
+from typing import List, Dict, Any, Union, Literal, Optional
+from pydantic import BaseModel, Field, SerializationInfo, field_serializer
+from .datasets import load_dataset
+from .arrays import encode_float64, wants_base64
+from .metrics import stage
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+stats = lazy_import("scipy.stats")
+linalg = lazy_import("scipy.linalg")
+signal = lazy_import("scipy.signal")
+
+# d2 constant for moving ranges of span 2 (individuals chart)
+D2_INDIVIDUALS = 1.128
+
+class SpecLimits(BaseModel):
+    """Specification limits for a quality characteristic (either side may be omitted)"""
+    usl: Optional[float] = None
+    lsl: Optional[float] = None
+    target: Optional[float] = None
 
 class SPCAnalysisRequest(BaseModel):
-    data: List[Dict[str, Any]]
-    target_variable: str # The column to analyze (e.g. "Yield", "Diameter")
+    data: List[Dict[str, Any]] = [] # Row records
+    columns: Optional[Dict[str, List[Any]]] = None # Columnar alternative to data (column -> values)
+    dataset_id: Optional[str] = None # Stored dataset alternative to data
+    target_variable: str = None # The column to analyze (e.g. "Yield", "Diameter")
+    target_variables: List[str] = [] # Additional columns analyzed in the same request
     factor_variable: str = None # For Pareto/Stratification
+    # Visual downsampling of the control chart payload (None = send every point)
+    max_points: Optional[int] = Field(None, ge=3, description="Point budget for the control chart values")
+    downsample_method: Literal['lttb', 'minmax'] = 'lttb'
+    # Process capability: specs applies to target_variable, column_specs to any other columns
+    specs: Optional[SpecLimits] = None
+    column_specs: Dict[str, SpecLimits] = {}
+    confidence_level: float = 0.95
     
 class SPCResult(BaseModel):
     control_chart: Dict[str, Any] = {}
     histogram: Dict[str, Any] = {}
     pareto: Dict[str, Any] = {}
+    capability: Dict[str, Any] = {}
+    variables: Dict[str, Dict[str, Any]] = {} # Per-column results for target_variables
     # Scatter handled by existing logic, Fishbone by frontend structure
 
-def calculate_control_limits(data: pd.Series, sigma: float = 3.0):
+    @field_serializer('control_chart', when_used='json')
+    def _encode_chart(self, chart: Dict[str, Any], info: SerializationInfo):
+        if wants_base64(info) and "values" in chart:
+            return {**chart, "values": encode_float64(chart["values"])}
+        return chart
+
+    @field_serializer('variables', when_used='json')
+    def _encode_variable_charts(self, variables: Dict[str, Dict[str, Any]], info: SerializationInfo):
+        if not wants_base64(info):
+            return variables
+        return {name: {**result, "control_chart": self._encode_chart(result["control_chart"], info)}
+                if "control_chart" in result else result
+                for name, result in variables.items()}
+
+class MultivariateSPCRequest(BaseModel):
+    data: List[Dict[str, Any]] = []
+    columns: Optional[Dict[str, List[Any]]] = None
+    dataset_id: Optional[str] = None
+    target_variables: List[str] = Field(..., min_length=2) # Correlated quality characteristics
+    phase1_size: Optional[int] = Field(None, ge=3, description="Leading rows used to estimate mean/covariance (default: all)")
+    alpha: float = Field(0.0027, gt=0, lt=1) # Same false alarm rate as 3-sigma limits
+    mewma_lambda: float = Field(0.1, gt=0, le=1)
+    mewma_ucl: Optional[float] = None # Override for the MEWMA limit (default: simulated for an in-control ARL of 1 / alpha)
+    max_points: Optional[int] = Field(None, ge=3)
+    downsample_method: Literal['lttb', 'minmax'] = 'lttb'
+
+class MultivariateSPCResult(BaseModel):
+    variables: List[str]
+    n: int
+    phase1_size: int
+    mean: List[float]
+    covariance: List[List[float]]
+    # out_of_control lists original row positions; rows with missing values are skipped, not renumbered
+    hotelling: Dict[str, Any] = {}
+    mewma: Dict[str, Any] = {}
+
+def lttb_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: picks n_out indices that preserve the visual shape.
+    The first and last points are always kept.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets over the interior points [1, n - 1)
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average point of the next bucket (the last bucket looks at the final point)
+        if i + 2 < len(edges):
+            nlo, nhi = edges[i + 1], edges[i + 2]
+        else:
+            nlo, nhi = n - 1, n
+        avg_x = (nlo + nhi - 1) / 2.0
+        avg_y = y[nlo:nhi].mean()
+
+        xs = np.arange(lo, hi)
+        area = np.abs((a - avg_x) * (y[lo:hi] - y[a]) - (a - xs) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Min/Max bucketing: keeps the lowest and highest point of each of n_out // 2 buckets.
+    """
+    n = len(y)
+    n_buckets = n_out // 2
+    if n_out >= n or n_buckets < 1:
+        return np.arange(n)
+
+    bucket = (np.arange(n) * n_buckets) // n
+    # Sort by bucket, then by value: first entry per bucket is its min, last is its max
+    order = np.lexsort((y, bucket))
+    starts = np.searchsorted(bucket[order], np.arange(n_buckets))
+    ends = np.append(starts[1:], n) - 1
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+def chart_values(values: np.ndarray, out_of_control: np.ndarray,
+                 max_points: Optional[int] = None, method: str = 'lttb') -> Dict[str, Any]:
+    """
+    Chart payload for a plotted statistic, downsampled to max_points for display.
+    Points flagged in out_of_control are never dropped.
+    """
+    if max_points is None or len(values) <= max_points:
+        return {"values": values.tolist()}
+
+    pick = lttb_indices if method == 'lttb' else minmax_indices
+    indices = np.union1d(pick(values, max_points), np.flatnonzero(out_of_control))
+    return {
+        "values": values[indices].tolist(),
+        "indices": indices.tolist(),
+        "n_total": len(values),
+    }
+
+def calculate_control_limits(data: pd.Series, sigma: float = 3.0,
+                             max_points: Optional[int] = None, method: str = 'lttb'):
     mean = data.mean()
     std = data.std()
     ucl = mean + sigma * std
     lcl = mean - sigma * std
-    return {"mean": mean, "ucl": ucl, "lcl": lcl, "values": data.tolist()}
+    result = {"mean": mean, "ucl": ucl, "lcl": lcl}
+
+    values = data.to_numpy(dtype=float)
+    result.update(chart_values(values, (values > ucl) | (values < lcl), max_points, method))
+    return result
 
 def calculate_pareto(df: pd.DataFrame, category_col: str):
     if category_col not in df.columns:
@@ -33,27 +169,309 @@ def calculate_pareto(df: pd.DataFrame, category_col: str):
         "cumulative": cumulative.tolist()
     }
 
-def analyze_spc(request: SPCAnalysisRequest) -> SPCResult:
-    df = pd.DataFrame(request.data)
-    result = SPCResult()
-    
+def _capability_table(values: pd.DataFrame, keys: pd.Series, specs: Dict[str, SpecLimits],
+                      confidence_level: float) -> pd.DataFrame:
+    """
+    Cp/Cpk (within sigma from the average moving range) and Pp/Ppk (overall sigma)
+    for every (group, column) pair, computed from one groupby over all columns.
+    """
+    grouped = values.groupby(keys, sort=True)
+    moving_range = grouped.diff().abs().groupby(keys, sort=True).mean()
+
+    table = pd.DataFrame({
+        "n": grouped.count().unstack(),
+        "mean": grouped.mean().unstack(),
+        "std_overall": grouped.std().unstack(),
+        "std_within": (moving_range / D2_INDIVIDUALS).unstack(),
+    })
+    table.index.names = ["column", "group"]
+    table = table.reset_index()
+
+    usl = table["column"].map({c: s.usl for c, s in specs.items()}).astype(float)
+    lsl = table["column"].map({c: s.lsl for c, s in specs.items()}).astype(float)
+    n = table["n"].astype(float)
+    mean = table["mean"]
+
+    alpha = 1 - confidence_level
+    dof = (n - 1).where(n > 1)
+    chi_lo = np.sqrt(stats.chi2.ppf(alpha / 2, dof) / dof)
+    chi_hi = np.sqrt(stats.chi2.ppf(1 - alpha / 2, dof) / dof)
+    z = stats.norm.ppf(1 - alpha / 2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for prefix, sigma in (("c", table["std_within"]), ("p", table["std_overall"])):
+            sigma = sigma.where(sigma > 0)
+            spread = (usl - lsl) / (6 * sigma)
+            # np.fmin ignores a missing side, so one-sided specs still get a k-index
+            k_index = np.fmin((usl - mean) / (3 * sigma), (mean - lsl) / (3 * sigma))
+            k_se = np.sqrt(1 / (9 * n) + k_index ** 2 / (2 * dof))
+
+            table[f"{prefix}p"] = spread
+            table[f"{prefix}p_lower"] = spread * chi_lo
+            table[f"{prefix}p_upper"] = spread * chi_hi
+            table[f"{prefix}pk"] = k_index
+            table[f"{prefix}pk_lower"] = k_index - z * k_se
+            table[f"{prefix}pk_upper"] = k_index + z * k_se
+
+    return table
+
+def calculate_capability(df: pd.DataFrame, specs: Dict[str, SpecLimits], group_col: str = None,
+                         confidence_level: float = 0.95) -> Dict[str, Any]:
+    """
+    Capability indices with confidence intervals for several columns at once,
+    overall and stratified by group_col.
+    """
+    cols = [c for c in specs if c in df.columns]
+    if not cols:
+        return {}
+    values = df[cols].apply(pd.to_numeric, errors='coerce')
+
+    def records(table: pd.DataFrame) -> List[Dict[str, Any]]:
+        return table.astype(object).where(table.notna(), None).to_dict(orient='records')
+
+    overall = _capability_table(values, pd.Series("All", index=df.index), specs, confidence_level)
+    result = {
+        "columns": cols,
+        "confidence_level": confidence_level,
+        "overall": records(overall.drop(columns="group")),
+    }
+    if group_col and group_col in df.columns:
+        by_group = _capability_table(values, df[group_col].astype(str), specs, confidence_level)
+        result["group_variable"] = group_col
+        result["by_group"] = records(by_group)
+    return result
+
+def load_frame(data: List[Dict[str, Any]], columns: Optional[Dict[str, List[Any]]],
+               needed: List[str], dataset_id: Optional[str] = None,
+               frame: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Builds a DataFrame holding only the needed columns.
+    Columnar payloads, stored datasets and in-memory frames map straight onto columns
+    without going through row dicts.
+    """
+    needed = list(dict.fromkeys(c for c in needed if c))
+    if frame is not None:
+        return frame[[c for c in needed if c in frame.columns]]
+    if dataset_id:
+        return load_dataset(dataset_id, needed)
+    if columns is not None:
+        return pd.DataFrame({c: columns[c] for c in needed if c in columns})
+    if not data:
+        return pd.DataFrame()
+    keys = set().union(*data)
+    present = [c for c in needed if c in keys]
+    return pd.DataFrame.from_records(data, columns=present)
+
+def analyze_column(df: pd.DataFrame, column: str, max_points: Optional[int] = None,
+                   method: str = 'lttb') -> Dict[str, Any]:
+    """
+    Control chart and histogram for a numeric column, Pareto for a categorical one.
+    """
+    result = {}
+    if column not in df.columns:
+        return result
+
+    series = pd.to_numeric(df[column], errors='coerce').dropna()
+    if series.empty:
+        result["pareto"] = calculate_pareto(df, column)
+        return result
+
     # 1. Control Chart (I-MR or X-bar assumption treated as individuals for synthetic)
+    with stage("spc", "control_chart"):
+        result["control_chart"] = calculate_control_limits(series, max_points=max_points, method=method)
+
+    # 2. Histogram
+    hist, bins = np.histogram(series, bins='auto')
+    result["histogram"] = {"counts": hist.tolist(), "bins": bins.tolist()}
+    return result
+
+def analyze_spc(request: SPCAnalysisRequest, frame: Optional[pd.DataFrame] = None) -> SPCResult:
+    """frame: already-built DataFrame (e.g. from a server-side pipeline) used instead of the payload"""
+    cat_col = request.factor_variable
+    specs = dict(request.column_specs)
+    if request.specs is not None and request.target_variable:
+        specs[request.target_variable] = request.specs
+
+    with stage("spc", "dataframe"):
+        df = load_frame(
+            request.data, request.columns,
+            [request.target_variable, *request.target_variables, cat_col, *specs],
+            request.dataset_id, frame
+        )
+    result = SPCResult()
+
+    # 1-2. Control Chart and Histogram for the primary target
     if request.target_variable in df.columns:
         # Assuming numeric
         try:
-            series = pd.to_numeric(df[request.target_variable], errors='coerce').dropna()
-            result.control_chart = calculate_control_limits(series)
-            
-            # 2. Histogram
-            hist, bins = np.histogram(series, bins='auto')
-            result.histogram = {"counts": hist.tolist(), "bins": bins.tolist()}
+            primary = analyze_column(df, request.target_variable, request.max_points, request.downsample_method)
+            result.control_chart = primary.get("control_chart", {})
+            result.histogram = primary.get("histogram", {})
         except:
             pass
-            
+
+    # Same analysis for every additional column in one pass over the frame
+    for column in request.target_variables:
+        try:
+            result.variables[column] = analyze_column(df, column, request.max_points, request.downsample_method)
+        except Exception as e:
+            result.variables[column] = {"error": str(e)}
+
     # 3. Pareto (Requires a categorical factor or 'Defect Type')
     # If no factor provided, try to find a categorical one or user specified
-    cat_col = request.factor_variable
     if cat_col and cat_col in df.columns:
          result.pareto = calculate_pareto(df, cat_col)
-         
+
+    # 4. Process Capability (per column, overall and per factor level)
+    if specs:
+        result.capability = calculate_capability(df, specs, cat_col, request.confidence_level)
+
     return result
+
+# --- Multivariate SPC ---
+
+def _quadratic_form(deviations: np.ndarray, chol: np.ndarray) -> np.ndarray:
+    """
+    d_i' S^-1 d_i for every row using the Cholesky factor of S (S = L L').
+    One batched triangular solve replaces a per-row inverse: ||L^-1 d_i||^2.
+    """
+    z = linalg.solve_triangular(chol, deviations.T, lower=True, check_finite=False)
+    return np.einsum('ij,ij->j', z, z)
+
+def hotelling_t2(x: np.ndarray, mean: np.ndarray, chol: np.ndarray) -> np.ndarray:
+    """Hotelling T^2 statistic for each observation (rows of x)"""
+    return _quadratic_form(x - mean, chol)
+
+def mewma_statistic(x: np.ndarray, mean: np.ndarray, chol: np.ndarray, lam: float) -> np.ndarray:
+    """
+    MEWMA statistic Z_i' Cov(Z_i)^-1 Z_i with Z_i = lam * (x_i - mean) + (1 - lam) * Z_{i-1}.
+    The recursion runs as an IIR filter down each column; Cov(Z_i) uses the exact
+    time-varying factor lam / (2 - lam) * (1 - (1 - lam)^(2i)).
+    """
+    z = signal.lfilter([lam], [1.0, lam - 1.0], x - mean, axis=0)
+    i = np.arange(1, len(x) + 1)
+    scale = lam / (2 - lam) * (1 - (1 - lam) ** (2 * i))
+    return _quadratic_form(z, chol) / scale
+
+# The MEWMA limit simulation costs about paths * 8 * arl0 * p normal draws, so it only runs up to
+# this p * arl0 (about a second); beyond it the chi-square limit is used
+MEWMA_MAX_SIMULATED_COST = 4000
+# Normal draws generated per simulation block (bounds its memory to a few tens of MB)
+MEWMA_BLOCK_ELEMENTS = 2_000_000
+
+@functools.lru_cache(maxsize=64)
+def mewma_arl_limit(p: int, lam: float, arl0: float, paths: int = 1000, seed: int = 0) -> float:
+    """
+    MEWMA limit h whose in-control average run length is arl0, assuming known in-control
+    mean and covariance (standard normal data, the statistic is rotation invariant).
+
+    Simulates paths of the statistic for 8 * arl0 steps and keeps only their running-maximum
+    records, so the run length for any h is the time of the first record above h; h is then
+    found by bisection on the mean run length. Deterministic for a given seed. Paths are
+    advanced in blocks of MEWMA_BLOCK_ELEMENTS draws, so memory does not grow with p or arl0.
+    """
+    rng = np.random.default_rng(seed)
+    horizon = int(np.ceil(8 * arl0))
+    block = max(1, MEWMA_BLOCK_ELEMENTS // (paths * p))
+    zi = np.zeros((1, paths, p))
+    best = np.zeros(paths)
+    rec_path, rec_time, rec_value = [], [], []
+    for start in range(0, horizon, block):
+        steps = min(block, horizon - start)
+        z, zi = signal.lfilter([lam], [1.0, lam - 1.0], rng.standard_normal((steps, paths, p)), axis=0, zi=zi)
+        i = np.arange(start + 1, start + steps + 1)
+        stat = np.einsum('tkp,tkp->tk', z, z) / (lam / (2 - lam) * (1 - (1 - lam) ** (2 * i)))[:, None]
+        running = np.maximum(np.maximum.accumulate(stat, axis=0), best)
+        t, k = np.nonzero(running > np.vstack([best, running[:-1]]))
+        rec_path.append(k)
+        rec_time.append(start + t + 1)
+        rec_value.append(running[t, k])
+        best = running[-1]
+    rec_path, rec_time, rec_value = (np.concatenate(a) for a in (rec_path, rec_time, rec_value))
+
+    def arl(h: float) -> float:
+        run_length = np.full(paths, horizon)
+        above = rec_value > h
+        np.minimum.at(run_length, rec_path[above], rec_time[above])
+        return run_length.mean()
+
+    lo, hi = 0.0, float(best.max())
+    for _ in range(60):
+        mid = (lo + hi) / 2
+        lo, hi = (mid, hi) if arl(mid) < arl0 else (lo, mid)
+    return hi
+
+def analyze_multivariate_spc(request: MultivariateSPCRequest) -> MultivariateSPCResult:
+    df = load_frame(request.data, request.columns, request.target_variables, request.dataset_id)
+    missing = [c for c in request.target_variables if c not in df.columns]
+    if missing:
+        raise ValueError(f"Columns not found in data: {missing}")
+
+    numeric = df[request.target_variables].apply(pd.to_numeric, errors='coerce')
+    complete = numeric.notna().all(axis=1).to_numpy()
+    rows = np.flatnonzero(complete)  # Original row position of each complete observation
+    x = numeric.to_numpy(dtype=float)[complete]
+    n, p = x.shape
+    m = min(request.phase1_size or n, n)
+    if m <= p + 1:
+        raise ValueError(f"Phase I needs more than {p + 1} complete rows for {p} variables.")
+
+    # 1. Phase I estimation of the in-control mean and covariance
+    mean = x[:m].mean(axis=0)
+    cov = np.cov(x[:m], rowvar=False)
+    try:
+        chol = linalg.cholesky(cov, lower=True)
+    except linalg.LinAlgError:
+        raise ValueError("Covariance matrix is singular; remove linearly dependent variables.")
+
+    # 2. Hotelling T^2 with Beta (Phase I) and F (Phase II) limits for individual observations
+    t2 = hotelling_t2(x, mean, chol)
+    ucl_phase1 = (m - 1) ** 2 / m * stats.beta.ppf(1 - request.alpha, p / 2, (m - p - 1) / 2)
+    ucl_phase2 = p * (m + 1) * (m - 1) / (m * (m - p)) * stats.f.ppf(1 - request.alpha, p, m - p)
+    ucl = np.where(np.arange(n) < m, ucl_phase1, ucl_phase2)
+    t2_signal = t2 > ucl
+
+    hotelling = {
+        "ucl_phase1": float(ucl_phase1),
+        "ucl_phase2": float(ucl_phase2),
+        "out_of_control": rows[t2_signal].tolist(),
+    }
+    hotelling.update(chart_values(t2, t2_signal, request.max_points, request.downsample_method))
+
+    # 3. MEWMA. Each point is marginally chi-square(p) in control, but the points are
+    # autocorrelated, so a chi-square(p) quantile does not give an in-control ARL of 1 / alpha.
+    # The default limit is simulated for that ARL instead (chi-square only past the simulation cap).
+    mewma = mewma_statistic(x, mean, chol, request.mewma_lambda)
+    arl0 = 1 / request.alpha
+    ucl_note = None
+    if request.mewma_ucl is not None:
+        mewma_ucl, ucl_method = request.mewma_ucl, "user"
+    elif p * arl0 <= MEWMA_MAX_SIMULATED_COST:
+        with stage("spc", "mewma_limit"):
+            mewma_ucl, ucl_method = mewma_arl_limit(p, request.mewma_lambda, arl0), "arl"
+    else:
+        mewma_ucl, ucl_method = float(stats.chi2.ppf(1 - request.alpha, p)), "chi2"
+        ucl_note = (f"{p} variables x ARL {arl0:.0f} exceeds the simulation cap of {MEWMA_MAX_SIMULATED_COST}; "
+                    "the chi-square limit signals sooner than 1 / alpha. Pass mewma_ucl for an ARL-calibrated limit.")
+    mewma_signal = mewma > mewma_ucl
+
+    mewma_chart = {
+        "lambda": request.mewma_lambda,
+        "ucl": mewma_ucl,
+        # 'arl': in-control ARL of arl0 with known parameters; 'chi2': per-point quantile (not ARL-calibrated)
+        "ucl_method": ucl_method,
+        "arl0": arl0,
+        "ucl_note": ucl_note,
+        "out_of_control": rows[mewma_signal].tolist(),
+    }
+    mewma_chart.update(chart_values(mewma, mewma_signal, request.max_points, request.downsample_method))
+
+    return MultivariateSPCResult(
+        variables=request.target_variables,
+        n=n,
+        phase1_size=m,
+        mean=mean.tolist(),
+        covariance=cov.tolist(),
+        hotelling=hotelling,
+        mewma=mewma_chart
+    )
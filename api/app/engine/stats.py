@@ -1,12 +1,23 @@
 import numpy as np
-from scipy import stats
-from typing import List, Dict, Any, Optional
+from typing import Optional
 from pydantic import BaseModel
+from .datasets import load_float_column
+from .arrays import FloatArray, EncodedFloats
+from .metrics import stage
+from .lazy import lazy_import
+
+stats = lazy_import("scipy.stats")
 
 # --- Data Models ---
 
-class EstimationRequest(BaseModel):
-    data: List[float]
+class DatasetColumnMixin(BaseModel):
+    """Lets `data` be read from a stored dataset column instead of being sent inline"""
+    dataset_id: Optional[str] = None
+    column: Optional[str] = None
+    # The column is read by the engine function (see _dataset_or_inline), not during validation
+
+class EstimationRequest(DatasetColumnMixin):
+    data: FloatArray = []  # JSON list or base64 little-endian float64
     confidence_level: float = 0.95
 
 class EstimationResult(BaseModel):
@@ -19,8 +30,12 @@ class EstimationResult(BaseModel):
     margin_of_error: float
 
 class EffectSizeRequest(BaseModel):
-    group_a: List[float]
-    group_b: List[float]
+    group_a: FloatArray = []
+    group_b: FloatArray = []
+    # Alternatively compare two columns of a stored dataset
+    dataset_id: Optional[str] = None
+    column_a: Optional[str] = None
+    column_b: Optional[str] = None
 
 class EffectSizeResult(BaseModel):
     mean_a: float
@@ -29,8 +44,8 @@ class EffectSizeResult(BaseModel):
     cohens_d: float
     interpretation: str
 
-class AdvancedRequest(BaseModel):
-    data: List[float]
+class AdvancedRequest(DatasetColumnMixin):
+    data: FloatArray = []
     prior_mean: float
     prior_std: float
 
@@ -39,13 +54,22 @@ class AdvancedResult(BaseModel):
     mle_std: float
     map_mean: float
     map_std: float # In this simple case, we might just return the updated posterior params
-    kde_x: List[float]
-    kde_y: List[float]
+    kde_x: EncodedFloats
+    kde_y: EncodedFloats
 
 # --- Calculation Functions ---
 
+def _dataset_or_inline(values, dataset_id: Optional[str], column: Optional[str]) -> np.ndarray:
+    """
+    Inline values, or the stored dataset column when none were sent. Read here in the
+    engine (off the event loop) rather than while the request is validated.
+    """
+    if dataset_id and column and len(values) == 0:
+        return load_float_column(dataset_id, column)
+    return np.asarray(values, dtype=float)
+
 def calculate_estimation(request: EstimationRequest) -> EstimationResult:
-    data = np.array(request.data)
+    data = _dataset_or_inline(request.data, request.dataset_id, request.column)
     n = len(data)
     if n <= 1:
         raise ValueError("Data must have at least 2 points for interval estimation.")
@@ -69,8 +93,8 @@ def calculate_estimation(request: EstimationRequest) -> EstimationResult:
     )
 
 def calculate_effect_size(request: EffectSizeRequest) -> EffectSizeResult:
-    a = np.array(request.group_a)
-    b = np.array(request.group_b)
+    a = _dataset_or_inline(request.group_a, request.dataset_id, request.column_a)
+    b = _dataset_or_inline(request.group_b, request.dataset_id, request.column_b)
     
     n1, n2 = len(a), len(b)
     if n1 < 2 or n2 < 2:
@@ -111,7 +135,7 @@ def calculate_effect_size(request: EffectSizeRequest) -> EffectSizeResult:
     )
 
 def calculate_advanced_estimation(request: AdvancedRequest) -> AdvancedResult:
-    data = np.array(request.data)
+    data = _dataset_or_inline(request.data, request.dataset_id, request.column)
     n = len(data)
     if n < 2:
         raise ValueError("Data must have at least 2 points.")
@@ -148,11 +172,12 @@ def calculate_advanced_estimation(request: AdvancedRequest) -> AdvancedResult:
     sigma_map = np.sqrt(1 / prec_posterior) # Standard deviation of the posterior distribution for the mean
     
     # 3. KDE (Kernel Density Estimation)
-    kde = stats.gaussian_kde(data)
-    x_min = data.min() - 3 * data.std()
-    x_max = data.max() + 3 * data.std()
-    x_grid = np.linspace(x_min, x_max, 200)
-    y_grid = kde(x_grid)
+    with stage("stats", "kde"):
+        kde = stats.gaussian_kde(data)
+        x_min = data.min() - 3 * data.std()
+        x_max = data.max() + 3 * data.std()
+        x_grid = np.linspace(x_min, x_max, 200)
+        y_grid = kde(x_grid)
     
     return AdvancedResult(
         mle_mean=float(mle_mean),
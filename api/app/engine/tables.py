@@ -0,0 +1,59 @@
+"""
+Output formats for tabular responses (design matrices, generation results).
+
+'records' is the original list of row dicts; 'columns' sends each column once as an array;
+'arrow' (IPC stream) and 'parquet' return binary bodies and need pyarrow.
+"""
+from __future__ import annotations
+from typing import List, Dict, Any, Literal, Tuple
+import io
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+TableFormat = Literal['records', 'columns', 'arrow', 'parquet']
+BINARY_FORMATS = ('arrow', 'parquet')
+
+MEDIA_TYPES = {
+    'arrow': "application/vnd.apache.arrow.stream",
+    'parquet': "application/vnd.apache.parquet",
+}
+
+
+def frame_to_columns(df: pd.DataFrame) -> Dict[str, List[Any]]:
+    """Column -> values, one tolist() per column instead of a dict per row (missing -> None)"""
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        if series.isna().any():
+            series = series.astype(object).where(series.notna(), None)
+        columns[str(name)] = series.tolist()
+    return columns
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise ImportError(
+            "pyarrow library is not installed. "
+            "For Arrow/Parquet output, please install pyarrow (pip install pyarrow)."
+        )
+
+
+def frame_to_binary(df: pd.DataFrame, fmt: str) -> Tuple[bytes, str]:
+    """Serializes the frame as an Arrow IPC stream or a Parquet file; returns (body, media type)"""
+    pa = _pyarrow()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    if fmt == 'arrow':
+        import pyarrow.ipc
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    elif fmt == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, sink)
+    else:
+        raise ValueError(f"Unsupported binary table format: {fmt}")
+    return sink.getvalue(), MEDIA_TYPES[fmt]
@@ -1,16 +1,53 @@
 """
 Time Series Analysis Engine for ARIMA and Prophet models
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Literal
+from collections import OrderedDict
+from concurrent.futures import (
+    Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+)
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import importlib.util
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import warnings
 import numpy as np
-import pandas as pd
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, PrivateAttr
+from .arrays import FloatArray, EncodedFloats
+from .metrics import stage, capture_stages, replay_stages
+from .executor import in_offload_worker, register_worker_initializer, get_offload_pool
+from .singleflight import single_flight
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")
 
 
 class TimeSeriesData(BaseModel):
     """Time series data input"""
     dates: Optional[List[str]] = None  # ISO format dates (optional for ARIMA)
-    values: List[float]  # Time series values
+    values: FloatArray = []  # Time series values (JSON list or base64 little-endian float64)
+    # Alternatively read values (and dates) from a stored dataset
+    dataset_id: Optional[str] = None
+    column: Optional[str] = None
+    date_column: Optional[str] = None
+
+    def resolved(self) -> "TimeSeriesData":
+        """
+        Values (and dates) read from the stored dataset when they were not sent inline.
+        Engines call this, so the file read runs in the worker and not during validation.
+        """
+        if not (self.dataset_id and self.column and len(self.values) == 0):
+            return self
+        from .datasets import load_column, load_float_column
+        update = {"values": load_float_column(self.dataset_id, self.column)}
+        if self.date_column and not self.dates:
+            update["dates"] = pd.to_datetime(load_column(self.dataset_id, self.date_column)).strftime('%Y-%m-%d').tolist()
+        return self.model_copy(update=update)
 
 
 class ARIMARequest(BaseModel):
@@ -20,6 +57,14 @@ class ARIMARequest(BaseModel):
     d: int = 1  # Differencing order
     q: int = 1  # MA order
     forecast_steps: int = 10  # Number of steps to forecast
+    # Automatic order selection (p, d, q above are ignored when auto is set)
+    auto: bool = False
+    max_p: int = Field(3, ge=0, le=8)
+    max_d: int = Field(2, ge=0, le=2)
+    max_q: int = Field(3, ge=0, le=8)
+    time_budget: float = Field(20.0, gt=0)  # Seconds allowed for the order search
+    # 'auto' uses statsmodels when installed and the NumPy-only ARI model otherwise
+    engine: Literal['auto', 'statsmodels', 'lite'] = 'auto'
 
 
 class ARIMAResponse(BaseModel):
@@ -27,11 +72,14 @@ class ARIMAResponse(BaseModel):
     model_params: Dict[str, Any]
     aic: float
     bic: float
-    forecast: List[float]
-    forecast_ci_lower: List[float]
-    forecast_ci_upper: List[float]
-    residuals: List[float]
-    fitted_values: List[float]
+    forecast: EncodedFloats
+    forecast_ci_lower: EncodedFloats
+    forecast_ci_upper: EncodedFloats
+    residuals: EncodedFloats
+    fitted_values: EncodedFloats
+    cache_hit: bool = False  # True when the fitted model was reused from the cache
+    order: List[int] = []  # (p, d, q) of the returned model
+    model_table: List[Dict[str, Any]] = []  # Candidates ranked by AIC (auto mode)
 
 
 class ProphetRequest(BaseModel):
@@ -42,22 +90,425 @@ class ProphetRequest(BaseModel):
     yearly_seasonality: bool = True
     weekly_seasonality: bool = True
     daily_seasonality: bool = False
+    series_id: Optional[str] = None  # Enables warm-start refits of the same series
 
 
 class ProphetResponse(BaseModel):
     """Response model for Prophet analysis"""
-    forecast: List[float]
-    forecast_lower: List[float]
-    forecast_upper: List[float]
-    trend: List[float]
+    forecast: EncodedFloats
+    forecast_lower: EncodedFloats
+    forecast_upper: EncodedFloats
+    trend: EncodedFloats
     dates: List[str]
     components: Dict[str, List[float]]
+    warm_start: bool = False  # True when the optimizer started from cached parameters
+    iterations: Optional[int] = None  # Stan optimizer iterations
+    fit_time: float = 0.0  # Seconds spent in model.fit
+    _optimum: Optional[Dict[str, Any]] = PrivateAttr(None)  # Fitted parameters, usable as a later init
+
+
+class FittedModelCache:
+    """
+    Thread-safe LRU cache for fitted models, bounded by entry count and estimated bytes.
+    """
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, value: Any, nbytes: int) -> None:
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self._entries[key] = (value, nbytes)
+            self.total_bytes += nbytes
+            # Evict least recently used entries until both limits hold
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_bytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+arima_cache = FittedModelCache(
+    max_entries=int(os.getenv("ARIMA_CACHE_MAX_ENTRIES", "64")),
+    max_bytes=int(os.getenv("ARIMA_CACHE_MAX_MB", "256")) * 1024 * 1024
+)
+
+
+prophet_param_cache = FittedModelCache(
+    max_entries=int(os.getenv("PROPHET_PARAM_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("PROPHET_PARAM_CACHE_MAX_MB", "64")) * 1024 * 1024
+)
+
+
+def series_key(values: np.ndarray, *settings: Any) -> str:
+    """Cache key from the raw bytes of the series plus the model settings"""
+    digest = hashlib.sha1(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    digest.update(repr(settings).encode())
+    return digest.hexdigest()
+
+
+def _results_nbytes(fitted_model) -> int:
+    """Rough memory footprint of a statsmodels results object (its filter output arrays)"""
+    nbytes = 0
+    for holder in (fitted_model, getattr(fitted_model, 'filter_results', None)):
+        for value in vars(holder).values() if holder is not None else ():
+            if isinstance(value, np.ndarray):
+                nbytes += value.nbytes
+    return nbytes
+
+
+_forecast_pool: Optional[Executor] = None
+_forecast_pool_pid: Optional[int] = None
+_forecast_pool_lock = threading.Lock()
+_in_pool_worker = False
+_worker_warmup: Dict[str, Any] = {}
+_warmup_futures: List[Any] = []
+_warm_reports = None  # Queue that every pool worker initializer reports to (multiprocessing.Queue)
+_warm_workers: Dict[int, Dict[str, Any]] = {}  # Reports received so far, by worker pid
+
+
+def warmup_enabled() -> bool:
+    """FORECAST_WARMUP=1 pre-imports forecasting libraries in dedicated pool workers"""
+    return os.getenv("FORECAST_WARMUP", "").lower() in ("1", "true", "yes")
+
+
+def _warm_up_libraries() -> Dict[str, Any]:
+    """
+    Imports statsmodels and Prophet and runs a tiny fit with each, so that lazy
+    imports, compiled extensions and the CmdStan model are loaded before real traffic.
+    """
+    status: Dict[str, Any] = {"pid": os.getpid()}
+    rng = np.random.default_rng(0)
+    y = np.cumsum(rng.normal(size=60))
+
+    start = time.perf_counter()
+    try:
+        from statsmodels.tsa.arima.model import ARIMA
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            ARIMA(y, order=(1, 1, 1)).fit()
+        status["statsmodels"] = True
+    except Exception:
+        status["statsmodels"] = False
+    status["statsmodels_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        from prophet import Prophet
+        frame = pd.DataFrame({'ds': pd.date_range('2020-01-01', periods=len(y), freq='D'), 'y': y})
+        Prophet(yearly_seasonality=False, weekly_seasonality=False, daily_seasonality=False).fit(frame)
+        status["prophet"] = True
+    except Exception:
+        status["prophet"] = False
+    status["prophet_seconds"] = time.perf_counter() - start
+    return status
+
+
+def _init_pool_worker(reports=None) -> None:
+    """Initializer for forecast pool processes; reports each finished warm-up to the parent"""
+    global _in_pool_worker, _worker_warmup
+    _in_pool_worker = True
+    if warmup_enabled():
+        _worker_warmup = _warm_up_libraries()
+    if reports is not None:
+        reports.put(dict(_worker_warmup, pid=os.getpid()))
+
+
+def _init_offload_worker() -> None:
+    """
+    Initializer for offload worker processes. Forecasts routed through an offload worker
+    fit in-process there instead of on the warm pool, so the worker warms up on its own.
+    """
+    global _worker_warmup
+    if warmup_enabled():
+        _worker_warmup = _warm_up_libraries()
+
+
+register_worker_initializer(_init_offload_worker)
+
+
+def _worker_status() -> Dict[str, Any]:
+    """Warm-up report of the worker this task lands on"""
+    return dict(_worker_warmup, pid=os.getpid())
+
+
+def get_forecast_pool() -> Executor:
+    """
+    Shared process pool for CPU-bound model fitting (size from FORECAST_WORKERS).
+    Code already running inside a pool (or offload) worker gets a single thread instead of a nested pool.
+    """
+    global _forecast_pool, _forecast_pool_pid, _warm_reports
+    with _forecast_pool_lock:
+        # A forked server process must not reuse its parent's pool
+        if _forecast_pool is None or _forecast_pool_pid != os.getpid():
+            if _in_pool_worker or in_offload_worker():
+                _forecast_pool = ThreadPoolExecutor(max_workers=1)
+            else:
+                workers = int(os.getenv("FORECAST_WORKERS", "0")) or None
+                _warm_reports = multiprocessing.Queue()
+                _warm_workers.clear()
+                _forecast_pool = ProcessPoolExecutor(
+                    max_workers=workers, initializer=_init_pool_worker, initargs=(_warm_reports,)
+                )
+            _forecast_pool_pid = os.getpid()
+        return _forecast_pool
+
+
+def replace_broken_pool(broken: Executor) -> None:
+    """
+    Drops a pool that a dead worker (e.g. an OOM kill) left unusable, so the next
+    get_forecast_pool() starts a fresh one; with warm-up enabled the new workers warm up again.
+    """
+    global _forecast_pool, _warmup_futures
+    with _forecast_pool_lock:
+        if _forecast_pool is not broken:
+            return  # Another caller already replaced it
+        _forecast_pool = None
+        _warmup_futures = []
+    broken.shutdown(wait=False, cancel_futures=True)
+    start_forecast_warmup()
+
+
+def submit_forecast(fn, *args) -> Future:
+    """Submits fn(*args) to the forecast pool, replacing the pool once if it is broken"""
+    pool = get_forecast_pool()
+    try:
+        return pool.submit(fn, *args)
+    except BrokenProcessPool:
+        replace_broken_pool(pool)
+        return get_forecast_pool().submit(fn, *args)
+
+
+def run_forecast_task(fn, *args) -> Any:
+    """
+    fn(*args) on the forecast pool. A task whose worker died is retried once on a fresh
+    pool, since the crash may have been another task's.
+    """
+    for attempt in range(2):
+        pool = get_forecast_pool()
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            replace_broken_pool(pool)
+            if attempt:
+                raise
+
+
+def start_forecast_warmup() -> None:
+    """
+    Starts every forecast pool worker (and offload worker, when OFFLOAD_WORKERS > 0) so
+    their initializers warm up the libraries in the background. The calling (web)
+    process imports nothing itself.
+    """
+    global _warmup_futures
+    if not warmup_enabled() or _warmup_futures:
+        return
+    get_offload_pool().prestart()
+    pool = get_forecast_pool()
+    # Each submit to a pool without idle workers spawns a new one, up to max_workers
+    _warmup_futures = [pool.submit(_worker_status) for _ in range(getattr(pool, '_max_workers', 1))]
+
+
+def forecast_pool_status() -> Dict[str, Any]:
+    """
+    Readiness of the warm forecasting pool: ready once every live worker process has
+    finished its initializer. A replaced worker is not ready until its own initializer reports.
+    """
+    if not warmup_enabled():
+        return {"warmup_enabled": False, "ready": True, "workers": []}
+
+    pool = get_forecast_pool()
+    n_workers = getattr(pool, '_max_workers', 1)
+    with _forecast_pool_lock:
+        while _warm_reports is not None:
+            try:
+                report = _warm_reports.get_nowait()
+            except queue.Empty:
+                break
+            _warm_workers[report["pid"]] = report
+        live = getattr(pool, '_processes', None) or {}
+        workers = [w for pid, w in _warm_workers.items() if pid in live]
+    return {
+        "warmup_enabled": True,
+        "ready": bool(_warmup_futures) and len(workers) >= n_workers,
+        "workers_warm": len(workers),
+        "workers_total": n_workers,
+        "workers": workers,
+    }
+
+
+def _fit_with_stages(fit_fn, request) -> Tuple[Any, List[Tuple[str, str, float, bool]]]:
+    """Pool task: the forecast plus the stages it timed, for replay in the calling process"""
+    with capture_stages() as stages:
+        result = fit_fn(request)
+    return result, stages
+
+
+def dispatch_forecast(fit_fn, request):
+    """
+    Runs a single forecast on the warm pool when warm-up is enabled, otherwise in-process.
+    Inside an offload worker the forecast always runs in-process; that worker warmed the
+    libraries up in its own initializer (_init_offload_worker).
+    """
+    if warmup_enabled() and not (_in_pool_worker or in_offload_worker()):
+        result, stages = run_forecast_task(_fit_with_stages, fit_fn, request)
+        replay_stages(stages)
+        return result
+    return fit_fn(request)
+
+
+def select_differencing(values: np.ndarray, max_d: int = 2, alpha: float = 0.05) -> int:
+    """
+    Differencing order from repeated KPSS unit-root tests (null hypothesis: stationary).
+    """
+    from statsmodels.tsa.stattools import kpss
+
+    series = np.asarray(values, dtype=float)
+    for d in range(max_d + 1):
+        if d == max_d or len(series) < 10 or np.ptp(series) == 0:
+            return d
+        with warnings.catch_warnings():
+            # kpss warns when the statistic falls outside its p-value table
+            warnings.simplefilter("ignore")
+            _, p_value, _, _ = kpss(series, regression='c', nlags='auto')
+        if p_value >= alpha:
+            return d
+        series = np.diff(series)
+    return max_d
+
+
+def _n_params(p: int, d: int, q: int) -> int:
+    """Estimated parameters of ARIMA(p, d, q): AR, MA, sigma2 and a constant when d == 0"""
+    return p + q + 1 + (1 if d == 0 else 0)
+
+
+def _fit_order(values: np.ndarray, order: Tuple[int, int, int],
+               keep_below: float = np.inf) -> Tuple[Dict[str, Any], Optional[Any]]:
+    """
+    Fits one candidate order and returns its information criteria (runs in a worker),
+    plus the fitted results when its AIC beats keep_below, so the winner need not be refitted.
+    """
+    from statsmodels.tsa.arima.model import ARIMA
+
+    row = {"p": order[0], "d": order[1], "q": order[2], "n_params": _n_params(*order)}
+    fitted = None
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            fitted = ARIMA(values, order=order).fit()
+        row.update(aic=float(fitted.aic), bic=float(fitted.bic), loglik=float(fitted.llf))
+    except Exception as e:
+        row["error"] = str(e)
+    return row, fitted if fitted is not None and row["aic"] < keep_below else None
+
 
+def search_arima_order(values: np.ndarray, max_d: int, max_p: int, max_q: int,
+                       time_budget: float) -> Tuple[List[Dict[str, Any]], Optional[Any]]:
+    """
+    Chooses d with KPSS tests, fits the (p, q) grid on the process pool and ranks
+    candidates by AIC. Returns the ranked table and the winner's fitted results.
+
+    The largest model ARIMA(max_p, d, max_q) nests every other candidate, so its
+    log-likelihood bounds theirs: AIC(p, q) >= -2 * loglik_full + 2 * k(p, q).
+    It is submitted first and the rest follow in waves no larger than the pool, so
+    the bound is checked against the best AIC so far right before each submit.
+    The time budget covers the KPSS tests too; once it runs out nothing new is
+    started and at most one wave of fits finishes in the background.
+    """
+    deadline = time.monotonic() + time_budget
+    values = np.asarray(values, dtype=float)
+    d = select_differencing(values, max_d)
+    pool = get_forecast_pool()
+    wave = getattr(pool, '_max_workers', 1) or 1
+
+    full = (max_p, d, max_q)
+    # Cheapest candidates first so a good incumbent appears early
+    queued = sorted(
+        ((p, d, q) for p, q in itertools.product(range(max_p + 1), range(max_q + 1)) if (p, d, q) != full),
+        key=lambda o: (_n_params(*o), o)
+    )
+    queued.insert(0, full)
 
+    def skipped(order, reason):
+        return {"p": order[0], "d": order[1], "q": order[2], "n_params": _n_params(*order), reason: True}
+
+    results: List[Dict[str, Any]] = []
+    best_aic = np.inf
+    best_fit = None
+    full_loglik = None
+    pending: Dict[Future, Tuple[int, int, int]] = {}
+
+    while queued or pending:
+        if time.monotonic() >= deadline:
+            break
+        # Top the wave up, skipping candidates that cannot beat the incumbent
+        while queued and len(pending) < wave:
+            order = queued.pop(0)
+            if full_loglik is not None and -2 * full_loglik + 2 * _n_params(*order) >= best_aic:
+                results.append(skipped(order, "pruned"))
+                continue
+            pending[submit_forecast(_fit_order, values, order, best_aic)] = order
+        if not pending:
+            break
+
+        done, _ = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        for future in done:
+            order = pending.pop(future)
+            try:
+                row, fitted = future.result()
+            except BrokenProcessPool as e:
+                # The worker died mid-fit; later submits go to a replacement pool
+                replace_broken_pool(pool)
+                row, fitted = {**skipped(order, "failed"), "error": f"Worker failed: {e}"}, None
+            results.append(row)
+            if "aic" not in row:
+                continue
+            if order == full:
+                full_loglik = row["loglik"]
+            if row["aic"] < best_aic:
+                best_aic = row["aic"]
+                best_fit = fitted
+
+    # Out of time: drop what has not started (running fits finish in the background)
+    for future, order in pending.items():
+        future.cancel()
+        results.append(skipped(order, "timed_out"))
+    results.extend(skipped(order, "timed_out") for order in queued)
+
+    return sorted(results, key=lambda r: r.get("aic", np.inf)), best_fit
+
+
+@single_flight
 def fit_arima(request: ARIMARequest) -> ARIMAResponse:
     """
     Fit ARIMA model and generate forecasts
     """
+    if request.engine == 'lite' or (
+        request.engine == 'auto' and importlib.util.find_spec("statsmodels") is None
+    ):
+        return fit_arima_lite(request)
+
     try:
         try:
             from statsmodels.tsa.arima.model import ARIMA
@@ -69,19 +520,40 @@ def fit_arima(request: ARIMARequest) -> ARIMAResponse:
             )
         
         # Prepare data
-        values = np.array(request.data.values)
-        
-        # Fit ARIMA model
-        model = ARIMA(values, order=(request.p, request.d, request.q))
-        fitted_model = model.fit()
-        
-        # Generate forecast
-        forecast_result = fitted_model.forecast(steps=request.forecast_steps)
-        forecast_values = forecast_result.tolist() if hasattr(forecast_result, 'tolist') else [forecast_result]
-        
-        # Get confidence intervals
-        forecast_obj = fitted_model.get_forecast(steps=request.forecast_steps)
-        forecast_ci = forecast_obj.conf_int()
+        values = np.asarray(request.data.resolved().values, dtype=float)
+        order = (request.p, request.d, request.q)
+
+        model_table = []
+        searched = None
+        if request.auto:
+            with stage("arima", "order_search"):
+                model_table, searched = search_arima_order(
+                    values, request.max_d, request.max_p, request.max_q, request.time_budget
+                )
+            if not model_table or "aic" not in model_table[0]:
+                raise ValueError("No candidate model could be fitted within the time budget.")
+            best = model_table[0]
+            order = (best["p"], best["d"], best["q"])
+
+        # Reuse the fitted model when only the forecast horizon changed
+        key = series_key(values, 'arima', order)
+        fitted_model = arima_cache.get(key)
+        cache_hit = fitted_model is not None
+        if not cache_hit:
+            if searched is not None:
+                # The order search already fitted the winner
+                fitted_model = searched
+            else:
+                with stage("arima", "fit"):
+                    model = ARIMA(values, order=order)
+                    fitted_model = model.fit()
+            arima_cache.put(key, fitted_model, _results_nbytes(fitted_model) + values.nbytes)
+
+        # Forecast and confidence intervals from a single get_forecast call
+        with stage("arima", "forecast"):
+            forecast_obj = fitted_model.get_forecast(steps=request.forecast_steps)
+            forecast_values = np.asarray(forecast_obj.predicted_mean).tolist()
+            forecast_ci = forecast_obj.conf_int()
         
         # Convert to numpy array first to avoid iloc issues
         ci_array = np.asarray(forecast_ci)
@@ -117,7 +589,10 @@ def fit_arima(request: ARIMARequest) -> ARIMAResponse:
             forecast_ci_lower=ci_lower,
             forecast_ci_upper=ci_upper,
             residuals=residuals,
-            fitted_values=fitted_values
+            fitted_values=fitted_values,
+            cache_hit=cache_hit,
+            order=list(order),
+            model_table=model_table
         )
     except ImportError as ie:
         raise ValueError(str(ie))
@@ -125,9 +600,26 @@ def fit_arima(request: ARIMARequest) -> ARIMAResponse:
         raise ValueError(f"ARIMA fitting failed: {str(e)}")
 
 
-def fit_prophet(request: ProphetRequest) -> ProphetResponse:
+def _prophet_warm_start_params(model) -> Dict[str, Any]:
+    """Optimum of a fitted Prophet model in the shape Stan expects as initial values"""
+    params = {name: float(model.params[name][0][0]) for name in ('k', 'm', 'sigma_obs')}
+    params.update({name: np.asarray(model.params[name][0]) for name in ('delta', 'beta')})
+    return params
+
+
+def _stan_iterations(model) -> Optional[int]:
+    """Optimizer iteration count (requires save_iterations=True at fit time)"""
+    try:
+        return int(model.stan_backend.stan_fit.optimized_iterations_np.shape[0])
+    except Exception:
+        return None
+
+
+@single_flight
+def fit_prophet(request: ProphetRequest, init: Optional[Dict[str, Any]] = None) -> ProphetResponse:
     """
-    Fit Prophet model and generate forecasts
+    Fit Prophet model and generate forecasts.
+    init overrides the cached optimum of request.series_id as the optimizer's starting point.
     """
     try:
         try:
@@ -140,32 +632,66 @@ def fit_prophet(request: ProphetRequest) -> ProphetResponse:
             )
         
         # Prepare data in Prophet format
-        if request.data.dates:
-            df = pd.DataFrame({
-                'ds': pd.to_datetime(request.data.dates),
-                'y': request.data.values
-            })
-        else:
-            # Generate sequential dates if not provided
-            df = pd.DataFrame({
-                'ds': pd.date_range(start='2020-01-01', periods=len(request.data.values), freq='D'),
-                'y': request.data.values
-            })
-        
+        with stage("prophet", "dataframe"):
+            data = request.data.resolved()
+            if data.dates:
+                df = pd.DataFrame({
+                    'ds': pd.to_datetime(data.dates),
+                    'y': data.values
+                })
+            else:
+                # Generate sequential dates if not provided
+                df = pd.DataFrame({
+                    'ds': pd.date_range(start='2020-01-01', periods=len(data.values), freq='D'),
+                    'y': data.values
+                })
+
         # Initialize and fit Prophet model
-        model = Prophet(
-            seasonality_mode=request.seasonality_mode,
-            yearly_seasonality=request.yearly_seasonality,
-            weekly_seasonality=request.weekly_seasonality,
-            daily_seasonality=request.daily_seasonality
-        )
-        model.fit(df)
-        
-        # Create future dataframe
-        future = model.make_future_dataframe(periods=request.forecast_periods)
+        def make_model():
+            return Prophet(
+                seasonality_mode=request.seasonality_mode,
+                yearly_seasonality=request.yearly_seasonality,
+                weekly_seasonality=request.weekly_seasonality,
+                daily_seasonality=request.daily_seasonality
+            )
+
+        # Start from the previous optimum of the same series and settings when known
+        cache_key = None
+        if request.series_id:
+            cache_key = repr((request.series_id, request.seasonality_mode, request.yearly_seasonality,
+                              request.weekly_seasonality, request.daily_seasonality))
+            if init is None:
+                init = prophet_param_cache.get(cache_key)
+
+        fit_start = time.perf_counter()
+        with stage("prophet", "fit"):
+            model = make_model()
+            warm_start = init is not None
+            try:
+                if warm_start:
+                    model.fit(df, init=init, save_iterations=True)
+                else:
+                    model.fit(df, save_iterations=True)
+            except Exception:
+                if not warm_start:
+                    raise
+                # Cached parameters no longer match the model shape: fit from scratch
+                warm_start = False
+                model = make_model()
+                model.fit(df, save_iterations=True)
+        fit_time = time.perf_counter() - fit_start
+
+        params = _prophet_warm_start_params(model)
+        if cache_key is not None:
+            nbytes = sum(np.asarray(v).nbytes for v in params.values())
+            prophet_param_cache.put(cache_key, params, nbytes)
         
-        # Generate forecast
-        forecast = model.predict(future)
+        with stage("prophet", "predict"):
+            # Create future dataframe
+            future = model.make_future_dataframe(periods=request.forecast_periods)
+
+            # Generate forecast
+            forecast = model.predict(future)
         
         # Extract components
         components = {}
@@ -179,15 +705,534 @@ def fit_prophet(request: ProphetRequest) -> ProphetResponse:
         # Get forecast values (only future periods)
         forecast_data = forecast.tail(request.forecast_periods)
         
-        return ProphetResponse(
+        result = ProphetResponse(
             forecast=forecast_data['yhat'].tolist(),
             forecast_lower=forecast_data['yhat_lower'].tolist(),
             forecast_upper=forecast_data['yhat_upper'].tolist(),
             trend=forecast_data['trend'].tolist(),
             dates=forecast_data['ds'].dt.strftime('%Y-%m-%d').tolist(),
-            components=components
+            components=components,
+            warm_start=warm_start,
+            iterations=_stan_iterations(model),
+            fit_time=fit_time
         )
+        result._optimum = params
+        return result
     except ImportError as ie:
         raise ValueError(str(ie))
     except Exception as e:
         raise ValueError(f"Prophet fitting failed: {str(e)}")
+
+
+# --- Batch Forecasting ---
+
+class BatchSeries(BaseModel):
+    """One series of a batch, identified by the caller's id (e.g. sensor tag)"""
+    id: str
+    data: TimeSeriesData
+
+
+class BatchForecastRequest(BaseModel):
+    """Request model for forecasting many series with the same settings"""
+    model: Literal['arima', 'prophet'] = 'arima'
+    series: List[BatchSeries]
+    # ARIMARequest / ProphetRequest fields other than data (e.g. {"p": 2, "forecast_steps": 24})
+    params: Dict[str, Any] = {}
+    max_in_flight: int = Field(16, ge=1, le=1000)  # Series submitted to the pool at once (a window, not a chunk)
+
+
+def _forecast_one(model: str, params: Dict[str, Any], item: BatchSeries) -> Dict[str, Any]:
+    """Forecasts a single series; failures are reported instead of raised"""
+    try:
+        if model == 'arima':
+            result = fit_arima(ARIMARequest(data=item.data, **params))
+        else:
+            # The batch id doubles as the warm-start key unless the caller set one
+            result = fit_prophet(ProphetRequest(data=item.data, **{"series_id": item.id, **params}))
+        return {"id": item.id, "status": "ok", "result": result.model_dump()}
+    except Exception as e:
+        return {"id": item.id, "status": "error", "error": str(e)}
+
+
+def iter_batch_forecasts(request: BatchForecastRequest) -> Iterator[Dict[str, Any]]:
+    """
+    Fans the batch out to the forecast pool one series per task and yields each
+    series' result as soon as it finishes, followed by a summary record. At most
+    max_in_flight series are in flight; each finished one makes room for the next.
+    Every series gets a record, even when its worker dies or it cannot be scheduled.
+    """
+    start_time = time.time()
+    # Validate shared settings once so a typo fails fast instead of once per series
+    if request.series:
+        template = ARIMARequest if request.model == 'arima' else ProphetRequest
+        template(data=request.series[0].data, **request.params)
+
+    queued = iter(request.series)
+    futures: Dict[Future, BatchSeries] = {}
+    unscheduled: List[Dict[str, Any]] = []
+
+    def submit_next() -> None:
+        for item in queued:
+            try:
+                futures[submit_forecast(_forecast_one, request.model, request.params, item)] = item
+                return
+            except Exception as e:
+                unscheduled.append({"id": item.id, "status": "error", "error": f"Could not schedule: {e}"})
+
+    n_ok = n_failed = 0
+    try:
+        for _ in range(request.max_in_flight):
+            submit_next()
+        while futures or unscheduled:
+            records = unscheduled[:]
+            unscheduled.clear()
+            if futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = futures.pop(future)
+                    try:
+                        records.append(future.result())
+                    except Exception as e:
+                        # Worker crashed (e.g. out of memory); the next submit replaces the pool
+                        records.append({"id": item.id, "status": "error", "error": f"Worker failed: {e}"})
+                    submit_next()
+            for record in records:
+                if record["status"] == "ok":
+                    n_ok += 1
+                else:
+                    n_failed += 1
+                yield record
+    finally:
+        # Client went away: drop series that have not started
+        for future in futures:
+            future.cancel()
+
+    yield {"status": "done", "n_ok": n_ok, "n_failed": n_failed, "total_time": time.time() - start_time}
+
+
+# --- Lightweight Forecasting Engine (NumPy/SciPy only) ---
+
+class LiteForecastRequest(BaseModel):
+    """Request model for the dependency-light forecasting engine"""
+    data: TimeSeriesData
+    method: Literal['ses', 'holt', 'holt_winters', 'ar'] = 'holt'
+    seasonal_period: int = Field(7, ge=2)  # Holt-Winters season length
+    p: int = Field(1, ge=0)  # AR order ('ar' method)
+    d: int = Field(1, ge=0, le=2)  # Differencing order ('ar' method)
+    forecast_steps: int = 10
+    confidence_level: float = 0.95
+
+
+def _ets_psi(alpha: float, beta: float, gamma: float, trend: bool, period: int, length: int) -> np.ndarray:
+    """
+    Impulse response of the one-step forecasts to an error: psi_0 = 1 and
+    psi_j = alpha + j * alpha * beta + gamma * [j % period == 0] for j >= 1.
+    """
+    j = np.arange(length, dtype=float)
+    psi = np.full(length, alpha)
+    if trend:
+        psi += j * alpha * beta
+    if period:
+        psi += gamma * ((j % period) == 0)
+    psi[0] = 1.0
+    return psi
+
+
+def _ets_errors(y: np.ndarray, alpha: float, beta: float, gamma: float,
+                trend: bool, period: int, level0: float, trend0: float, season0: np.ndarray) -> np.ndarray:
+    """
+    One-step errors of additive exponential smoothing (SES, Holt, Holt-Winters).
+
+    The model is equivalent to diff(B) y_t = theta(B) e_t with diff(B) = (1-B)^(1+trend)
+    for non-seasonal models and (1-B)(1-B^period) for Holt-Winters, and
+    theta = diff * psi. The first deg(diff) steps run the state recursion from the
+    initial states; the remainder is a single IIR filter pass.
+    """
+    from scipy import signal
+
+    if period:
+        diff = np.convolve([1.0, -1.0], np.r_[1.0, np.zeros(period - 1), -1.0])
+    else:
+        diff = np.array([1.0, -1.0]) if not trend else np.array([1.0, -2.0, 1.0])
+    k = len(diff) - 1
+    theta = np.convolve(diff, _ets_psi(alpha, beta, gamma, trend, period, k + 1))[:k + 1]
+
+    # Explicit recursion for the first k observations
+    n = len(y)
+    e = np.empty(n)
+    level, slope = level0, trend0
+    season = np.array(season0, dtype=float)
+    for t in range(min(k, n)):
+        s_idx = t % period if period else 0
+        e[t] = y[t] - (level + slope + (season[s_idx] if period else 0.0))
+        level = level + slope + alpha * e[t]
+        slope = slope + alpha * beta * e[t] if trend else 0.0
+        if period:
+            season[s_idx] += gamma * e[t]
+    if n <= k:
+        return e
+
+    # Filter state from the past k inputs/outputs (what signal.lfiltic computes, without its loops)
+    past_x, past_e = y[k - 1::-1], e[k - 1::-1]
+    zi = np.correlate(diff[1:], past_x, 'full')[k - 1:] - np.correlate(theta[1:], past_e, 'full')[k - 1:]
+    e[k:], _ = signal.lfilter(diff, theta, y[k:], zi=zi)
+    return e
+
+
+def _ets_initial_states(y: np.ndarray, trend: bool, period: int) -> Tuple[float, float, np.ndarray]:
+    """Heuristic initial level, trend and seasonal states"""
+    if period:
+        first = y[:period].mean()
+        second = y[period:2 * period].mean() if len(y) >= 2 * period else first
+        slope = (second - first) / period if trend else 0.0
+        # Level sits one step before y[0], so back it off by the slope and mid-season offset
+        level = first - slope * (period + 1) / 2
+        return level, slope, y[:period] - first
+    slope = (y[1] - y[0]) if trend and len(y) > 1 else 0.0
+    return y[0] - slope, slope, np.zeros(0)
+
+
+def _fit_ets(y: np.ndarray, trend: bool, period: int) -> Dict[str, Any]:
+    """Estimates smoothing parameters by minimizing the one-step SSE"""
+    from scipy import optimize
+
+    level0, trend0, season0 = _ets_initial_states(y, trend, period)
+
+    def sse(params):
+        alpha, beta, gamma = params[0], params[1] if trend else 0.0, params[-1] if period else 0.0
+        e = _ets_errors(y, alpha, beta, gamma, trend, period, level0, trend0, season0)
+        return float(e @ e)
+
+    eps = 1e-4
+    if not trend and not period:
+        opt = optimize.minimize_scalar(lambda a: sse([a]), bounds=(eps, 1 - eps), method='bounded')
+        params = [float(opt.x)]
+    else:
+        start = [0.5] + ([0.1] if trend else []) + ([0.1] if period else [])
+        opt = optimize.minimize(sse, start, method='L-BFGS-B', bounds=[(eps, 1 - eps)] * len(start))
+        params = [float(v) for v in opt.x]
+
+    alpha = params[0]
+    beta = params[1] if trend else 0.0
+    gamma = params[-1] if period else 0.0
+    e = _ets_errors(y, alpha, beta, gamma, trend, period, level0, trend0, season0)
+
+    # Final states from the errors: level and trend accumulate, each season slot sums its own errors
+    n = len(y)
+    csum = np.cumsum(e)
+    slope_n = trend0 + alpha * beta * csum[-1] if trend else 0.0
+    slopes_before = trend0 * n + (alpha * beta * csum[:-1].sum() if trend else 0.0)
+    level_n = level0 + slopes_before + alpha * csum[-1]
+    season_n = season0 + gamma * np.bincount(np.arange(n) % period, weights=e, minlength=period) if period else season0
+
+    return {
+        "alpha": alpha, "beta": beta, "gamma": gamma, "errors": e,
+        "level": level_n, "slope": slope_n, "season": season_n, "n_params": len(params),
+    }
+
+
+def _lag_matrix(x: np.ndarray, p: int) -> np.ndarray:
+    """Rows [1, x_{t-1}, ..., x_{t-p}] for t = p .. len(x) - 1"""
+    lags = np.lib.stride_tricks.sliding_window_view(x, p + 1)[:, :-1][:, ::-1] if p else np.empty((len(x), 0))
+    return np.column_stack([np.ones(len(lags)), lags])
+
+
+def _fit_ar(y: np.ndarray, p: int, d: int) -> Dict[str, Any]:
+    """ARI(p, d) with drift fitted by one least-squares solve on the lag matrix of the differenced series"""
+    x = np.diff(y, n=d) if d else y
+    if len(x) <= 2 * p + 1:
+        raise ValueError(f"Series too short for AR({p}) after {d} difference(s).")
+    design = _lag_matrix(x, p)
+    target = x[p:]
+    coef, *_ = np.linalg.lstsq(design, target, rcond=None)
+    e = target - design @ coef
+    return {"intercept": float(coef[0]), "ar": coef[1:], "errors": e, "n_params": p + 1}
+
+
+def _ar_psi(ar: np.ndarray, d: int, length: int) -> np.ndarray:
+    """MA(infinity) weights of the ARI model, for forecast error variances"""
+    from scipy import signal
+
+    poly = np.r_[1.0, -ar]
+    for _ in range(d):
+        poly = np.convolve(poly, [1.0, -1.0])
+    impulse = np.zeros(length)
+    impulse[0] = 1.0
+    return signal.lfilter([1.0], poly, impulse)
+
+
+def fit_lite(request: LiteForecastRequest) -> ARIMAResponse:
+    """
+    Forecast with exponential smoothing or an ARI model using only NumPy/SciPy.
+    Intervals use the model's psi weights: Var(e_h) = sigma2 * sum(psi_j^2, j < h).
+    """
+    from scipy import stats
+
+    y = np.asarray(request.data.resolved().values, dtype=float)
+    h = request.forecast_steps
+    if len(y) < 3:
+        raise ValueError("At least 3 observations are required.")
+
+    if request.method == 'ar':
+        with stage("lite", "fit"):
+            fit = _fit_ar(y, request.p, request.d)
+        p, d = request.p, request.d
+        e = fit["errors"]
+
+        # Recursive forecasts on the differenced scale, then undo the differencing
+        x = list(np.diff(y, n=d) if d else y)
+        for _ in range(h):
+            recent = x[-p:][::-1] if p else []
+            x.append(fit["intercept"] + float(np.dot(fit["ar"], recent)))
+        forecast = np.array(x[-h:]) if h else np.zeros(0)
+        for level in range(d, 0, -1):
+            forecast = np.diff(y, n=level - 1)[-1] + np.cumsum(forecast)
+        psi = _ar_psi(fit["ar"], d, max(h, 1))
+
+        # The first p + d observations have no conditional fit: reported as exact
+        warmup = p + d
+        fitted = np.r_[y[:warmup], y[warmup:] - e]
+        residuals = np.r_[np.zeros(warmup), e]
+        model_params = {"ar_params": fit["ar"].tolist(), "ma_params": [], "intercept": fit["intercept"]}
+    else:
+        trend = request.method in ('holt', 'holt_winters')
+        period = request.seasonal_period if request.method == 'holt_winters' else 0
+        if period and len(y) < 2 * period:
+            raise ValueError(f"Holt-Winters needs at least two seasons ({2 * period} points).")
+        with stage("lite", "fit"):
+            fit = _fit_ets(y, trend, period)
+        e = fit["errors"]
+
+        steps = np.arange(1, h + 1)
+        forecast = fit["level"] + steps * fit["slope"]
+        if period:
+            forecast = forecast + fit["season"][(len(y) + steps - 1) % period]
+        psi = _ets_psi(fit["alpha"], fit["beta"], fit["gamma"], trend, period, max(h, 1))
+
+        fitted = y - e
+        residuals = e
+        model_params = {"ar_params": [], "ma_params": [],
+                        "alpha": fit["alpha"], "beta": fit["beta"], "gamma": fit["gamma"]}
+
+    n_eff = len(e)
+    k = fit["n_params"]
+    sigma2 = float(e @ e / max(n_eff - k, 1))
+    z = stats.norm.ppf((1 + request.confidence_level) / 2)
+    half_width = z * np.sqrt(sigma2 * np.cumsum(psi[:h] ** 2))
+
+    # Gaussian log-likelihood at the ML variance
+    sse = max(float(e @ e), np.finfo(float).tiny)  # An exact fit would give log(0)
+    loglik = -0.5 * n_eff * (np.log(2 * np.pi * sse / n_eff) + 1)
+    model_params.update(sigma2=sigma2, engine='lite', method=request.method)
+
+    return ARIMAResponse(
+        model_params=model_params,
+        aic=float(-2 * loglik + 2 * (k + 1)),
+        bic=float(-2 * loglik + np.log(n_eff) * (k + 1)),
+        forecast=forecast.tolist(),
+        forecast_ci_lower=(forecast - half_width).tolist(),
+        forecast_ci_upper=(forecast + half_width).tolist(),
+        residuals=residuals.tolist(),
+        fitted_values=fitted.tolist(),
+        order=[request.p, request.d, 0] if request.method == 'ar' else []
+    )
+
+
+def fit_arima_lite(request: ARIMARequest) -> ARIMAResponse:
+    """
+    ARIMARequest served by the ARI(p, d) least-squares model (the MA order q is not modeled).
+    In auto mode p is chosen by AIC for the requested d.
+    """
+    data = request.data.resolved()
+
+    def lite(p: int) -> ARIMAResponse:
+        return fit_lite(LiteForecastRequest(
+            data=data, method='ar', p=p, d=request.d, forecast_steps=request.forecast_steps
+        ))
+
+    model_table = []
+    if request.auto:
+        fits = {}
+        for p in range(request.max_p + 1):
+            try:
+                fits[p] = lite(p)
+                model_table.append({"p": p, "d": request.d, "q": 0, "n_params": p + 1,
+                                    "aic": fits[p].aic, "bic": fits[p].bic})
+            except ValueError as e:
+                model_table.append({"p": p, "d": request.d, "q": 0, "error": str(e)})
+        if not fits:
+            raise ValueError("No candidate model could be fitted.")
+        model_table.sort(key=lambda r: r.get("aic", np.inf))
+        result = fits[model_table[0]["p"]]
+    else:
+        result = lite(request.p)
+
+    result.model_table = model_table
+    if request.q:
+        result.model_params["ignored_ma_order"] = request.q
+    return result
+
+
+# --- Rolling-Origin Backtesting ---
+
+class BacktestRequest(BaseModel):
+    """Request model for out-of-sample evaluation of forecasting settings"""
+    data: TimeSeriesData
+    model: Literal['arima', 'prophet', 'lite'] = 'arima'
+    # One entry per candidate, e.g. {"p": 2, "d": 1, "q": 0} or {"seasonality_mode": "multiplicative"}
+    candidates: List[Dict[str, Any]] = [{}]
+    horizon: int = Field(10, ge=1)
+    n_folds: int = Field(5, ge=1, le=200)
+    step: Optional[int] = Field(None, ge=1)  # Distance between origins (default: horizon)
+    window: Literal['expanding', 'rolling'] = 'expanding'
+    min_train: Optional[int] = Field(None, ge=3)  # Training length of the first fold / rolling window
+    # 'warm': each fold's fit starts from the previous fold's optimum (ARIMA and Prophet);
+    # 'full': every fold is fitted from the default starting point
+    refit: Literal['warm', 'full'] = 'warm'
+
+
+class BacktestResponse(BaseModel):
+    """Per-candidate accuracy by horizon, ranked by overall RMSE"""
+    folds: List[Dict[str, int]]
+    results: List[Dict[str, Any]]
+    best: Dict[str, Any]
+
+
+def _arima_fold(values: np.ndarray, order: Tuple[int, int, int], start: int, end: int,
+                horizon: int, params: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """Forecast one fold with statsmodels ARIMA; the optimizer starts from params when given"""
+    from statsmodels.tsa.arima.model import ARIMA
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        fitted = ARIMA(values[start:end], order=order).fit(start_params=params)
+        forecast = fitted.get_forecast(steps=horizon)
+        ci = np.asarray(forecast.conf_int())
+    return {
+        "forecast": np.asarray(forecast.predicted_mean),
+        "lower": ci[:, 0],
+        "upper": ci[:, 1],
+        "params": np.asarray(fitted.params),
+    }
+
+
+def _backtest_fold(model: str, settings: Dict[str, Any], values: np.ndarray, dates: Optional[List[str]],
+                   start: int, end: int, horizon: int, params: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    Worker task: forecast `horizon` steps after training on values[start:end].
+    params warm-starts the fit and the output's "params" can warm-start the next fold.
+    """
+    if model == 'arima':
+        order = (settings.get("p", 1), settings.get("d", 1), settings.get("q", 1))
+        return _arima_fold(values, order, start, end, horizon, params)
+
+    data = TimeSeriesData(values=values[start:end], dates=dates[start:end] if dates else None)
+    if model == 'prophet':
+        res = fit_prophet(ProphetRequest(data=data, forecast_periods=horizon, **settings), init=params)
+        return {"forecast": np.array(res.forecast), "lower": np.array(res.forecast_lower),
+                "upper": np.array(res.forecast_upper), "params": res._optimum}
+    res = fit_lite(LiteForecastRequest(data=data, forecast_steps=horizon, **settings))
+    return {"forecast": np.array(res.forecast), "lower": np.array(res.forecast_ci_lower),
+            "upper": np.array(res.forecast_ci_upper)}
+
+
+def _accuracy_by_horizon(actual: np.ndarray, forecast: np.ndarray,
+                         lower: np.ndarray, upper: np.ndarray) -> Dict[str, Any]:
+    """MAPE/RMSE/interval coverage per horizon step from (folds x horizon) arrays"""
+    errors = forecast - actual
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ape = np.where(actual != 0, np.abs(errors / actual) * 100, np.nan)
+    mape = np.nanmean(ape, axis=0) if np.isfinite(ape).any() else np.full(actual.shape[1], np.nan)
+    rmse = np.sqrt(np.mean(errors ** 2, axis=0))
+    coverage = np.mean((actual >= lower) & (actual <= upper), axis=0)
+
+    def clean(a):
+        return [None if not np.isfinite(v) else float(v) for v in a]
+
+    return {
+        "mape": clean(mape), "rmse": clean(rmse), "coverage": clean(coverage),
+        "overall": {"mape": clean([np.nanmean(mape)])[0], "rmse": float(np.sqrt(np.mean(errors ** 2))),
+                    "coverage": float(coverage.mean())},
+    }
+
+
+def _run_inline(fn, *args) -> Future:
+    """Runs fn now and wraps the outcome in a completed Future"""
+    future: Future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def run_backtest(request: BacktestRequest) -> BacktestResponse:
+    """
+    Evaluates every candidate over rolling or expanding forecast origins.
+    Folds run concurrently on the forecast pool (lite fits are sub-millisecond and run inline).
+    With refit='warm', ARIMA and Prophet fits start from the previous fold's optimum, so
+    a candidate's folds run one after another while candidates still run concurrently.
+    """
+    data = request.data.resolved()
+    values = np.asarray(data.values, dtype=float)
+    dates = data.dates
+    n, h = len(values), request.horizon
+    step = request.step or h
+
+    # Origins (end of training, exclusive), oldest first; the last fold ends at the last point
+    origins = [n - h - (request.n_folds - 1 - k) * step for k in range(request.n_folds)]
+    min_train = request.min_train or origins[0]
+    if origins[0] < max(min_train, 3):
+        raise ValueError(f"Series of length {n} is too short for {request.n_folds} folds of horizon {h}.")
+    folds = [{"train_start": (o - min_train) if request.window == 'rolling' else 0, "train_end": o}
+             for o in origins]
+    actual = np.stack([values[f["train_end"]:f["train_end"] + h] for f in folds])
+
+    submit = _run_inline if request.model == 'lite' else submit_forecast
+    chained = request.refit == 'warm' and request.model != 'lite'
+    pending: Dict[Any, Tuple[int, int]] = {}
+    outputs: Dict[Tuple[int, int], Any] = {}  # (candidate, fold) -> fold output or the exception it raised
+
+    def submit_fold(c: int, k: int, params=None) -> None:
+        fold = folds[k]
+        future = submit(_backtest_fold, request.model, request.candidates[c], values, dates,
+                        fold["train_start"], fold["train_end"], h, params)
+        pending[future] = (c, k)
+
+    # Chained candidates start with their first fold only; each finished fold submits the next
+    for c in range(len(request.candidates)):
+        for k in range(1 if chained else len(folds)):
+            submit_fold(c, k)
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            c, k = pending.pop(future)
+            try:
+                outputs[(c, k)] = future.result()
+            except Exception as e:
+                outputs[(c, k)] = e
+            if chained and k + 1 < len(folds):
+                previous = outputs[(c, k)]
+                # After a failed fold the next one starts from the default point again
+                submit_fold(c, k + 1, None if isinstance(previous, Exception) else previous.get("params"))
+
+    results = []
+    for c, settings in enumerate(request.candidates):
+        row: Dict[str, Any] = {"candidate": settings}
+        try:
+            fold_outputs = [outputs[(c, k)] for k in range(len(folds))]
+            for output in fold_outputs:
+                if isinstance(output, Exception):
+                    raise output
+            row.update(_accuracy_by_horizon(
+                actual,
+                np.stack([o["forecast"] for o in fold_outputs]),
+                np.stack([o["lower"] for o in fold_outputs]),
+                np.stack([o["upper"] for o in fold_outputs]),
+            ))
+        except Exception as e:
+            row["error"] = str(e)
+        results.append(row)
+
+    ranked = sorted(results, key=lambda r: r.get("overall", {}).get("rmse", np.inf))
+    return BacktestResponse(folds=folds, results=ranked, best=ranked[0] if ranked and "overall" in ranked[0] else {})
@@ -1,13 +1,34 @@
-from fastapi import FastAPI, HTTPException, Request
+import time
+_import_started = time.perf_counter()  # Cold-start report: see GET /startup
+
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from .engine.doe import generate_design, DesignRequest, DesignResponse
-from typing import List, Dict, Any
-from dotenv import load_dotenv
+from typing import List, Dict, Any, Optional
+import json
 import os
 
-load_dotenv(".env.local") # Load user-preferred local env file
-load_dotenv() # Fallback to .env
+def _dotenv_files_present() -> bool:
+    """Same lookup as load_dotenv() (cwd .env.local, then .env upwards from this file)"""
+    if os.path.exists(".env.local"):
+        return True
+    path = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        if os.path.exists(os.path.join(path, ".env")):
+            return True
+        parent = os.path.dirname(path)
+        if parent == path:
+            return False
+        path = parent
+
+# Skip importing python-dotenv when there is nothing to load (e.g. on Vercel)
+if _dotenv_files_present():
+    from dotenv import load_dotenv
+    load_dotenv(".env.local") # Load user-preferred local env file
+    load_dotenv() # Fallback to .env
+
+# Engines import pandas/SciPy lazily (engine/lazy.py), so these imports are cheap
+from .engine.doe import generate_design, generate_design_binary, DesignRequest, DesignResponse
 
 # Config reload trigger (Mock Updated)
 # FastAPI backend for Synthetic DOE Lab
@@ -81,18 +102,158 @@ async def debug_middleware(request: Request, call_next):
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": "Internal Server Error", "detail": str(e)})
 
+# --- Metrics ---
+from fastapi.responses import PlainTextResponse
+from starlette.routing import Match
+from .engine.metrics import (
+    REQUEST_LATENCY, REQUESTS_IN_FLIGHT, REQUEST_SIZE, RESPONSE_SIZE,
+    PROFILING_ENABLED, profile_request, get_profile, render_metrics
+)
+
+def route_template(request: Request) -> str:
+    """Path template of the matching route (keeps /datasets/{dataset_id} to one label)"""
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    route = route_template(request)
+    if request.headers.get("content-length", "").isdigit():
+        REQUEST_SIZE.observe(int(request.headers["content-length"]), route=route)
+
+    profiling = PROFILING_ENABLED and request.headers.get("x-profile", "") == "1"
+    REQUESTS_IN_FLIGHT.inc(route=route)
+    start = time.perf_counter()
+    status = 500
+    try:
+        if profiling:
+            # Handlers run in the threadpool with a copy of this context, so their stages report here
+            with profile_request(route) as profile:
+                response = await call_next(request)
+            response.headers["X-Profile-Id"] = profile.id
+            response.headers["Server-Timing"] = profile.server_timing()
+        else:
+            response = await call_next(request)
+        status = response.status_code
+        if response.headers.get("content-length", "").isdigit():
+            RESPONSE_SIZE.observe(int(response.headers["content-length"]), route=route)
+        return response
+    finally:
+        REQUESTS_IN_FLIGHT.dec(route=route)
+        REQUEST_LATENCY.observe(time.perf_counter() - start, method=request.method, route=route, status=str(status))
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus scrape endpoint: request latency/size, in-flight requests and engine stage timings."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/profiles/{profile_id}")
+def read_profile(profile_id: str):
+    """Stage timings and sampled stacks of a request sent with X-Profile: 1 (requires PROFILING_ENABLED=1)."""
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {profile_id}")
+    return profile
+
+# --- CPU Offload ---
+from .engine.executor import offload, shutdown_offload_pool, Overloaded, OffloadTimeout, Cancelled
+
+@app.on_event("shutdown")
+def stop_offload_workers():
+    shutdown_offload_pool()
+
+async def run_cpu(http_request: Request, fn, *args, coalesce: bool = False):
+    """
+    Runs a CPU-bound engine call through the offload layer, keeping the event loop and
+    threadpool free for other requests. Limits are looked up by the route's path.
+    With coalesce, identical concurrent requests share one computation.
+    """
+    route = http_request.scope["route"].path
+    try:
+        return await offload(route, fn, *args, is_disconnected=http_request.is_disconnected, coalesce=coalesce)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except OffloadTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Cancelled:
+        raise HTTPException(status_code=499, detail="Client closed request.")
+
+# --- Cold start ---
+from .engine.lazy import start_preload, startup_report, record_app_import
+
+@app.on_event("startup")
+def preload_modules():
+    """With PRELOAD_MODULES=1, import pandas/SciPy/... in the background after startup."""
+    start_preload()
+
+@app.get("/startup")
+def read_startup_report():
+    """Cold-start report: app import time and each deferred import (seconds, trigger)."""
+    return startup_report()
+
 @app.get("/")
 def health_check():
     """Health check endpoint."""
     return {"status": "ok", "service": "Synthetic DOE Lab Backend", "version": "0.1.0"}
 
+# --- Dataset Store ---
+from .engine.datasets import (
+    read_table, save_dataset, get_dataset_info, delete_dataset, load_dataset, DatasetInfo
+)
+from starlette.concurrency import run_in_threadpool
+
+def import_dataset(content: bytes, filename: str, fmt: Optional[str]) -> DatasetInfo:
+    return save_dataset(read_table(content, filename, fmt))
+
+@app.post("/datasets", response_model=DatasetInfo)
+async def upload_dataset(file: UploadFile = File(...), format: Optional[str] = None):
+    """Stores a CSV/JSON/Parquet table; analysis requests then reference it by dataset_id."""
+    try:
+        content = await file.read()
+        # Parsing and writing the columns is blocking work; keep it off the event loop
+        return await run_in_threadpool(import_dataset, content, file.filename or "", format)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/datasets/{dataset_id}", response_model=DatasetInfo)
+def get_dataset(dataset_id: str):
+    try:
+        return get_dataset_info(dataset_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.delete("/datasets/{dataset_id}")
+def remove_dataset(dataset_id: str):
+    try:
+        delete_dataset(dataset_id)
+        return {"status": "deleted", "dataset_id": dataset_id}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+from fastapi import Response
+from .engine.tables import BINARY_FORMATS, frame_to_binary, pd
+
+def table_response(df: "pd.DataFrame", fmt: str, headers: Dict[str, str]) -> Response:
+    """Arrow IPC stream / Parquet body; scalar response fields travel as X- headers"""
+    body, media_type = frame_to_binary(df, fmt)
+    return Response(content=body, media_type=media_type, headers=headers)
+
 @app.post("/design", response_model=DesignResponse)
-def create_design(request: DesignRequest):
+async def create_design(request: DesignRequest, http_request: Request):
     """Generates a DOE Design Matrix based on inputs."""
     try:
         if not request.variables:
             raise HTTPException(status_code=400, detail="No variables provided.")
-        return generate_design(request)
+        if request.format in BINARY_FORMATS:
+            body, media_type, num_runs = await run_cpu(http_request, generate_design_binary, request, coalesce=True)
+            return Response(content=body, media_type=media_type,
+                            headers={"X-Strategy": request.strategy, "X-Num-Runs": str(num_runs)})
+        return await run_cpu(http_request, generate_design, request, coalesce=True)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -102,13 +263,29 @@ from .engine.generator import generator, GenerationRequest, GenerationResponse
 def generate_data(request: GenerationRequest):
     """Generates synthetic data based on the provided design matrix."""
     try:
+        if request.format in BINARY_FORMATS:
+            result = generator.generate_batch(request.model_copy(update={"format": "columns"}))
+            return table_response(pd.DataFrame(result.columns), request.format, {"X-Total-Time": f"{result.total_time:.3f}"})
         return generator.generate_batch(request)
     except Exception as e:
          raise HTTPException(status_code=500, detail=str(e))
 
+from .engine.adaptive import run_adaptive_design, AdaptiveDesignRequest, AdaptiveDesignResponse
+
+@app.post("/design/adaptive", response_model=AdaptiveDesignResponse)
+def generate_adaptive_design(request: AdaptiveDesignRequest):
+    """Sequential design: generates only the rows a surrogate model finds informative."""
+    try:
+        return run_adaptive_design(request)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 class AnalysisRequest(BaseModel):
     context: str
-    results: List[Dict[str, Any]]
+    results: List[Dict[str, Any]] = []
+    dataset_id: Optional[str] = None # Stored dataset alternative to results
     mock: bool = False
 
 class AnalysisResponse(BaseModel):
@@ -118,11 +295,73 @@ class AnalysisResponse(BaseModel):
 def generate_analysis_summary(request: AnalysisRequest):
     """Generates an expert analysis text for the report."""
     try:
-        analysis = generator.generate_report_analysis(request.context, request.results, request.mock)
+        results = request.results
+        if request.dataset_id and not results:
+            # The report prompt only samples the leading rows
+            results = load_dataset(request.dataset_id, rows=50).to_dict(orient='records')
+        analysis = generator.generate_report_analysis(request.context, results, request.mock)
         return AnalysisResponse(analysis_html=analysis)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- Binary Array Transport ---
+from fastapi import Depends
+from pydantic import ValidationError
+from .engine.arrays import decode_float64, BASE64
+
+OCTET_STREAM = "application/octet-stream"
+
+def _query_value(raw: str) -> Any:
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+def array_body(model, field: str):
+    """
+    Body dependency for endpoints with one large numeric array.
+
+    Accepts the model as JSON (arrays as lists or base64 float64), or the raw little-endian
+    float64 bytes of `field` (dotted path) as application/octet-stream with the remaining
+    fields as query parameters, e.g. POST /arima?p=2&forecast_steps=12.
+    """
+    async def parse(http_request: Request):
+        body = await http_request.body()
+        try:
+            if http_request.headers.get("content-type", "").split(";")[0].strip() == OCTET_STREAM:
+                payload: Dict[str, Any] = {}
+                items = [(k, _query_value(v)) for k, v in http_request.query_params.items()]
+                for path, value in items + [(field, decode_float64(body))]:
+                    *parents, leaf = path.split(".")
+                    target = payload
+                    for parent in parents:
+                        target = target.setdefault(parent, {})
+                    target[leaf] = value
+                return model.model_validate(payload)
+            return model.model_validate_json(body)
+        except ValidationError as e:
+            errors = e.errors(include_input=False, include_context=False)
+            raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in errors])
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    schema = model.model_json_schema(ref_template="#/components/schemas/{model}")
+    schema.pop("$defs", None)
+    parse.openapi_extra = {"requestBody": {"required": True, "content": {
+        "application/json": {"schema": schema},
+        OCTET_STREAM: {"schema": {"type": "string", "format": "binary"}}
+    }}}
+    return parse
+
+def encode_arrays(result: BaseModel, http_request: Request):
+    """Sends array fields as base64 float64 when the client asks with X-Array-Encoding: base64"""
+    if http_request.headers.get("x-array-encoding", "").lower() != BASE64:
+        return result
+    return JSONResponse(
+        content=result.model_dump(mode="json", context={"array_encoding": BASE64}),
+        headers={"X-Array-Encoding": BASE64}
+    )
+
 # --- Statistical Analysis Endpoints ---
 from .engine.stats import (
     calculate_estimation, EstimationRequest, EstimationResult,
@@ -130,33 +369,72 @@ from .engine.stats import (
     calculate_advanced_estimation, AdvancedRequest, AdvancedResult
 )
 
-@app.post("/stats/estimation", response_model=EstimationResult)
-def get_estimation(request: EstimationRequest):
+estimation_body = array_body(EstimationRequest, "data")
+
+@app.post("/stats/estimation", response_model=EstimationResult, openapi_extra=estimation_body.openapi_extra)
+async def get_estimation(http_request: Request, request: EstimationRequest = Depends(estimation_body)):
     try:
-        return calculate_estimation(request)
+        return await run_cpu(http_request, calculate_estimation, request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/stats/effect-size", response_model=EffectSizeResult)
-def get_effect_size(request: EffectSizeRequest):
+async def get_effect_size(request: EffectSizeRequest, http_request: Request):
     try:
-        return calculate_effect_size(request)
+        return await run_cpu(http_request, calculate_effect_size, request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/stats/advanced", response_model=AdvancedResult)
-def get_advanced_estimation(request: AdvancedRequest):
+advanced_body = array_body(AdvancedRequest, "data")
+
+@app.post("/stats/advanced", response_model=AdvancedResult, openapi_extra=advanced_body.openapi_extra)
+async def get_advanced_estimation(http_request: Request, request: AdvancedRequest = Depends(advanced_body)):
     try:
-        return calculate_advanced_estimation(request)
+        return encode_arrays(await run_cpu(http_request, calculate_advanced_estimation, request), http_request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-from .engine.spc import analyze_spc, SPCAnalysisRequest, SPCResult
+from .engine.spc import (
+    analyze_spc, SPCAnalysisRequest, SPCResult,
+    analyze_multivariate_spc, MultivariateSPCRequest, MultivariateSPCResult
+)
 
 @app.post("/spc", response_model=SPCResult)
-def perform_spc_analysis(request: SPCAnalysisRequest):
+async def perform_spc_analysis(request: SPCAnalysisRequest, http_request: Request):
     try:
-        return analyze_spc(request)
+        return encode_arrays(await run_cpu(http_request, analyze_spc, request), http_request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/spc/multivariate", response_model=MultivariateSPCResult)
+async def perform_multivariate_spc_analysis(request: MultivariateSPCRequest, http_request: Request):
+    try:
+        return await run_cpu(http_request, analyze_multivariate_spc, request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# --- Sensitivity Analysis ---
+from .engine.sensitivity import analyze_sensitivity, SensitivityRequest, SensitivityResult
+
+@app.post("/sensitivity", response_model=SensitivityResult)
+async def perform_sensitivity_analysis(request: SensitivityRequest, http_request: Request):
+    """Sobol indices of a response: Saltelli design responses, or a surrogate fit to any data."""
+    try:
+        return await run_cpu(http_request, analyze_sensitivity, request)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -164,23 +442,94 @@ def perform_spc_analysis(request: SPCAnalysisRequest):
 from .engine.timeseries import (
     fit_arima, fit_prophet,
     ARIMARequest, ARIMAResponse,
-    ProphetRequest, ProphetResponse
+    ProphetRequest, ProphetResponse,
+    iter_batch_forecasts, BatchForecastRequest,
+    dispatch_forecast, start_forecast_warmup, forecast_pool_status,
+    fit_lite, LiteForecastRequest,
+    run_backtest, BacktestRequest, BacktestResponse
 )
+from fastapi.responses import StreamingResponse
+
+@app.on_event("startup")
+def warm_forecast_pool():
+    """With FORECAST_WARMUP=1, pre-import statsmodels/Prophet in the forecasting workers."""
+    start_forecast_warmup()
+
+@app.get("/ready")
+def readiness_check():
+    """Readiness probe: 503 until the warm forecasting workers are hot."""
+    status = forecast_pool_status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+arima_body = array_body(ARIMARequest, "data.values")
+prophet_body = array_body(ProphetRequest, "data.values")
+lite_body = array_body(LiteForecastRequest, "data.values")
 
-@app.post("/arima", response_model=ARIMAResponse)
-def perform_arima_analysis(request: ARIMARequest):
+@app.post("/arima", response_model=ARIMAResponse, openapi_extra=arima_body.openapi_extra)
+async def perform_arima_analysis(http_request: Request, request: ARIMARequest = Depends(arima_body)):
     try:
-        return fit_arima(request)
+        return encode_arrays(await run_cpu(http_request, dispatch_forecast, fit_arima, request, coalesce=True), http_request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/prophet", response_model=ProphetResponse)
-def perform_prophet_analysis(request: ProphetRequest):
+@app.post("/prophet", response_model=ProphetResponse, openapi_extra=prophet_body.openapi_extra)
+async def perform_prophet_analysis(http_request: Request, request: ProphetRequest = Depends(prophet_body)):
     try:
-        return fit_prophet(request)
+        return encode_arrays(await run_cpu(http_request, dispatch_forecast, fit_prophet, request, coalesce=True), http_request)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/forecast/lite", response_model=ARIMAResponse, openapi_extra=lite_body.openapi_extra)
+async def perform_lite_forecast(http_request: Request, request: LiteForecastRequest = Depends(lite_body)):
+    """Exponential smoothing / ARI forecasts without statsmodels or Prophet."""
+    try:
+        return encode_arrays(await run_cpu(http_request, fit_lite, request), http_request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/forecast/backtest", response_model=BacktestResponse)
+def perform_backtest(request: BacktestRequest):
+    """Rolling-origin MAPE/RMSE/coverage per horizon for candidate settings."""
+    try:
+        return run_backtest(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/forecast/batch")
+def perform_batch_forecast(request: BatchForecastRequest):
+    """Forecasts many series; streams one NDJSON line per series as it finishes."""
+    try:
+        records = iter_batch_forecasts(request)
+        first = next(records)  # Surfaces invalid shared params as a 500 before streaming starts
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    def lines():
+        yield json.dumps(first) + "\n"
+        for record in records:
+            yield json.dumps(record) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+# --- Pipeline ---
+from .engine.pipeline import run_pipeline, PipelineRequest, PipelineResponse
+
+@app.post("/pipeline", response_model=PipelineResponse)
+def perform_pipeline(request: PipelineRequest):
+    """Runs design -> generate -> SPC/stats/analysis stages server-side in one request."""
+    try:
+        return run_pipeline(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+record_app_import(time.perf_counter() - _import_started)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from app.engine.doe import Variable
+from app.engine.adaptive import run_adaptive_design, AdaptiveDesignRequest
+
+BRANIN_VARIABLES = [Variable(name="x1", min=-5, max=10), Variable(name="x2", min=0, max=15)]
+
+def _branin(rows):
+    out = []
+    for row in rows:
+        x1, x2 = row["x1"], row["x2"]
+        y = (x2 - 5.1 / (4 * np.pi ** 2) * x1 ** 2 + 5 / np.pi * x1 - 6) ** 2 + 10 * (1 - 1 / (8 * np.pi)) * np.cos(x1) + 10
+        out.append({**row, "Response": float(y)})
+    return out
+
+def test_gp_minimize_finds_branin_optimum_within_budget():
+    """
+    Test that expected improvement converges near a Branin minimum (0.398) well before the budget.
+    """
+    request = AdaptiveDesignRequest(variables=BRANIN_VARIABLES, goal="minimize", max_samples=60, seed=1)
+    result = run_adaptive_design(request, evaluate=_branin)
+
+    assert result.converged and result.stop_reason == "converged"
+    assert result.num_generated < 40
+    assert result.best["Response"] < 0.6
+    # Only the selected rows were generated, batch by batch
+    assert result.num_generated == len(result.data) == 6 + sum(i.new_samples for i in result.iterations)
+    assert {row["iteration"] for row in result.data} == set(range(len(result.iterations)))
+
+def test_gp_explore_improves_model_until_converged():
+    request = AdaptiveDesignRequest(variables=BRANIN_VARIABLES, goal="explore", max_samples=60, seed=0)
+    result = run_adaptive_design(request, evaluate=_branin)
+
+    assert result.converged
+    assert result.iterations[-1].loo_error < 0.1
+    assert result.num_generated < 60
+
+def test_quadratic_surface_and_budget():
+    """
+    Test that an exact quadratic converges right after the start, and that the budget caps the loop.
+    """
+    variables = [Variable(name=n) for n in ("a", "b", "c")]
+    quadratic = lambda rows: [{**r, "Response": 1 + 2 * r["a"] - r["b"] ** 2 + 0.5 * r["a"] * r["c"]} for r in rows]
+    result = run_adaptive_design(AdaptiveDesignRequest(variables=variables, surrogate="quadratic", seed=0),
+                                 evaluate=quadratic)
+    assert result.converged and len(result.iterations) == 1
+    assert result.num_generated == 11  # 10 coefficients + 1
+
+    capped = run_adaptive_design(AdaptiveDesignRequest(variables=BRANIN_VARIABLES, max_samples=10, batch_size=3,
+                                                       tolerance=1e-9, seed=0), evaluate=_branin)
+    assert capped.stop_reason == "budget" and capped.num_generated == 10
+
+    with pytest.raises(ValueError, match="continuous"):
+        run_adaptive_design(AdaptiveDesignRequest(variables=[Variable(name="c", type="categorical")]),
+                            evaluate=quadratic)
@@ -0,0 +1,46 @@
+import base64
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from app.engine.arrays import decode_float64, encode_float64
+from app.engine.stats import EstimationRequest, AdvancedRequest, calculate_advanced_estimation
+from app.engine.timeseries import TimeSeriesData
+
+def test_base64_payload_decodes_without_copy():
+    """
+    Test that base64 float64 payloads become read-only views of the decoded bytes.
+    """
+    values = np.linspace(0.0, 1.0, 1000)
+    raw = values.astype('<f8').tobytes()
+    decoded = decode_float64(raw)
+    assert np.array_equal(decoded, values)
+    assert not decoded.flags.writeable  # np.frombuffer view, not a copy
+
+    request = EstimationRequest(data=base64.b64encode(raw).decode())
+    assert isinstance(request.data, np.ndarray)
+    assert np.array_equal(request.data, values)
+    # JSON lists keep working and give the same array
+    assert np.array_equal(TimeSeriesData(values=values.tolist()).values, values)
+
+def test_invalid_payloads_are_rejected():
+    with pytest.raises(ValueError, match="multiple of 8"):
+        decode_float64(b"\x00" * 12)
+    with pytest.raises(ValidationError):
+        EstimationRequest(data="not base64!")
+    with pytest.raises(ValidationError):
+        EstimationRequest(data=[1.0, "x"])
+
+def test_base64_response_encoding():
+    """
+    Test that array fields are sent as base64 only when the dump context asks for it.
+    """
+    data = np.random.default_rng(3).normal(5.0, 1.0, 100)
+    result = calculate_advanced_estimation(AdvancedRequest(data=data, prior_mean=0.0, prior_std=1.0))
+
+    plain = result.model_dump(mode="json")
+    assert isinstance(plain["kde_x"], list)
+
+    encoded = result.model_dump(mode="json", context={"array_encoding": "base64"})
+    assert encoded["kde_x"] == encode_float64(result.kde_x)
+    assert np.allclose(decode_float64(encoded["kde_y"]), plain["kde_y"])
+    assert encoded["mle_mean"] == plain["mle_mean"]
@@ -0,0 +1,21 @@
+from benchmarks.bench import compare
+
+def _result(key, median_s, peak=10 * 2**20):
+    return {"key": key, "median_s": median_s, "peak_mem_bytes": peak}
+
+def test_regression_gate():
+    """
+    Test that only scenarios slower (or larger) than baseline + threshold are reported.
+    """
+    baseline = {"results": [_result("a", 0.100), _result("b", 0.100), _result("c", 0.0001), _result("d", 0.1)]}
+    results = [
+        _result("a", 0.110),               # within 25%
+        _result("b", 0.200),               # 2x slower
+        _result("c", 0.0005),              # 5x, but below the absolute noise floor
+        _result("d", 0.1, peak=40 * 2**20),  # 4x peak memory
+        _result("new", 1.0),               # not in the baseline
+    ]
+    regressions = compare(results, baseline, threshold=0.25, mem_threshold=0.5, min_delta=0.002)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("b:") and "2.00x" in regressions[0]
+    assert regressions[1].startswith("d: peak memory")
@@ -0,0 +1,54 @@
+import pytest
+import numpy as np
+import pandas as pd
+from app.engine import datasets
+from app.engine.datasets import read_table, save_dataset, load_dataset, load_column, get_dataset_info
+
+@pytest.fixture(autouse=True)
+def dataset_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, "DATASET_DIR", str(tmp_path))
+
+def _upload():
+    csv = "Line,Yield,Temp\nA,90.5,200\nB,91.0,210\nA,,205\nB,89.5,220\n"
+    return save_dataset(read_table(csv.encode(), "run.csv"))
+
+def test_round_trip_columns():
+    """
+    Test that stored columns come back with their types, numeric ones memory-mapped.
+    """
+    info = _upload()
+    assert info.n_rows == 4
+    assert {c.name: c.dtype for c in info.columns} == {"Line": "category", "Yield": "float64", "Temp": "int64"}
+
+    temp = load_column(info.dataset_id, "Temp")
+    assert isinstance(temp, np.memmap)
+    assert temp.tolist() == [200, 210, 205, 220]
+
+    df = load_dataset(info.dataset_id, ["Line", "Yield"])
+    assert list(df.columns) == ["Line", "Yield"]
+    assert df["Line"].tolist() == ["A", "B", "A", "B"]
+    assert np.isnan(df["Yield"][2])
+
+    with pytest.raises(ValueError):
+        get_dataset_info("../../etc")
+
+def test_requests_reference_dataset_by_id():
+    """
+    Test that engine requests accept dataset_id plus a column instead of inline data.
+    """
+    from app.engine.stats import calculate_estimation, EstimationRequest
+    from app.engine.spc import analyze_spc, SPCAnalysisRequest
+    from app.engine.timeseries import TimeSeriesData
+
+    info = _upload()
+
+    est = calculate_estimation(EstimationRequest(dataset_id=info.dataset_id, column="Temp"))
+    assert est.n == 4 and est.mean == 208.75
+
+    spc = analyze_spc(SPCAnalysisRequest(dataset_id=info.dataset_id, target_variable="Yield", factor_variable="Line"))
+    assert len(spc.control_chart["values"]) == 3
+    assert spc.pareto["counts"] == [2, 2]
+
+    ts = TimeSeriesData(dataset_id=info.dataset_id, column="Temp")
+    assert len(ts.values) == 0  # Validation does not read the dataset; engines resolve it
+    assert list(ts.resolved().values) == [200.0, 210.0, 205.0, 220.0]
@@ -1,4 +1,5 @@
 
+import numpy as np
 from app.engine.doe import generate_design, DesignRequest, Variable
 import pytest
 
@@ -40,3 +41,31 @@ def test_random_design_generation():
     res = generate_design(req)
     assert res.num_runs == 10
     assert len(res.matrix[0]) == 1
+
+def test_columnar_design_output():
+    """
+    Test that the columnar format carries the same values as the records format.
+    """
+    variables = [Variable(name="Pressure", min=10, max=50), Variable(name="Temperature", min=200, max=300)]
+    np.random.seed(0)
+    records = generate_design(DesignRequest(strategy="random", num_samples=20, variables=variables))
+    np.random.seed(0)
+    columnar = generate_design(DesignRequest(strategy="random", num_samples=20, variables=variables, format="columns"))
+
+    assert columnar.matrix == []
+    assert columnar.num_runs == 20
+    assert columnar.columns["Pressure"] == [row["Pressure"] for row in records.matrix]
+    assert columnar.columns["Temperature"] == [row["Temperature"] for row in records.matrix]
+
+def test_arrow_design_output():
+    """
+    Test that the Arrow IPC body round-trips to the design frame (requires pyarrow).
+    """
+    pa = pytest.importorskip("pyarrow")
+    from app.engine.doe import build_design_frame
+    from app.engine.tables import frame_to_binary
+    req = DesignRequest(strategy="lhc", num_samples=8, variables=[Variable(name="X1", min=0, max=1)])
+    df = build_design_frame(req)
+    body, media_type = frame_to_binary(df, "arrow")
+    assert media_type == "application/vnd.apache.arrow.stream"
+    assert pa.ipc.open_stream(body).read_pandas().equals(df)
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+import pytest
+from app.engine import executor
+from app.engine.executor import OffloadPool, Overloaded, OffloadTimeout, Cancelled, RoutePolicy
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return os.getpid()
+
+def _fail():
+    raise ValueError("bad input")
+
+@pytest.fixture
+def short_route(monkeypatch):
+    monkeypatch.setitem(executor.ROUTE_POLICIES, "/test-short", RoutePolicy(timeout=0.3, max_concurrency=1))
+    return "/test-short"
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_offload_runs_and_propagates_errors(workers):
+    """
+    Test that tasks run in worker processes (or threads when workers=0) and engine errors propagate.
+    """
+    async def scenario():
+        pool = OffloadPool(workers=workers, max_queue=4)
+        try:
+            pid = await pool.run("/test", _sleep, 0.0)
+            with pytest.raises(ValueError, match="bad input"):
+                await pool.run("/test", _fail)
+            return pid
+        finally:
+            pool.shutdown()
+
+    pid = asyncio.run(scenario())
+    assert (pid != os.getpid()) == (workers > 0)
+
+def test_timeout_kills_running_worker(short_route):
+    """
+    Test that a timed-out task's worker is killed and replaced for the next task.
+    """
+    async def scenario():
+        pool = OffloadPool(workers=1, max_queue=4)
+        try:
+            first = await pool.run("/test", _sleep, 0.0)
+            start = time.monotonic()
+            with pytest.raises(OffloadTimeout):
+                await pool.run(short_route, _sleep, 30)
+            elapsed = time.monotonic() - start
+            second = await pool.run("/test", _sleep, 0.0)
+            return first, second, elapsed
+        finally:
+            pool.shutdown()
+
+    first, second, elapsed = asyncio.run(scenario())
+    assert elapsed < 2
+    assert first != second  # The worker stuck in the 30 s task was replaced
+
+def test_queue_limit_and_disconnect():
+    """
+    Test 503-style rejection past the queue depth, and cancellation on client disconnect.
+    """
+    async def disconnected():
+        return True
+
+    async def scenario():
+        pool = OffloadPool(workers=0, max_queue=2)
+        try:
+            results = await asyncio.gather(*[pool.run("/test", _sleep, 0.2) for _ in range(3)],
+                                           return_exceptions=True)
+            with pytest.raises(Cancelled):
+                await pool.run("/test", _sleep, 0.5, is_disconnected=disconnected)
+            return results
+        finally:
+            pool.shutdown()
+
+    results = asyncio.run(scenario())
+    assert sum(isinstance(r, Overloaded) for r in results) == 1
+    assert sum(isinstance(r, int) for r in results) == 2
+
+def _timed_stage():
+    from app.engine.metrics import stage
+    with stage("test", "worker_stage"):
+        time.sleep(0.01)
+    return os.getpid()
+
+def test_worker_stages_reach_parent_metrics():
+    """
+    Test that stages timed in a worker process are replayed into the parent's metrics and profile.
+    """
+    from app.engine.metrics import STAGE_SECONDS, profile_request
+
+    def count():
+        return STAGE_SECONDS._values.get(("test", "worker_stage"), (None, 0.0, 0))[2]
+
+    async def scenario():
+        pool = OffloadPool(workers=1, max_queue=4)
+        try:
+            with profile_request("/test") as profile:
+                pid = await pool.run("/test", _timed_stage)
+            return pid, profile
+        finally:
+            pool.shutdown()
+
+    before = count()
+    pid, profile = asyncio.run(scenario())
+    assert pid != os.getpid()
+    assert count() == before + 1
+    assert [name for name, _ in profile.stages] == ["test.worker_stage"]
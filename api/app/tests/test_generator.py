@@ -26,3 +26,24 @@ def test_mock_generation():
     assert "Observation" in res.data[0]
     assert isinstance(res.data[0]["Response"], (int, float))
     assert res.data[0]["Pressure"] == 10 # Preserves original data logic
+
+def test_columnar_generation():
+    """
+    Test columnar input and output: the request stays columnar and results come back per column.
+    """
+    req = GenerationRequest(
+        columns={"Pressure": [10, 20, 30], "Temperature": [100, 200, 300]},
+        mock=True,
+        format="columns"
+    )
+    assert req.matrix == []
+    res = generator.generate_batch(req)
+
+    assert res.data == []
+    assert res.columns["Pressure"] == [10, 20, 30]
+    assert len(res.columns["Response"]) == 3
+    assert all("[MOCK]" in text for text in res.columns["synthetic_output"])
+    assert list(res.columns)[:2] == ["Pressure", "Temperature"]
+
+    records = generator.generate_batch(req.model_copy(update={"format": "records"}))
+    assert [row["Temperature"] for row in records.data] == [100, 200, 300]
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+from app.engine import lazy
+from app.engine.lazy import lazy_import, startup_report
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_app_import_defers_heavy_libraries():
+    """
+    Test that importing the app (what a cold start pays for) loads no pandas, SciPy or OpenAI.
+    """
+    code = ("import sys, app.main; "
+            "print('loaded:' + ','.join(m for m in ('pandas', 'scipy', 'openai') if m in sys.modules))")
+    env = {**os.environ, "PRELOAD_MODULES": "0"}
+    out = subprocess.run([sys.executable, "-c", code], cwd=API_DIR, env=env,
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.strip().splitlines()[-1] == "loaded:"
+
+def test_lazy_module_loads_on_first_use():
+    """
+    Test that a lazy module imports on first attribute access and is reported with its cost.
+    """
+    name = "json.tool"  # Stdlib module the app itself never imports
+    sys.modules.pop(name, None)
+    proxy = lazy_import(name)
+    assert "not loaded" in repr(proxy)
+    assert name in startup_report()["pending"]
+
+    assert callable(proxy.main)
+    assert "not loaded" not in repr(proxy)
+    entry = next(m for m in startup_report()["loaded"] if m["module"] == name)
+    assert entry["trigger"] == "first use" and entry["seconds"] >= 0.0
+
+    lazy._registered.remove(name)
+    del lazy._loaded[name]
+
+def test_startup_report_covers_app_import():
+    import app.main  # noqa: F401
+
+    report = startup_report()
+    assert report["app_import_seconds"] > 0
+    assert "pandas" in report["pending"] + [m["module"] for m in report["loaded"]]
@@ -0,0 +1,41 @@
+import pytest
+from app.engine import metrics
+from app.engine.metrics import Histogram, stage, profile_request, get_profile, render_metrics
+from app.engine.spc import analyze_spc, SPCAnalysisRequest
+
+def _sample(text, line_start):
+    return [line for line in text.splitlines() if line.startswith(line_start)]
+
+def test_histogram_exposition():
+    """
+    Test that histograms render cumulative buckets, +Inf, sum and count.
+    """
+    hist = Histogram("test_latency_seconds", "Test histogram", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        hist.observe(value, route="/x")
+    text = "\n".join(hist.render())
+    assert 'test_latency_seconds_bucket{route="/x",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{route="/x",le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{route="/x",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{route="/x"} 3' in text
+    metrics.REGISTRY.remove(hist)
+
+def test_engine_stages_and_profile():
+    """
+    Test that engine stages are timed into the shared histogram and the active request profile.
+    """
+    request = SPCAnalysisRequest(columns={"y": [float(i % 7) for i in range(200)]}, target_variable="y")
+    with profile_request("/spc") as profile:
+        analyze_spc(request)
+
+    stages = [name for name, _ in profile.stages]
+    assert stages == ["spc.dataframe", "spc.control_chart"]
+    assert "spc-dataframe;dur=" in profile.server_timing()
+    assert get_profile(profile.id)["route"] == "/spc"
+    assert _sample(render_metrics(), 'engine_stage_duration_seconds_count{engine="spc",stage="control_chart"}')
+
+def test_stage_errors_are_counted():
+    with pytest.raises(ValueError):
+        with stage("test", "boom"):
+            raise ValueError("boom")
+    assert _sample(render_metrics(), 'engine_stage_errors_total{engine="test",stage="boom"} 1')
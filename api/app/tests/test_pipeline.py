@@ -0,0 +1,59 @@
+import pytest
+from app.engine.pipeline import run_pipeline, PipelineRequest
+
+DESIGN = {
+    "strategy": "lhc",
+    "num_samples": 12,
+    "variables": [
+        {"name": "Temp", "type": "continuous", "min": 100, "max": 200},
+        {"name": "Time", "type": "continuous", "min": 1, "max": 5}
+    ]
+}
+
+def test_pipeline_chains_stages():
+    """
+    Test that stages consume upstream tables and only requested outputs are returned.
+    """
+    request = PipelineRequest(
+        stages=[
+            {"id": "design", "type": "design", "params": DESIGN},
+            {"id": "gen", "type": "generate", "input": "design", "params": {"mock": True}},
+            {"id": "spc", "type": "spc", "input": "gen", "params": {"target_variable": "Response"}},
+            {"id": "est", "type": "estimation", "input": "gen", "params": {"column": "Response"}},
+            {"id": "temp_vs_time", "type": "effect_size", "input": "design",
+             "params": {"column_a": "Temp", "column_b": "Time"}}
+        ],
+        outputs=["spc", "est", "temp_vs_time"]
+    )
+    response = run_pipeline(request)
+
+    assert response.errors == {}
+    assert set(response.results) == {"spc", "est", "temp_vs_time"}
+    assert response.results["est"]["n"] == 12
+    assert 80.0 <= response.results["est"]["mean"] <= 100.0
+    assert len(response.results["spc"]["control_chart"]["values"]) == 12
+    assert response.results["temp_vs_time"]["mean_a"] > response.results["temp_vs_time"]["mean_b"]
+    assert set(response.timings) == {"design", "gen", "spc", "est", "temp_vs_time"}
+
+def test_pipeline_failure_skips_dependents():
+    """
+    Test that a failing stage reports its error and skips only its downstream stages.
+    """
+    request = PipelineRequest(stages=[
+        {"id": "design", "type": "design", "params": DESIGN},
+        {"id": "bad", "type": "estimation", "input": "design", "params": {"column": "Missing"}},
+        {"id": "ok", "type": "estimation", "input": "design", "params": {"column": "Temp"}}
+    ])
+    response = run_pipeline(request)
+
+    assert "Missing" in response.errors["bad"]
+    assert "ok" in response.results and "bad" not in response.results
+
+def test_pipeline_rejects_invalid_graphs():
+    with pytest.raises(ValueError, match="unknown input"):
+        run_pipeline(PipelineRequest(stages=[{"id": "a", "type": "spc", "input": "nope"}]))
+    with pytest.raises(ValueError, match="cycle"):
+        run_pipeline(PipelineRequest(stages=[
+            {"id": "a", "type": "estimation", "input": "b"},
+            {"id": "b", "type": "estimation", "input": "a"}
+        ]))
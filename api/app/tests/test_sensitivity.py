@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from app.engine.doe import build_design_frame, DesignRequest, Variable
+from app.engine.sensitivity import analyze_sensitivity, SensitivityRequest
+
+# Ishigami function (a=7, b=0.1) on [-pi, pi]^3, with known Sobol indices
+ISHIGAMI_FIRST = [0.3139, 0.4424, 0.0]
+ISHIGAMI_TOTAL = [0.5576, 0.4424, 0.2437]
+VARIABLES = [Variable(name=f"X{i}", min=-np.pi, max=np.pi) for i in range(1, 4)]
+
+def _ishigami(df):
+    x1, x2, x3 = df["X1"], df["X2"], df["X3"]
+    return np.sin(x1) + 7 * np.sin(x2) ** 2 + 0.1 * x3 ** 4 * np.sin(x1)
+
+def test_saltelli_indices_match_ishigami():
+    """
+    Test that the Saltelli design + estimator recovers the analytic Ishigami indices with CIs.
+    """
+    df = build_design_frame(DesignRequest(strategy="saltelli", num_samples=4096, variables=VARIABLES, seed=1))
+    assert len(df) == 4096 * 5
+    df["Response"] = _ishigami(df)
+
+    result = analyze_sensitivity(SensitivityRequest(
+        columns={c: df[c].tolist() for c in df.columns}, variables=VARIABLES, num_resamples=100, seed=0
+    ))
+    assert result.num_evaluations == len(df)
+    for index, first, total in zip(result.indices, ISHIGAMI_FIRST, ISHIGAMI_TOTAL):
+        assert index.first_order == pytest.approx(first, abs=0.05)
+        assert index.total == pytest.approx(total, abs=0.05)
+        assert index.total_ci[0] <= index.total <= index.total_ci[1]
+
+def test_saltelli_rejects_shuffled_rows():
+    df = build_design_frame(DesignRequest(strategy="saltelli", num_samples=64, variables=VARIABLES, seed=1))
+    df["Response"] = _ishigami(df)
+    shuffled = df.sample(frac=1.0, random_state=0)
+    with pytest.raises(ValueError, match="Saltelli design order"):
+        analyze_sensitivity(SensitivityRequest(data=shuffled.to_dict(orient="records"), variables=VARIABLES))
+
+def test_surrogate_indices_on_existing_design():
+    """
+    Test the surrogate estimate on existing LHC data: y = A + 2 B + A B (+ noise) on [0, 1]^3.
+    """
+    variables = [Variable(name=n, min=0, max=1) for n in ("A", "B", "C")]
+    df = build_design_frame(DesignRequest(strategy="lhc", num_samples=400, variables=variables, seed=3))
+    noise = np.random.default_rng(0).normal(0.0, 0.01, len(df))
+    df["Response"] = df["A"] + 2 * df["B"] + df["A"] * df["B"] + noise
+
+    result = analyze_sensitivity(SensitivityRequest(
+        data=df.to_dict(orient="records"), variables=variables, method="surrogate", degree=2, seed=0
+    ))
+    # With u = x - 1/2: y = const + 1.5 uA + 2.5 uB + uA uB, and Var(u) = 1/12
+    parts = np.array([1.5 ** 2 / 12, 2.5 ** 2 / 12, 1 / 144])
+    share = parts / parts.sum()
+    a, b, c = result.indices
+    assert result.r_squared > 0.999
+    assert a.first_order == pytest.approx(share[0], abs=0.01)
+    assert b.total == pytest.approx(share[1] + share[2], abs=0.01)
+    assert c.total == pytest.approx(0.0, abs=0.001)
+    assert a.first_order_ci[0] <= a.first_order <= a.first_order_ci[1]
@@ -0,0 +1,87 @@
+import asyncio
+import pickle
+import threading
+import time
+import numpy as np
+import pytest
+from app.engine.singleflight import single_flight, call_key
+from app.engine.executor import OffloadPool
+from app.engine.stats import EstimationRequest
+from app.engine.timeseries import fit_arima
+
+calls = []
+
+@single_flight
+def _slow_square(x):
+    calls.append(x)
+    time.sleep(0.2)
+    return x * x
+
+@single_flight
+def _slow_fail(x):
+    calls.append(x)
+    time.sleep(0.2)
+    raise ValueError(f"bad {x}")
+
+def _run_concurrently(fn, args, n=5):
+    results = [None] * n
+    def worker(i):
+        try:
+            results[i] = fn(*args[i])
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+def test_concurrent_duplicates_share_one_call():
+    """
+    Test that identical concurrent calls run once, while different arguments run separately.
+    """
+    calls.clear()
+    results = _run_concurrently(_slow_square, [(3,), (3,), (3,), (4,), (4,)])
+    assert results == [9, 9, 9, 16, 16]
+    assert sorted(calls) == [3, 4]
+
+    # Sequential calls are not cached
+    assert _slow_square(3) == 9
+    assert sorted(calls) == [3, 3, 4]
+
+def test_errors_are_shared():
+    calls.clear()
+    results = _run_concurrently(_slow_fail, [(1,)] * 3, n=3)
+    assert all(isinstance(r, ValueError) for r in results)
+    assert calls == [1]
+
+def test_call_key_is_canonical():
+    """
+    Test that request keys ignore dict ordering and hash arrays by content.
+    """
+    a = EstimationRequest(data=[1.0, 2.0, 3.0])
+    b = EstimationRequest(data=np.array([1.0, 2.0, 3.0]))
+    assert call_key(_slow_square, (a,)) == call_key(_slow_square, (b,))
+    assert call_key(_slow_square, ({"x": 1, "y": 2},)) == call_key(_slow_square, ({"y": 2, "x": 1},))
+    assert call_key(_slow_square, (a,)) != call_key(_slow_square, (EstimationRequest(data=[1.0, 2.0]),))
+    # Decorated engine functions still pickle for process pools
+    assert pickle.loads(pickle.dumps(fit_arima)) is fit_arima
+
+def _sleepy_identity(x):
+    time.sleep(0.2)
+    return x
+
+def test_offload_coalesces_requests():
+    """
+    Test that coalesced offload calls share one task instead of taking more queue slots.
+    """
+    async def scenario():
+        pool = OffloadPool(workers=0, max_queue=1)
+        try:
+            return await asyncio.gather(*[pool.run("/test", _sleepy_identity, 7, coalesce=True) for _ in range(4)])
+        finally:
+            pool.shutdown()
+
+    # With max_queue=1, uncoalesced duplicates would be rejected as overloaded
+    assert asyncio.run(scenario()) == [7, 7, 7, 7]
@@ -1,6 +1,7 @@
 
 import pytest
 import pandas as pd
+from scipy import stats
 import numpy as np
 from app.engine.spc import analyze_spc, SPCAnalysisRequest
 
@@ -50,3 +51,157 @@ def test_pareto_calculation():
     # Cumulative: 3/6=50%, 5/6=83%, 6/6=100%
     assert pareto["cumulative"][0] == 50.0
     assert pareto["cumulative"][-1] == 100.0
+
+def test_control_chart_downsampling_keeps_violations():
+    """
+    Test that downsampled control charts respect the point budget and keep out-of-control points.
+    """
+    np.random.seed(0)
+    values = np.random.normal(10, 1, 20000)
+    values[12345] = 50.0  # Obvious out-of-control point
+    data = [{"Yield": x} for x in values]
+
+    for method in ["lttb", "minmax"]:
+        req = SPCAnalysisRequest(
+            data=data,
+            target_variable="Yield",
+            max_points=500,
+            downsample_method=method
+        )
+        cc = analyze_spc(req).control_chart
+
+        assert cc["n_total"] == 20000
+        assert len(cc["values"]) == len(cc["indices"])
+        y = np.asarray(values)
+        n_violations = int(((y > cc["ucl"]) | (y < cc["lcl"])).sum())
+        assert len(cc["values"]) <= 500 + n_violations
+        assert 12345 in cc["indices"]
+        assert cc["indices"] == sorted(cc["indices"])
+
+def test_capability_by_group_and_column():
+    """
+    Test Cp/Cpk/Pp/Ppk for several columns, overall and per factor level.
+    """
+    np.random.seed(1)
+    n = 2000
+    line = np.repeat(["L1", "L2"], n // 2)
+    # L2 is shifted off-center, so its Cpk must drop below its Cp
+    diameter = np.where(line == "L1", 10.0, 10.5) + np.random.normal(0, 0.25, n)
+    weight = np.random.normal(100, 2, n)
+    data = [{"Line": l, "Diameter": d, "Weight": w} for l, d, w in zip(line, diameter, weight)]
+
+    req = SPCAnalysisRequest(
+        data=data,
+        target_variable="Diameter",
+        factor_variable="Line",
+        specs={"usl": 11.5, "lsl": 8.5},
+        column_specs={"Weight": {"usl": 110}}
+    )
+    cap = analyze_spc(req).capability
+
+    assert set(cap["columns"]) == {"Diameter", "Weight"}
+    rows = {(r["column"], r["group"]): r for r in cap["by_group"]}
+    l1, l2 = rows[("Diameter", "L1")], rows[("Diameter", "L2")]
+
+    # Cp = 3 / (6 * 0.25) = 2.0 for both lines
+    assert 1.8 < l1["cp"] < 2.2
+    assert 1.8 < l2["cp"] < 2.2
+    assert l2["cpk"] < l1["cpk"]
+    assert l1["cp_lower"] < l1["cp"] < l1["cp_upper"]
+    assert l1["cpk_lower"] < l1["cpk"] < l1["cpk_upper"]
+
+    # One-sided spec: no Cp, but Cpk from the upper side (10 / 6 ~ 1.67)
+    w = rows[("Weight", "L1")]
+    assert w["cp"] is None
+    assert 1.4 < w["ppk"] < 1.9
+    assert len(cap["overall"]) == 2
+
+def test_multivariate_hotelling_and_mewma():
+    """
+    Test Hotelling T^2 and MEWMA on correlated variables with a shift in Phase II.
+    """
+    from app.engine.spc import analyze_multivariate_spc, MultivariateSPCRequest
+
+    np.random.seed(7)
+    cov = [[1.0, 0.8], [0.8, 1.0]]
+    x = np.random.multivariate_normal([0, 0], cov, 400)
+    # Shift against the correlation structure: small per variable, large jointly
+    x[300:] += [1.0, -1.0]
+    data = [{"A": a, "B": b} for a, b in x]
+
+    req = MultivariateSPCRequest(data=data, target_variables=["A", "B"], phase1_size=200)
+    res = analyze_multivariate_spc(req)
+
+    assert res.n == 400
+    assert res.phase1_size == 200
+    assert len(res.hotelling["values"]) == 400
+    assert res.hotelling["ucl_phase2"] > res.hotelling["ucl_phase1"] > 0
+
+    # T^2 matches the explicit quadratic form
+    d = x[5] - np.array(res.mean)
+    expected = d @ np.linalg.inv(np.array(res.covariance)) @ d
+    assert abs(res.hotelling["values"][5] - expected) < 1e-8
+
+    # The shift is detected by both charts, mostly after the change point
+    t2_alarms = res.hotelling["out_of_control"]
+    mewma_alarms = res.mewma["out_of_control"]
+    assert sum(i >= 300 for i in t2_alarms) > 10
+    assert sum(i >= 300 for i in mewma_alarms) > 50
+    assert sum(i < 300 for i in mewma_alarms) < 10
+
+    # The default MEWMA limit is ARL-calibrated, below the per-point chi-square quantile
+    assert res.mewma["ucl_method"] == "arl"
+    assert res.mewma["ucl"] < stats.chi2.ppf(1 - req.alpha, 2)
+    assert res.mewma["ucl_note"] is None
+
+    # Past the simulation cap the chi-square limit is used, with a note
+    strict = analyze_multivariate_spc(MultivariateSPCRequest(data=data, target_variables=["A", "B"], phase1_size=200, alpha=1e-4))
+    assert strict.mewma["ucl_method"] == "chi2"
+    assert strict.mewma["ucl"] == stats.chi2.ppf(1 - 1e-4, 2)
+    assert "simulation cap" in strict.mewma["ucl_note"]
+
+    # Alarms refer to original rows when incomplete rows are skipped
+    gapped = [{"A": None, "B": 0.0}] + data
+    shifted = analyze_multivariate_spc(MultivariateSPCRequest(data=gapped, target_variables=["A", "B"], phase1_size=200))
+    assert shifted.n == 400
+    assert shifted.mewma["out_of_control"] == [i + 1 for i in mewma_alarms]
+
+def test_mewma_limit_matches_arl_tables():
+    """
+    Test the simulated MEWMA limit against published values (p=2, lambda=0.1, ARL0=200: h ~ 8.7).
+    """
+    from app.engine.spc import mewma_arl_limit
+
+    assert 8.4 < mewma_arl_limit(2, 0.1, 200.0) < 9.0
+    assert mewma_arl_limit(4, 0.1, 200.0) > mewma_arl_limit(2, 0.1, 200.0)
+
+def test_multi_column_columnar_payload():
+    """
+    Test analyzing several columns in one request from a columnar payload.
+    """
+    np.random.seed(3)
+    columns = {
+        "Yield": np.random.normal(90, 2, 300).tolist(),
+        "Purity": np.random.normal(99, 0.3, 300).tolist(),
+        "Defect": (["Scratch"] * 200) + (["Dent"] * 100),
+        "Unused": list(range(300)),
+    }
+
+    req = SPCAnalysisRequest(
+        columns=columns,
+        target_variable="Yield",
+        target_variables=["Yield", "Purity", "Defect"]
+    )
+    result = analyze_spc(req)
+
+    assert len(result.control_chart["values"]) == 300
+    assert set(result.variables) == {"Yield", "Purity", "Defect"}
+    assert result.variables["Yield"]["control_chart"] == result.control_chart
+    assert 98.5 < result.variables["Purity"]["control_chart"]["mean"] < 99.5
+    assert "histogram" in result.variables["Purity"]
+    assert result.variables["Defect"]["pareto"]["counts"] == [200, 100]
+
+    # Row records give the same answer
+    rows = [dict(zip(columns, r)) for r in zip(*columns.values())]
+    from_rows = analyze_spc(SPCAnalysisRequest(data=rows, target_variable="Yield", target_variables=["Purity"]))
+    assert from_rows.variables["Purity"] == result.variables["Purity"]
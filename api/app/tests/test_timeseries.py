@@ -0,0 +1,312 @@
+import pytest
+import numpy as np
+from app.engine.timeseries import (
+    fit_arima, ARIMARequest, TimeSeriesData, search_arima_order,
+    FittedModelCache, arima_cache, _forecast_one
+)
+
+def _ar1_series(n=200, phi=0.6, seed=0):
+    rng = np.random.default_rng(seed)
+    y = np.zeros(n)
+    for t in range(1, n):
+        y[t] = phi * y[t - 1] + rng.normal()
+    return (y + 50).tolist()
+
+def test_arima_cache_reuses_fit_across_horizons():
+    """
+    Test that changing only forecast_steps reuses the cached fit.
+    """
+    pytest.importorskip("statsmodels")
+    arima_cache.clear()
+    data = TimeSeriesData(values=_ar1_series())
+
+    first = fit_arima(ARIMARequest(data=data, p=1, d=0, q=0, forecast_steps=5))
+    second = fit_arima(ARIMARequest(data=data, p=1, d=0, q=0, forecast_steps=12))
+
+    assert not first.cache_hit
+    assert second.cache_hit
+    assert len(second.forecast) == 12
+    assert len(second.forecast_ci_lower) == 12
+    np.testing.assert_allclose(second.forecast[:5], first.forecast)
+    assert second.aic == first.aic
+
+    # A different order is a different model
+    third = fit_arima(ARIMARequest(data=data, p=2, d=0, q=0, forecast_steps=5))
+    assert not third.cache_hit
+
+def test_fitted_model_cache_lru_eviction():
+    """
+    Test LRU eviction by entry count and by byte budget.
+    """
+    cache = FittedModelCache(max_entries=2, max_bytes=100)
+    cache.put("a", 1, 10)
+    cache.put("b", 2, 10)
+    assert cache.get("a") == 1  # 'a' is now most recently used
+    cache.put("c", 3, 10)
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+    cache.put("d", 4, 95)  # Over budget together with anything else
+    assert cache.get("d") == 4
+    assert len(cache) == 1
+    assert cache.total_bytes == 95
+
+    cache.put("huge", 5, 1000)  # Never cached
+    assert cache.get("huge") is None
+
+def test_auto_arima_selects_order():
+    """
+    Test auto mode: differencing from unit-root tests and a ranked model table.
+    """
+    pytest.importorskip("statsmodels")
+    # Random walk with AR(1) increments -> d = 1
+    increments = np.array(_ar1_series(n=300, phi=0.7, seed=1)) - 50
+    values = np.cumsum(increments).tolist()
+
+    res = fit_arima(ARIMARequest(
+        data=TimeSeriesData(values=values), auto=True, max_p=2, max_q=2, forecast_steps=5
+    ))
+
+    assert res.order[1] == 1
+    assert len(res.forecast) == 5
+    fitted = [r for r in res.model_table if "aic" in r]
+    assert fitted[0]["aic"] == res.aic
+    assert [r["aic"] for r in fitted] == sorted(r["aic"] for r in fitted)
+    # Every grid point is accounted for: fitted, pruned or timed out
+    assert len(res.model_table) == 9
+
+    # The search hands back the winner's fit, and an exhausted budget starts nothing new
+    table, best_fit = search_arima_order(np.asarray(values), 2, 2, 2, time_budget=20.0)
+    assert best_fit is not None and best_fit.aic == table[0]["aic"] == res.aic
+    table, best_fit = search_arima_order(np.asarray(values), 2, 2, 2, time_budget=1e-9)
+    assert best_fit is None and len(table) == 9 and all(r.get("timed_out") for r in table)
+
+def test_forecast_pool_recovers_from_dead_worker(monkeypatch):
+    """
+    Test that a worker dying (e.g. OOM kill) does not leave the forecast pool broken for later requests.
+    """
+    import os
+    from concurrent.futures.process import BrokenProcessPool
+    from app.engine import timeseries
+
+    monkeypatch.setenv("FORECAST_WORKERS", "1")
+    monkeypatch.setattr(timeseries, "_forecast_pool", None)
+    pool = timeseries.get_forecast_pool()
+    try:
+        with pytest.raises(BrokenProcessPool):
+            pool.submit(os._exit, 1).result()
+
+        assert timeseries.run_forecast_task(pow, 2, 10) == 1024
+        values = np.cumsum(_ar1_series(n=120, seed=4)).tolist()
+        res = fit_arima(ARIMARequest(data=TimeSeriesData(values=values), auto=True, max_p=1, max_q=1))
+        assert len(res.forecast) == 10
+        assert timeseries.get_forecast_pool() is not pool
+    finally:
+        timeseries.get_forecast_pool().shutdown()
+
+def test_batch_forecast_isolates_errors():
+    """
+    Test that a batch streams one record per series and a failing series does not stop the rest.
+    """
+    pytest.importorskip("statsmodels")
+    from app.engine.timeseries import iter_batch_forecasts, BatchForecastRequest
+
+    series = [{"id": f"s{i}", "data": {"values": _ar1_series(n=80, seed=i)}} for i in range(5)]
+    series.append({"id": "bad", "data": {"values": []}})
+
+    req = BatchForecastRequest(
+        model="arima", series=series, params={"p": 1, "d": 0, "q": 0, "forecast_steps": 3}, max_in_flight=2
+    )
+    records = list(iter_batch_forecasts(req))
+
+    summary = records[-1]
+    by_id = {r["id"]: r for r in records[:-1]}
+    assert summary["status"] == "done"
+    assert summary["n_ok"] == 5 and summary["n_failed"] == 1
+    assert by_id["bad"]["status"] == "error"
+    assert len(by_id["s3"]["result"]["forecast"]) == 3
+
+def _crashing_forecast(model, params, item, forecast=_forecast_one):
+    import os
+    if item.id == "crash":
+        os._exit(1)  # Simulates the worker being killed (e.g. out of memory)
+    return forecast(model, params, item)
+
+def test_batch_stream_survives_worker_crash(monkeypatch):
+    """
+    Test that a worker dying mid-batch yields an error record for its series and the stream completes.
+    """
+    pytest.importorskip("statsmodels")
+    from app.engine import timeseries
+
+    monkeypatch.setenv("FORECAST_WORKERS", "1")
+    monkeypatch.setattr(timeseries, "_forecast_pool", None)
+    monkeypatch.setattr(timeseries, "_forecast_one", _crashing_forecast)
+    series = [{"id": i, "data": {"values": _ar1_series(n=60, seed=k)}} for k, i in enumerate(["a", "crash", "b", "c"])]
+    req = timeseries.BatchForecastRequest(series=series, params={"p": 1, "d": 0, "q": 0}, max_in_flight=1)
+    try:
+        records = list(timeseries.iter_batch_forecasts(req))
+    finally:
+        timeseries.get_forecast_pool().shutdown()
+
+    by_id = {r["id"]: r for r in records[:-1]}
+    assert records[-1]["status"] == "done" and records[-1]["n_failed"] == 1
+    assert "Worker failed" in by_id["crash"]["error"]
+    assert [by_id[i]["status"] for i in ("a", "b", "c")] == ["ok"] * 3
+
+def test_forecast_pool_ready_without_warmup(monkeypatch):
+    """
+    Test that readiness is immediate and forecasts run in-process when warm-up is off.
+    """
+    from app.engine.timeseries import forecast_pool_status, dispatch_forecast
+
+    monkeypatch.delenv("FORECAST_WARMUP", raising=False)
+    assert forecast_pool_status()["ready"]
+    assert dispatch_forecast(lambda req: req * 2, 21) == 42
+
+def test_forecast_pool_becomes_ready_after_warmup(monkeypatch):
+    """
+    Test that /ready reports 503 until the single warm worker's initializer finished, then 200.
+    """
+    import time
+    from app.engine import timeseries
+    from app.main import readiness_check
+
+    monkeypatch.setenv("FORECAST_WARMUP", "1")
+    monkeypatch.setenv("FORECAST_WORKERS", "1")
+    monkeypatch.setattr(timeseries, "_forecast_pool", None)
+    monkeypatch.setattr(timeseries, "_warmup_futures", [])
+
+    assert readiness_check().status_code == 503
+    try:
+        timeseries.start_forecast_warmup()
+        deadline = time.monotonic() + 120
+        while readiness_check().status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        status = timeseries.forecast_pool_status()
+        assert status["ready"] and status["workers_warm"] == status["workers_total"] == 1
+        worker = status["workers"][0]
+        assert worker["pid"] == timeseries._warmup_futures[0].result()["pid"]
+        assert worker["statsmodels"] is True and "prophet_seconds" in worker
+    finally:
+        timeseries._forecast_pool.shutdown()
+
+def test_prophet_warm_start_from_cached_params():
+    """
+    Test that refitting the same series id starts from the cached optimum and converges faster.
+    """
+    pytest.importorskip("prophet")
+    from app.engine.timeseries import fit_prophet, ProphetRequest, prophet_param_cache
+
+    prophet_param_cache.clear()
+    rng = np.random.default_rng(0)
+    y = np.sin(np.arange(200) * 2 * np.pi / 7) + np.arange(200) * 0.05 + rng.normal(0, 0.3, 200)
+
+    def fit(n):
+        return fit_prophet(ProphetRequest(
+            data=TimeSeriesData(values=y[:n].tolist()), series_id="line-1",
+            yearly_seasonality=False, forecast_periods=5
+        ))
+
+    cold = fit(195)
+    warm = fit(200)
+
+    assert not cold.warm_start
+    assert warm.warm_start
+    assert cold.iterations and warm.iterations
+    # Starting next to the previous optimum needs fewer optimizer iterations
+    assert warm.iterations < cold.iterations
+    assert warm.fit_time > 0
+    assert len(warm.forecast) == 5
+
+def test_lite_engine_methods():
+    """
+    Test the NumPy-only engine: trends are extrapolated, seasonality is reproduced.
+    """
+    from app.engine.timeseries import fit_lite, LiteForecastRequest
+
+    rng = np.random.default_rng(0)
+    t = np.arange(140)
+    y = 0.5 * t + 5 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 0.3, len(t))
+    future = 0.5 * np.arange(140, 147) + 5 * np.sin(2 * np.pi * np.arange(140, 147) / 7)
+
+    hw = fit_lite(LiteForecastRequest(
+        data=TimeSeriesData(values=y.tolist()), method="holt_winters", seasonal_period=7, forecast_steps=7
+    ))
+    assert np.abs(np.array(hw.forecast) - future).max() < 1.5
+    assert all(lo < f < hi for lo, f, hi in zip(hw.forecast_ci_lower, hw.forecast, hw.forecast_ci_upper))
+    assert len(hw.fitted_values) == len(y)
+
+    holt = fit_lite(LiteForecastRequest(data=TimeSeriesData(values=(0.5 * t).tolist()), method="holt", forecast_steps=3))
+    np.testing.assert_allclose(holt.forecast, [70.0, 70.5, 71.0], atol=1e-3)
+
+    ses = fit_lite(LiteForecastRequest(data=TimeSeriesData(values=y.tolist()), method="ses", forecast_steps=3))
+    assert ses.forecast[0] == ses.forecast[-1]
+    # Interval widths grow with the horizon
+    widths = np.array(ses.forecast_ci_upper) - np.array(ses.forecast_ci_lower)
+    assert np.all(np.diff(widths) > 0)
+
+def test_lite_ar_matches_arima_response():
+    """
+    Test the ARI model behind engine='lite' for ARIMA requests.
+    """
+    from app.engine.timeseries import ARIMAResponse
+
+    values = _ar1_series(n=500, phi=0.6, seed=4)
+    res = fit_arima(ARIMARequest(data=TimeSeriesData(values=values), p=1, d=0, q=0, engine="lite"))
+
+    assert isinstance(res, ARIMAResponse)
+    assert res.model_params["engine"] == "lite"
+    assert abs(res.model_params["ar_params"][0] - 0.6) < 0.1
+    assert len(res.fitted_values) == len(values)
+    assert len(res.forecast) == 10
+
+    auto = fit_arima(ARIMARequest(data=TimeSeriesData(values=values), d=0, auto=True, engine="lite"))
+    assert auto.model_table[0]["aic"] == auto.aic
+
+def test_backtest_rolling_origin():
+    """
+    Test fold layout and per-horizon metrics; the true AR(1) beats a random walk.
+    """
+    from app.engine.timeseries import run_backtest, BacktestRequest
+
+    values = _ar1_series(n=300, phi=0.5, seed=2)
+    res = run_backtest(BacktestRequest(
+        data=TimeSeriesData(values=values), model="lite", horizon=4, n_folds=6,
+        window="rolling", min_train=120,
+        candidates=[{"method": "ar", "p": 1, "d": 0}, {"method": "ar", "p": 0, "d": 1}]
+    ))
+
+    assert res.folds[-1]["train_end"] == 296
+    assert all(f["train_end"] - f["train_start"] == 120 for f in res.folds)
+    assert res.best["candidate"] == {"method": "ar", "p": 1, "d": 0}
+    assert len(res.best["rmse"]) == 4
+    assert 0.0 <= res.best["overall"]["coverage"] <= 1.0
+
+def test_backtest_arima_warm_starts_each_fold():
+    """
+    Test that each fold's fit starts from the previous fold's optimum and reaches the same forecasts.
+    """
+    pytest.importorskip("statsmodels")
+    from app.engine.timeseries import run_backtest, BacktestRequest, _arima_fold
+
+    values = np.array(_ar1_series(n=200, seed=5))
+    request = BacktestRequest(
+        data=TimeSeriesData(values=values.tolist()), horizon=3, n_folds=3,
+        candidates=[{"p": 1, "d": 0, "q": 0}]
+    )
+    warm = run_backtest(request)
+    cold = run_backtest(request.model_copy(update={"refit": "full"}))
+    assert "error" not in warm.best
+
+    # Origins 191, 194, 197 (step = horizon); every fold is refitted, starting where the last one ended
+    params, errors = None, []
+    for end in (191, 194, 197):
+        fold = _arima_fold(values, (1, 0, 0), 0, end, 3, params=params)
+        if params is not None:
+            assert not np.allclose(fold["params"], params)  # Refitted, not reused
+        params = fold["params"]
+        errors.append(fold["forecast"] - values[end:end + 3])
+    expected_rmse = np.sqrt(np.mean(np.square(errors)))
+    assert abs(warm.best["overall"]["rmse"] - expected_rmse) < 1e-8
+    assert abs(warm.best["overall"]["rmse"] - cold.best["overall"]["rmse"]) < 1e-3
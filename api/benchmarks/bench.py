@@ -0,0 +1,168 @@
+"""
+Engine and endpoint benchmarks: scaling sweeps with time, peak memory and payload bytes.
+
+Runs offline (mock generation, no network), from the api/ directory:
+
+    python -m benchmarks.bench                          # full sweep -> benchmarks/results.json
+    python -m benchmarks.bench --quick                  # smallest size of each sweep
+    python -m benchmarks.bench --filter engine.spc      # only matching sweeps
+    python -m benchmarks.bench --quick --update-baseline
+    python -m benchmarks.bench --quick --baseline benchmarks/baseline.json --threshold 0.25
+
+With --baseline, any scenario whose median time (or peak memory) exceeds the baseline by more
+than the threshold fails the run with exit code 1. Baselines are machine specific: regenerate
+them with --update-baseline on the machine that runs the gate.
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RESULTS = os.path.join(HERE, "results.json")
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+
+def measure(run, repeat: int) -> Dict[str, Any]:
+    """Warm-up call, `repeat` timed calls, then one call under tracemalloc for peak memory"""
+    payload_bytes = run()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "max_s": max(times),
+        "repeat": repeat,
+        "peak_mem_bytes": peak,
+        "payload_bytes": payload_bytes,
+    }
+
+
+def run_sweeps(quick: bool, repeat: int, pattern: Optional[str]) -> List[Dict[str, Any]]:
+    from .scenarios import SWEEPS
+
+    results = []
+    for sweep in SWEEPS:
+        if pattern and pattern not in sweep.name:
+            continue
+        missing = [m for m in sweep.requires if importlib.util.find_spec(m) is None]
+        if missing:
+            print(f"skip  {sweep.name}.{sweep.parameter}: {', '.join(missing)} not installed")
+            continue
+        for size in (sweep.quick_sizes if quick else sweep.sizes):
+            key = f"{sweep.name}.{sweep.parameter}={size}"
+            try:
+                stats = measure(sweep.factory(size), repeat)
+            except Exception as e:
+                print(f"error {key}: {e}")
+                results.append({"key": key, "scenario": sweep.name, "parameter": sweep.parameter,
+                                "size": size, "error": str(e)})
+                continue
+            print(f"{key:<40} {stats['median_s'] * 1000:>10.2f} ms {stats['peak_mem_bytes'] / 2**20:>9.1f} MiB "
+                  f"{stats['payload_bytes'] / 1024:>10.1f} KiB")
+            results.append({"key": key, "scenario": sweep.name, "parameter": sweep.parameter,
+                            "size": size, **stats})
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float,
+            mem_threshold: float, min_delta: float) -> List[str]:
+    """Regression messages for scenarios present in both runs"""
+    reference = {r["key"]: r for r in baseline.get("results", []) if "error" not in r}
+    regressions = []
+    for result in results:
+        base = reference.get(result["key"])
+        if base is None:
+            continue
+        if "error" in result:
+            regressions.append(f"{result['key']}: failed ({result['error']})")
+            continue
+        ratio = result["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        # Ignore sub-millisecond jitter on tiny scenarios
+        if ratio > 1 + threshold and result["median_s"] - base["median_s"] > min_delta:
+            regressions.append(f"{result['key']}: median {result['median_s'] * 1000:.2f} ms vs "
+                               f"{base['median_s'] * 1000:.2f} ms baseline ({ratio:.2f}x)")
+        mem_ratio = result["peak_mem_bytes"] / max(base["peak_mem_bytes"], 1)
+        if mem_ratio > 1 + mem_threshold and result["peak_mem_bytes"] - base["peak_mem_bytes"] > 2**20:
+            regressions.append(f"{result['key']}: peak memory {result['peak_mem_bytes'] / 2**20:.1f} MiB vs "
+                               f"{base['peak_mem_bytes'] / 2**20:.1f} MiB baseline ({mem_ratio:.2f}x)")
+    return regressions
+
+
+def environment() -> Dict[str, Any]:
+    import numpy
+    import pandas
+    import scipy
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "scipy": scipy.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="only the smallest size of each sweep")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per scenario (median reported)")
+    parser.add_argument("--filter", help="only sweeps whose name contains this text")
+    parser.add_argument("--output", default=DEFAULT_RESULTS, help="where to write the results JSON")
+    parser.add_argument("--baseline", help="baseline JSON to gate against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed median time increase (0.25 = +25%%)")
+    parser.add_argument("--mem-threshold", type=float, default=0.5, help="allowed peak memory increase")
+    parser.add_argument("--min-delta", type=float, default=0.002, help="ignore time increases below this many seconds")
+    parser.add_argument("--update-baseline", action="store_true", help=f"also write the results to {DEFAULT_BASELINE}")
+    args = parser.parse_args(argv)
+
+    # Offline: never call the LLM, keep forecasting in-process
+    os.environ.pop("OPENAI_API_KEY", None)
+    os.environ.setdefault("FORECAST_WARMUP", "0")
+
+    results = run_sweeps(args.quick, args.repeat, args.filter)
+    report = {"environment": environment(), "quick": args.quick, "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.output}")
+
+    if args.update_baseline:
+        with open(DEFAULT_BASELINE, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"updated {DEFAULT_BASELINE}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.mem_threshold, args.min_delta)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"no regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
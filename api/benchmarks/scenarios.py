@@ -0,0 +1,184 @@
+"""
+Benchmark scenarios: each sweep maps an input size to a callable that runs the workload
+once and returns the payload bytes it produced (response JSON, or request + response for HTTP).
+The startup sweep times a fresh interpreter importing the app (the serverless cold start).
+"""
+from typing import Callable, Dict, List, Sequence
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+
+from app.engine.doe import generate_design, build_design_frame, DesignRequest, Variable
+from app.engine.sensitivity import analyze_sensitivity, SensitivityRequest
+from app.engine.spc import analyze_spc, SPCAnalysisRequest
+from app.engine.stats import calculate_advanced_estimation, AdvancedRequest
+from app.engine.timeseries import fit_arima, fit_lite, arima_cache, ARIMARequest, LiteForecastRequest, TimeSeriesData
+
+
+class Sweep:
+    """A named scaling sweep: sizes (full and quick) and a factory size -> run()"""
+    def __init__(self, name: str, parameter: str, sizes: List[int], quick_sizes: List[int],
+                 factory: Callable[[int], Callable[[], int]], requires: Sequence[str] = ()):
+        self.name = name
+        self.parameter = parameter
+        self.sizes = sizes
+        self.quick_sizes = quick_sizes
+        self.factory = factory
+        self.requires = requires  # Optional modules the sweep needs (skipped when missing)
+
+
+def _rng(seed: int = 0) -> np.random.Generator:
+    return np.random.default_rng(seed)
+
+
+def _variables(n_factors: int) -> List[Variable]:
+    return [Variable(name=f"X{i}", min=0.0, max=float(10 + i)) for i in range(n_factors)]
+
+
+def _series(n: int) -> np.ndarray:
+    rng = _rng(1)
+    return np.cumsum(rng.normal(size=n)) + 100.0
+
+
+def _json_bytes(result) -> int:
+    return len(result.model_dump_json())
+
+
+# --- Engine functions ---
+
+def design_rows(n: int):
+    request = DesignRequest(strategy="lhc", num_samples=n, variables=_variables(4))
+    return lambda: _json_bytes(generate_design(request))
+
+
+def design_factors(k: int):
+    request = DesignRequest(strategy="lhc", num_samples=2000, variables=_variables(k))
+    return lambda: _json_bytes(generate_design(request))
+
+
+def spc_rows(n: int):
+    values = _rng(2).normal(50.0, 2.0, n).tolist()
+    request = SPCAnalysisRequest(columns={"Yield": values}, target_variable="Yield", max_points=2000)
+    return lambda: _json_bytes(analyze_spc(request))
+
+
+def advanced_n(n: int):
+    request = AdvancedRequest(data=_rng(3).normal(5.0, 1.0, n), prior_mean=0.0, prior_std=1.0)
+    return lambda: _json_bytes(calculate_advanced_estimation(request))
+
+
+def sensitivity_factors(k: int):
+    """Saltelli indices with 200 bootstrap resamples over ~100k evaluations"""
+    variables = _variables(k)
+    frame = build_design_frame(DesignRequest(strategy="saltelli", num_samples=100000 // (k + 2),
+                                             variables=variables, seed=0))
+    x = frame.to_numpy()
+    frame["Response"] = x @ np.linspace(1.0, 0.1, k) + x[:, 0] * x[:, 1]
+    request = SensitivityRequest(variables=variables, num_resamples=200, seed=0)
+    return lambda: _json_bytes(analyze_sensitivity(request, frame=frame))
+
+
+def arima_length(n: int):
+    request = ARIMARequest(data=TimeSeriesData(values=_series(n)), p=1, d=1, q=1)
+
+    def run():
+        arima_cache.clear()  # Measure the fit, not a cache hit
+        return _json_bytes(fit_arima(request))
+    return run
+
+
+def lite_length(n: int):
+    request = LiteForecastRequest(data=TimeSeriesData(values=_series(n)), method="holt")
+    return lambda: _json_bytes(fit_lite(request))
+
+
+# --- HTTP endpoints (in-process ASGI client) ---
+
+class ASGIClient:
+    """Synchronous wrapper around httpx.AsyncClient with the app mounted in-process"""
+    def __init__(self):
+        import httpx
+        from app.main import app
+        self.loop = asyncio.new_event_loop()
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    def post(self, path: str, body: bytes) -> int:
+        response = self.loop.run_until_complete(
+            self.client.post(path, content=body, headers={"content-type": "application/json"})
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"POST {path} returned {response.status_code}: {response.text[:200]}")
+        return len(body) + len(response.content)
+
+
+_client: ASGIClient = None
+
+
+def _http(path: str, payload: Dict) -> Callable[[], int]:
+    global _client
+    if _client is None:
+        _client = ASGIClient()
+    body = json.dumps(payload).encode()
+    return lambda: _client.post(path, body)
+
+
+def http_design_rows(n: int):
+    return _http("/design", {"strategy": "lhc", "num_samples": n,
+                             "variables": [v.model_dump() for v in _variables(4)]})
+
+
+def http_spc_rows(n: int):
+    values = _rng(2).normal(50.0, 2.0, n).tolist()
+    return _http("/spc", {"columns": {"Yield": values}, "target_variable": "Yield", "max_points": 2000})
+
+
+def http_advanced_n(n: int):
+    return _http("/stats/advanced", {"data": _rng(3).normal(5.0, 1.0, n).tolist(),
+                                     "prior_mean": 0.0, "prior_std": 1.0})
+
+
+def http_arima_length(n: int):
+    run = _http("/arima", {"data": {"values": _series(n).tolist()}, "p": 1, "d": 1, "q": 1})
+
+    def run_uncached():
+        arima_cache.clear()
+        return run()
+    return run_uncached
+
+
+# --- Cold start (fresh interpreter per run) ---
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cold_import(preload: int):
+    """Imports app.main in a new process; with preload=1 also every deferred module"""
+    code = "import app.main"
+    if preload:
+        code += "; from app.engine.lazy import preload; preload()"
+    env = {**os.environ, "PRELOAD_MODULES": "0"}
+
+    def run():
+        out = subprocess.run([sys.executable, "-c", code], cwd=API_DIR, env=env,
+                             capture_output=True, check=True)
+        return len(out.stdout)
+    return run
+
+
+SWEEPS = [
+    Sweep("startup.import", "preload", [0, 1], [0], cold_import),
+    Sweep("engine.design", "rows", [1000, 10000, 100000], [1000], design_rows),
+    Sweep("engine.design", "factors", [2, 8, 32], [2], design_factors),
+    Sweep("engine.spc", "rows", [1000, 10000, 100000, 1000000], [1000], spc_rows),
+    Sweep("engine.advanced", "n", [1000, 10000, 100000], [1000], advanced_n),
+    Sweep("engine.sensitivity", "factors", [5, 10, 30], [5], sensitivity_factors),
+    Sweep("engine.arima", "length", [200, 1000, 5000], [200], arima_length, requires=("statsmodels",)),
+    Sweep("engine.lite", "length", [1000, 10000, 100000], [1000], lite_length),
+    Sweep("http.design", "rows", [1000, 10000, 100000], [1000], http_design_rows, requires=("httpx",)),
+    Sweep("http.spc", "rows", [1000, 10000, 100000], [1000], http_spc_rows, requires=("httpx",)),
+    Sweep("http.advanced", "n", [1000, 10000, 100000], [1000], http_advanced_n, requires=("httpx",)),
+    Sweep("http.arima", "length", [200, 1000], [200], http_arima_length, requires=("httpx", "statsmodels")),
+]
@@ -1,5 +1,6 @@
 import os
 import sys
+import time
 from fastapi import FastAPI, Request
 
 # Add api directory to Python path
@@ -8,9 +9,11 @@ if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
 # Try to import the FastAPI app
+# Engines load pandas/SciPy/OpenAI on first use; GET /startup shows what each import cost
+_started = time.perf_counter()
 try:
     from app.main import app
-    print("✓ Successfully imported app")
+    print(f"✓ Successfully imported app in {(time.perf_counter() - _started) * 1000:.0f} ms")
 except Exception as e:
     print(f"✗ Import failed: {e}")
     # Create fallback app with error details
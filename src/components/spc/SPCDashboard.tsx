@@ -123,6 +123,7 @@ export const SPCDashboard = ({ data = [], spcResult, variables = [] }: SPCProps)
                             <Plot
                                 data={[
                                     {
+                                        x: controlData.indices,
                                         y: controlData.values || [],
                                         type: 'scatter',
                                         mode: 'lines+markers',
@@ -130,16 +131,19 @@ export const SPCDashboard = ({ data = [], spcResult, variables = [] }: SPCProps)
                                         line: { color: '#0ea5e9' }
                                     },
                                     {
+                                        x: controlData.indices,
                                         y: Array((controlData.values || []).length).fill(controlData.mean),
                                         type: 'scatter', mode: 'lines', name: 'Center Line',
                                         line: { color: '#ffffff', dash: 'dash', width: 1 }
                                     },
                                     {
+                                        x: controlData.indices,
                                         y: Array((controlData.values || []).length).fill(controlData.ucl),
                                         type: 'scatter', mode: 'lines', name: 'UCL',
                                         line: { color: '#ef4444', width: 2 }
                                     },
                                     {
+                                        x: controlData.indices,
                                         y: Array((controlData.values || []).length).fill(controlData.lcl),
                                         type: 'scatter', mode: 'lines', name: 'LCL',
                                         line: { color: '#ef4444', width: 2 }
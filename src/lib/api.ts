@@ -203,3 +203,27 @@ export const performProphetAnalysis = async (payload: ProphetRequest): Promise<P
         throw error;
     }
 };
+
+// --- Dataset Store ---
+
+export interface DatasetInfo {
+    dataset_id: string;
+    n_rows: number;
+    columns: { name: string; dtype: string }[];
+}
+
+export const uploadDataset = async (file: File): Promise<DatasetInfo> => {
+    try {
+        const form = new FormData();
+        form.append('file', file);
+        const res = await fetch(`${API_BASE_URL}/datasets`, {
+            method: 'POST',
+            body: form,
+        });
+        if (!res.ok) throw new Error(`API Error: ${await res.text()}`);
+        return await res.json();
+    } catch (error) {
+        console.error("[API] Exception:", error);
+        throw error;
+    }
+};
@@ -34,8 +34,10 @@ export interface SyntheticDataPayload {
 }
 
 export interface SPCAnalysisPayload {
-    data: Record<string, unknown>[] | number[]; // Support both Record array and number array
+    data?: Record<string, unknown>[] | number[]; // Support both Record array and number array
+    columns?: Record<string, unknown[]>; // Columnar alternative to data (column -> values)
     target_variable?: string;
+    target_variables?: string[];
     specs?: {
         usl?: number;
         lsl?: number;
@@ -48,6 +50,8 @@ export interface ControlChartData {
     mean: number;
     ucl: number;
     lcl: number;
+    indices?: number[]; // Original positions when the series was downsampled
+    n_total?: number;
 }
 
 export interface SPCResult {
@@ -119,6 +123,12 @@ export interface ARIMARequest {
     d: number;
     q: number;
     forecast_steps: number;
+    auto?: boolean; // Select (p, d, q) automatically; p/d/q are ignored
+    max_p?: number;
+    max_d?: number;
+    max_q?: number;
+    time_budget?: number; // Seconds
+    engine?: 'auto' | 'statsmodels' | 'lite'; // 'lite' = NumPy-only ARI model
 }
 
 export interface ARIMAResult {
@@ -134,6 +144,9 @@ export interface ARIMAResult {
     forecast_ci_upper: number[];
     residuals: number[];
     fitted_values: number[];
+    cache_hit?: boolean;
+    order?: number[];
+    model_table?: Record<string, number | boolean>[];
 }
 
 export interface ProphetRequest {
@@ -143,6 +156,7 @@ export interface ProphetRequest {
     yearly_seasonality: boolean;
     weekly_seasonality: boolean;
     daily_seasonality: boolean;
+    series_id?: string; // Warm-start refits of the same series
 }
 
 export interface ProphetResult {
@@ -156,5 +170,8 @@ export interface ProphetResult {
         yearly?: number[];
         weekly?: number[];
     };
+    warm_start?: boolean;
+    iterations?: number | null;
+    fit_time?: number;
 }
 